@@ -0,0 +1,1266 @@
+# Description: This file contains benchmarks for the HashMap implementations.
+# Run every benchmark with:
+#     python benchmark.py
+# or only the named ones with:
+#     python benchmark.py sc_upsert
+# Each benchmark prints its results in human-readable form.
+
+import asyncio
+import gc
+import os
+import pickle
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import a6_include
+import hash_functions
+import hash_map_async
+import hash_map_cache
+import hash_map_concurrent
+import hash_map_cuckoo
+import hash_map_oa
+import hash_map_oa_compact
+import hash_map_robin_hood
+import hash_map_sc
+import hash_map_shared
+import hash_map_sharded
+import hash_map_stats
+import hash_map_swiss
+
+
+def index_hash(key: str) -> int:
+    """
+    Hash function for keys of the form 'key' + str(i) that returns i, so that keys are spread
+    round-robin over the buckets and every chain has exactly the same length
+    """
+    return int(key[3:])
+
+
+def mixed_hash_function_2(key: str) -> int:
+    """
+    hash_function_2 followed by a multiplicative mix, so it keeps its per-character cost
+    but spreads similar keys over the whole table
+    """
+    hash = hash_map_oa.hash_function_2(key) * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF
+    return hash ^ (hash >> 29)
+
+
+def timed(function, *args) -> float:
+    """
+    Returns the wall-clock time in seconds taken by calling function(*args)
+    """
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """
+    Returns the value below which the given fraction of the sorted samples fall
+    """
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+class CountingSLNode(a6_include.SLNode):
+    """
+    SLNode that counts how many nodes have been allocated
+    """
+    allocations = 0
+
+    def __init__(self, key: str, value: object) -> None:
+        CountingSLNode.allocations += 1
+        super().__init__(key, value)
+
+
+def legacy_sc_put(m: hash_map_sc.HashMap, key: str, value: object) -> None:
+    """
+    The original chaining put: contains, then remove, then insert of a new node
+    """
+    linked_list = m.get_linked_list(key)
+    if linked_list.contains(key):
+        linked_list.remove(key)
+        linked_list.insert(key, value)
+    else:
+        linked_list.insert(key, value)
+        m.size += 1
+
+
+def bench_sc_upsert() -> None:
+    """
+    Compares overwriting existing keys with the original three-pass put against the
+    single-pass in-place upsert, at chain lengths of 1, 4 and 16
+    """
+    capacity = 1000
+    rounds = 20
+
+    print("\nsc_upsert - overwrite existing keys")
+    print("-----------------------------------")
+    print(f"{'chain':>5} {'legacy ms':>10} {'upsert ms':>10} {'speedup':>8} {'legacy allocs':>14} {'upsert allocs':>14}")
+
+    original_node = a6_include.SLNode
+    a6_include.SLNode = CountingSLNode
+    try:
+        for chain_length in (1, 4, 16):
+            keys = ['key' + str(i) for i in range(capacity * chain_length)]
+            results = []
+            for put in (legacy_sc_put, hash_map_sc.HashMap.put):
+                m = hash_map_sc.HashMap(capacity, index_hash)
+                for key in keys:
+                    m.put(key, 0)
+
+                def overwrite():
+                    for value in range(rounds):
+                        for key in keys:
+                            put(m, key, value)
+
+                CountingSLNode.allocations = 0
+                elapsed = timed(overwrite)
+                results.append((elapsed * 1000, CountingSLNode.allocations))
+
+            (legacy_ms, legacy_allocs), (upsert_ms, upsert_allocs) = results
+            print(f"{chain_length:>5} {legacy_ms:>10.1f} {upsert_ms:>10.1f} {legacy_ms / upsert_ms:>7.2f}x "
+                  f"{legacy_allocs:>14} {upsert_allocs:>14}")
+    finally:
+        a6_include.SLNode = original_node
+
+
+def bench_sc_resize_policy() -> None:
+    """
+    Compares lookups in a chaining map left at its initial capacity against one with
+    automatic load-factor-driven resizing
+    """
+    initial_capacity = 50
+
+    print("\nsc_resize_policy - lookups after growing from capacity 50")
+    print("--------------------------------------------------------")
+    print(f"{'keys':>7} {'fixed ms':>9} {'policy ms':>10} {'fixed cap':>10} {'policy cap':>11}")
+
+    for count in (1000, 10000, 50000):
+        keys = ['key' + str(i) for i in range(count)]
+        results = []
+        for policy in (False, True):
+            m = hash_map_sc.HashMap(initial_capacity, hash)
+            if policy:
+                m.set_resize_policy(max_load_factor=1.0, growth_factor=2, min_load_factor=0.25)
+            for key in keys:
+                m.put(key, key)
+            results.append((timed(lambda: [m.get(key) for key in keys]) * 1000, m.capacity))
+
+        (fixed_ms, fixed_capacity), (policy_ms, policy_capacity) = results
+        print(f"{count:>7} {fixed_ms:>9.1f} {policy_ms:>10.1f} {fixed_capacity:>10} {policy_capacity:>11}")
+
+
+def bench_incremental_resize() -> None:
+    """
+    Compares per-put latency percentiles of the stop-the-world resize against incremental rehashing,
+    for both engines while growing from a small table
+    """
+    count = 200000
+
+    print("\nincremental_resize - put latency while growing to 200K keys (microseconds)")
+    print("-------------------------------------------------------------------------")
+    print(f"{'engine':>6} {'mode':>14} {'p50':>8} {'p99':>8} {'p999':>8} {'max':>10} {'total ms':>9}")
+
+    keys = ['key' + str(i) for i in range(count)]
+    for engine in ('oa', 'sc'):
+        for step in (None, 8):
+            if engine == 'oa':
+                m = hash_map_oa.HashMap(16, hash)
+            else:
+                m = hash_map_sc.HashMap(16, hash)
+                m.set_resize_policy(max_load_factor=1.0, growth_factor=2)
+            if step is not None:
+                m.set_incremental_resize(step)
+
+            # the cyclic garbage collector is paused so its own pauses do not hide the resize cost
+            clock = time.perf_counter_ns
+            latencies = []
+            gc.disable()
+            try:
+                for key in keys:
+                    start = clock()
+                    m.put(key, key)
+                    latencies.append(clock() - start)
+            finally:
+                gc.enable()
+
+            total_ms = sum(latencies) / 1e6
+            latencies.sort()
+            mode = 'stop-the-world' if step is None else f'incremental/{step}'
+            print(f"{engine:>6} {mode:>14} {percentile(latencies, 0.5) / 1000:>8.1f} "
+                  f"{percentile(latencies, 0.99) / 1000:>8.1f} {percentile(latencies, 0.999) / 1000:>8.1f} "
+                  f"{latencies[-1] / 1000:>10.1f} {total_ms:>9.1f}")
+
+
+def bench_oa_churn() -> None:
+    """
+    Measures miss lookups in an open addressing map after heavy remove/insert churn,
+    with and without automatic tombstone compaction
+    """
+    live = 20000
+    churn = 100000
+
+    print("\noa_churn - misses after 100K remove/insert pairs on 20K live keys")
+    print("----------------------------------------------------------------")
+    print(f"{'threshold':>9} {'capacity':>9} {'tombstones':>11} {'empty':>7} {'miss ms':>8} {'churn ms':>9}")
+
+    misses = ['miss' + str(i) for i in range(live)]
+    for threshold in (None, 0.25):
+        m = hash_map_oa.HashMap(16, hash)
+        m.compact_threshold = threshold
+        for i in range(live):
+            m.put('key' + str(i), i)
+
+        def run_churn():
+            for i in range(churn):
+                m.remove('key' + str(i))
+                m.put('key' + str(i + live), i)
+
+        churn_ms = timed(run_churn) * 1000
+        miss_ms = timed(lambda: [m.get(key) for key in misses]) * 1000
+        print(f"{str(threshold):>9} {m.capacity:>9} {m.tombstones:>11} {m.empty_buckets():>7} "
+              f"{miss_ms:>8.1f} {churn_ms:>9.1f}")
+
+
+class CountingHashEntry(hash_map_oa.HashEntry):
+    """
+    HashEntry that counts how many entries have been allocated
+    """
+    allocations = 0
+
+    def __init__(self, key: str, value: object) -> None:
+        CountingHashEntry.allocations += 1
+        super().__init__(key, value)
+
+
+def bench_oa_memory(count: int = 1000000) -> None:
+    """
+    Compares the memory taken by the HashEntry layout and the compact parallel-array layout
+    of the open addressing map at 1M entries, and the entries allocated while overwriting every value.
+    Keys and values are created before tracing starts, so only the table's own memory is counted.
+    """
+    print(f"\noa_memory - table memory at {count} entries (tracemalloc)")
+    print("--------------------------------------------------")
+    print(f"{'layout':>8} {'capacity':>9} {'MiB':>8} {'bytes/entry':>12} {'overwrite allocs':>17} {'build s':>8}")
+
+    keys = ['key' + str(i) for i in range(count)]
+    values = list(range(count))
+    for name, module in (('entry', hash_map_oa), ('compact', hash_map_oa_compact)):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            m = module.HashMap(16, hash)
+            for key, value in zip(keys, values):
+                m.put(key, value)
+            build_s = time.perf_counter() - start
+            gc.collect()
+            table_bytes = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        # overwrite every value, counting the HashEntry objects the put path allocates
+        original_entry = hash_map_oa.HashEntry
+        hash_map_oa.HashEntry = CountingHashEntry
+        CountingHashEntry.allocations = 0
+        try:
+            for key in keys:
+                m.put(key, 0)
+        finally:
+            hash_map_oa.HashEntry = original_entry
+
+        print(f"{name:>8} {m.capacity:>9} {table_bytes / 2 ** 20:>8.1f} {table_bytes / count:>12.1f} "
+              f"{CountingHashEntry.allocations:>17} {build_s:>8.1f}")
+        del m
+
+
+def bench_rehash_cost() -> None:
+    """
+    Measures resize_table for each engine with keys of growing length. Entries carry their hash,
+    so the resize cost should stay flat while hashing the keys from scratch grows with their length.
+    """
+    count = 20000
+
+    print("\nrehash_cost - resize_table of 20K keys with a mixed hash_function_2 (ms)")
+    print("-----------------------------------------------------------------------")
+    print(f"{'key len':>8} {'hash keys':>10} {'oa':>8} {'compact':>8} {'sc':>8}")
+
+    for length in (8, 64, 512, 2048):
+        keys = [str(i).rjust(length, 'k') for i in range(count)]
+        hash_ms = timed(lambda: [mixed_hash_function_2(key) for key in keys]) * 1000
+
+        results = []
+        for module in (hash_map_oa, hash_map_oa_compact, hash_map_sc):
+            m = module.HashMap(4 * count, mixed_hash_function_2)
+            for key in keys:
+                m.put(key, key)
+            results.append(timed(m.resize_table, 8 * count) * 1000)
+
+        print(f"{length:>8} {hash_ms:>10.1f} " + ' '.join(f"{ms:>8.1f}" for ms in results))
+
+
+def oa_probe_lengths(m: hash_map_oa.HashMap, keys: list) -> list:
+    """
+    Returns the number of buckets a get probes for each key in an open addressing map, whether it is there or not
+    """
+    lengths = []
+    for key in keys:
+        index = m.hash_function(key) % m.capacity
+        counter = 0
+        while True:
+            entry = m.buckets[(index + counter ** 2) % m.capacity]
+            if entry is None or (entry.is_tombstone is False and entry.key == key):
+                break
+            counter += 1
+        lengths.append(counter + 1)
+    return lengths
+
+
+def bench_hash_functions() -> None:
+    """
+    Compares the supplied and the built-in hash functions: keys hashed per second, distribution quality
+    (chi-square over 1024 buckets and avalanche), and the chain / probe lengths they produce
+    on 'key' + str(i) keys
+    """
+    count = 20000
+    keys = ['key' + str(i) for i in range(count)]
+    functions = (
+        ('hash_function_1', hash_map_oa.hash_function_1),
+        ('hash_function_2', hash_map_oa.hash_function_2),
+        ('fnv1a', hash_functions.fnv1a),
+        ('siphash', hash_functions.make_siphash(0)),
+        ('builtin_hash', hash_functions.builtin_hash),
+    )
+
+    print("\nhash_functions - 20K 'key' + str(i) keys")
+    print("----------------------------------------")
+    print(f"{'function':>16} {'keys/s':>10} {'chi2/df':>8} {'aval mean':>10} {'aval worst':>11} "
+          f"{'sc mean':>8} {'sc max':>7} {'oa mean':>8} {'oa max':>7}")
+
+    for name, function in functions:
+        keys_per_second = count / timed(lambda: [function(key) for key in keys])
+        chi2 = hash_functions.chi_square(function, keys, 1024)
+        mean, worst = hash_functions.avalanche(function, keys[:100])
+
+        # chain lengths at load factor 1, averaged over the keys (the cost of a successful get)
+        sc = hash_map_sc.HashMap(count, function)
+        for key in keys:
+            sc.put(key, key)
+        chains = [sc.buckets[index].length() for index in range(sc.capacity)]
+        sc_mean = sum(length * length for length in chains) / count
+
+        oa = hash_map_oa.HashMap(16, function)
+        for key in keys:
+            oa.put(key, key)
+        probes = oa_probe_lengths(oa, keys)
+
+        print(f"{name:>16} {keys_per_second:>10.0f} {chi2:>8.1f} {mean:>10.3f} {worst:>11.3f} "
+              f"{sc_mean:>8.1f} {max(chains):>7} {sum(probes) / count:>8.2f} {max(probes):>7}")
+
+
+def bench_bulk_load() -> None:
+    """
+    Compares loading 200K pairs with a put loop, with put_many into a small map, and with from_items
+    """
+    count = 200000
+    items = [('key' + str(i), i) for i in range(count)]
+
+    print("\nbulk_load - loading 200K pairs (ms)")
+    print("-----------------------------------")
+    print(f"{'engine':>8} {'put loop':>9} {'put_many':>9} {'from_items':>11}")
+
+    for name, module in (('oa', hash_map_oa), ('compact', hash_map_oa_compact), ('sc', hash_map_sc)):
+        def new_map():
+            m = module.HashMap(16, hash)
+            if module is hash_map_sc:
+                m.set_resize_policy(max_load_factor=1.0, growth_factor=2)
+            return m
+
+        def put_loop():
+            m = new_map()
+            for key, value in items:
+                m.put(key, value)
+
+        loop_ms = timed(put_loop) * 1000
+        many_ms = timed(lambda: new_map().put_many(items)) * 1000
+        from_ms = timed(module.HashMap.from_items, items, hash) * 1000
+        print(f"{name:>8} {loop_ms:>9.1f} {many_ms:>9.1f} {from_ms:>11.1f}")
+
+
+def bench_batch_lookup() -> None:
+    """
+    Compares the per-key latency of a get loop against get_many for growing batch sizes,
+    with half of the looked-up keys present
+    """
+    count = 100000
+    items = [('key' + str(i), i) for i in range(count)]
+    lookups = ['key' + str(i * 2) for i in range(count)]
+
+    print("\nbatch_lookup - per-key latency of get vs get_many (ns), 50% hits")
+    print("---------------------------------------------------------------")
+    print(f"{'engine':>8} {'batch':>6} {'get loop':>9} {'get_many':>9} {'speedup':>8}")
+
+    for name, module in (('oa', hash_map_oa), ('compact', hash_map_oa_compact), ('sc', hash_map_sc)):
+        m = module.HashMap.from_items(items, hash)
+        for batch_size in (1, 10, 100, 1000):
+            batches = [lookups[i:i + batch_size] for i in range(0, count, batch_size)]
+
+            def get_loop():
+                for batch in batches:
+                    [m.get(key) for key in batch]
+
+            def get_many():
+                for batch in batches:
+                    m.get_many(batch)
+
+            loop_ns = timed(get_loop) * 1e9 / count
+            many_ns = timed(get_many) * 1e9 / count
+            print(f"{name:>8} {batch_size:>6} {loop_ns:>9.0f} {many_ns:>9.0f} {loop_ns / many_ns:>7.2f}x")
+
+
+def traced_peak(function) -> tuple:
+    """
+    Returns (seconds, peak bytes allocated above the starting point) for calling function()
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_iteration() -> None:
+    """
+    Compares exporting every pair with get_keys plus a get per key against streaming items(),
+    measuring the time and the peak memory allocated by the scan itself
+    """
+    count = 300000
+    items = [('key' + str(i), i) for i in range(count)]
+
+    print("\niteration - exporting 300K pairs")
+    print("--------------------------------")
+    print(f"{'engine':>8} {'get_keys+get ms':>16} {'peak KiB':>9} {'items() ms':>11} {'peak KiB':>9}")
+
+    for name, module in (('oa', hash_map_oa), ('compact', hash_map_oa_compact), ('sc', hash_map_sc)):
+        m = module.HashMap.from_items(items, hash)
+
+        def export_with_get_keys():
+            keys = m.get_keys()
+            for index in range(keys.length()):
+                key = keys[index]
+                m.get(key)
+
+        def export_with_items():
+            for key, value in m.items():
+                pass
+
+        array_s, array_peak = traced_peak(export_with_get_keys)
+        stream_s, stream_peak = traced_peak(export_with_items)
+        print(f"{name:>8} {array_s * 1000:>16.1f} {array_peak / 1024:>9.1f} "
+              f"{stream_s * 1000:>11.1f} {stream_peak / 1024:>9.1f}")
+
+
+class LockedMap:
+    """
+    Shares one hash_map_sc.HashMap between threads the way callers had to before hash_map_concurrent:
+    every operation holds one global lock
+    """
+    def __init__(self, capacity: int, function) -> None:
+        self.map = hash_map_sc.HashMap(capacity, function)
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> object:
+        with self.lock:
+            return self.map.get(key)
+
+    def put(self, key: str, value: object) -> None:
+        with self.lock:
+            self.map.put(key, value)
+
+
+def bench_concurrent() -> None:
+    """
+    Runs a 90% get / 10% put mix from 1, 2, 4 and 8 threads against a chaining map behind one global
+    lock and against the lock-striped hash_map_concurrent.HashMap. Under the GIL the threads cannot run
+    Python code in parallel, so only a free-threaded build (python3.13t or later) shows the striped map scaling
+    """
+    count = 50000
+    operations = 200000
+    keys = ['key' + str(i) for i in range(count)]
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    title = "concurrent - 90% get / 10% put over 50K keys, " + ("GIL enabled" if gil else "free-threaded build")
+    print("\n" + title)
+    print("-" * len(title))
+    print(f"{'threads':>8} {'global lock ops/s':>18} {'striped ops/s':>14}")
+
+    def run(m, threads: int) -> float:
+        per_thread = operations // threads
+
+        def worker(seed: int) -> None:
+            index = seed * 7919
+            for i in range(per_thread):
+                index = (index + 104729) % count
+                key = keys[index]
+                if i % 10 == 0:
+                    m.put(key, i)
+                else:
+                    m.get(key)
+
+        workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return per_thread * threads / (time.perf_counter() - start)
+
+    for threads in (1, 2, 4, 8):
+        locked = LockedMap(count, hash)
+        striped = hash_map_concurrent.HashMap(count, hash)
+        for key in keys:
+            locked.put(key, 0)
+            striped.put(key, 0)
+        print(f"{threads:>8} {run(locked, threads):>18,.0f} {run(striped, threads):>14,.0f}")
+
+
+def bench_sharded() -> None:
+    """
+    Measures batched put_many and get_many throughput of the sharded map with 1 to 16 worker processes.
+    The front end still splits and merges every batch on one core, so the speedup levels off before
+    the number of processes, and never exceeds the number of CPUs
+    """
+    count = 400000
+    items = [('key' + str(i), i) for i in range(count)]
+    keys = [key for key, _ in items]
+
+    title = "sharded - batched put / get of 400K keys, " + str(os.cpu_count()) + " CPUs"
+    print("\n" + title)
+    print("-" * len(title))
+    print(f"{'processes':>10} {'put_many ops/s':>15} {'get_many ops/s':>15} {'speedup':>8}")
+
+    baseline = None
+    for processes in (1, 2, 4, 8, 16):
+        with hash_map_sharded.HashMap(2 * count, hash_functions.builtin_hash, processes) as m:
+            put_s = timed(m.put_many, items)
+            get_s = timed(m.get_many, keys)
+        baseline = baseline or put_s + get_s
+        print(f"{processes:>10} {count / put_s:>15,.0f} {count / get_s:>15,.0f} "
+              f"{baseline / (put_s + get_s):>7.2f}x")
+
+
+def bench_shared() -> None:
+    """
+    Compares what each read-only worker pays to get a usable 200K entry table: unpickling its own
+    hash_map_oa.HashMap against attaching to one shared hash_map_shared.HashMap. Reports the time to get
+    the table, the Python memory it keeps (tracemalloc), and the get throughput afterwards
+    """
+    count = 200000
+    items = [('key' + str(i), i) for i in range(count)]
+    keys = [key for key, _ in items]
+    function = hash_functions.fnv1a
+
+    pickled = pickle.dumps(hash_map_oa.HashMap.from_items(items, function))
+    shared = hash_map_shared.HashMap.create(items, function)
+
+    print("\nshared - per-worker cost of a 200K entry read-only table")
+    print("--------------------------------------------------------")
+    print(f"{'worker gets table by':>22} {'ms':>8} {'KiB kept':>10} {'gets/s':>10}")
+
+    for name, load in (('unpickling a copy', lambda: pickle.loads(pickled)),
+                       ('attaching', lambda: hash_map_shared.HashMap.attach(function, name=shared.name))):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        m = load()
+        elapsed = time.perf_counter() - start
+        kept = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        get_s = timed(lambda: [m.get(key) for key in keys])
+        print(f"{name:>22} {elapsed * 1000:>8.1f} {kept / 1024:>10.1f} {count / get_s:>10,.0f}")
+        if name == 'attaching':
+            m.close()
+
+    shared.close()
+    shared.unlink()
+
+
+def bench_snapshot() -> None:
+    """
+    Compares rebuilding a 200K entry map from its pairs with from_items against loading a snapshot
+    saved with save, eagerly and with lazy=True (open, then one get)
+    """
+    count = 200000
+    items = [('key' + str(i), i) for i in range(count)]
+    path = 'benchmark.snapshot'
+
+    print("\nsnapshot - restoring 200K entries")
+    print("---------------------------------")
+    print(f"{'engine':>8} {'from_items ms':>14} {'save ms':>8} {'MiB':>6} {'load ms':>8} {'lazy open ms':>13}")
+
+    try:
+        for name, module in (('oa', hash_map_oa), ('sc', hash_map_sc)):
+            rebuild_s = timed(module.HashMap.from_items, items, hash_functions.fnv1a)
+            m = module.HashMap.from_items(items, hash_functions.fnv1a)
+            save_s = timed(m.save, path)
+            size = os.path.getsize(path)
+            load_s = timed(module.HashMap.load, path)
+
+            def open_lazy():
+                with module.HashMap.load(path, lazy=True) as lazy:
+                    lazy.get('key0')
+
+            lazy_s = timed(open_lazy)
+            print(f"{name:>8} {rebuild_s * 1000:>14.1f} {save_s * 1000:>8.1f} {size / 2 ** 20:>6.1f} "
+                  f"{load_s * 1000:>8.1f} {lazy_s * 1000:>13.2f}")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def bench_durable() -> None:
+    """
+    Measures ops/second of single puts and of put_many on a durable open addressing map under each fsync
+    policy, against the same map without a log
+    """
+    puts = 5000
+    items = [('key' + str(i), i) for i in range(100000)]
+
+    print("\ndurable - write-ahead log cost per fsync policy")
+    print("-----------------------------------------------")
+    print(f"{'policy':>10} {'put ops/s':>12} {'put_many ops/s':>15}")
+
+    for policy in ('no log', 'never', 'interval', 'always'):
+        rates = []
+        for workload in ('put', 'put_many'):
+            directory = tempfile.mkdtemp()
+            try:
+                m = hash_map_oa.HashMap(11, hash_functions.fnv1a)
+                if policy != 'no log':
+                    m.set_durable(os.path.join(directory, 'map'), fsync=policy)
+
+                if workload == 'put':
+                    seconds = timed(lambda: [m.put('key' + str(i), i) for i in range(puts)])
+                    rates.append(puts / seconds)
+                else:
+                    rates.append(len(items) / timed(m.put_many, items))
+
+                if m.log is not None:
+                    m.close_log()
+            finally:
+                shutil.rmtree(directory)
+        print(f"{policy:>10} {rates[0]:>12,.0f} {rates[1]:>15,.0f}")
+
+
+def crash_workload(directory: str, policy: str, acknowledged) -> None:
+    """
+    Runs in a child process for bench_crash_recovery: applies crash_operations to a durable map forever,
+    reporting after each call returns how many operations have been applied
+    """
+    m = hash_map_oa.HashMap(11, hash_functions.fnv1a)
+    m.set_durable(directory, fsync=policy, checkpoint_bytes=256 * 1024)
+    done = 0
+    while True:
+        for batch in crash_operations(done):
+            if batch[0][0] == 'put_many':
+                m.put_many([(key, value) for _, key, value in batch])
+            elif batch[0][0] == 'put':
+                m.put(batch[0][1], batch[0][2])
+            else:
+                m.remove(batch[0][1])
+            done += len(batch)
+            acknowledged.value = done
+
+
+def crash_operations(start: int) -> list:
+    """
+    Returns the next 300 operations from operation number start, grouped into calls: one put_many
+    of 200 pairs, then 100 single puts and removes. Operation i always does the same thing
+    """
+    calls = [[('put_many', 'key' + str(i % 20000), i) for i in range(start, start + 200)]]
+    for i in range(start + 200, start + 300):
+        if i % 3 == 0:
+            calls.append([('remove', 'key' + str((i * 7) % 20000), None)])
+        else:
+            calls.append([('put', 'key' + str(i % 20000), i)])
+    return calls
+
+
+def bench_crash_recovery(trials: int = 5) -> None:
+    """
+    Kills a process writing to a durable map with SIGKILL at a random moment, mid-batch more often than not,
+    then recovers the map and checks it holds exactly the first N operations for some N no smaller than
+    the number the writer saw complete
+    """
+    import multiprocessing
+    import random
+
+    print("\ncrash_recovery - SIGKILL the writer, recover, verify")
+    print("----------------------------------------------------")
+    print(f"{'policy':>10} {'trial':>6} {'acknowledged':>13} {'recovered':>10} {'recover ms':>11} {'ok':>4}")
+
+    generator = random.Random(15)
+    for policy in ('never', 'interval', 'always'):
+        for trial in range(trials):
+            directory = tempfile.mkdtemp()
+            path = os.path.join(directory, 'map')
+            acknowledged = multiprocessing.Value('q', 0, lock=False)
+            writer = multiprocessing.Process(target=crash_workload, args=(path, policy, acknowledged))
+            writer.start()
+            time.sleep(generator.uniform(0.3, 1.5))
+            os.kill(writer.pid, signal.SIGKILL)
+            writer.join()
+
+            try:
+                start = time.perf_counter()
+                m = hash_map_oa.HashMap.recover(path)
+                recover_s = time.perf_counter() - start
+                recovered = dict(m.items())
+                m.close_log()
+
+                # replay the operations in memory until the state matches, starting from what was acknowledged
+                expected, done, matched = {}, 0, None
+                while matched is None and done <= acknowledged.value + 300:
+                    for batch in crash_operations(done):
+                        for operation, key, value in batch:
+                            if done >= acknowledged.value and expected == recovered:
+                                matched = done
+                                break
+                            if operation == 'remove':
+                                expected.pop(key, None)
+                            else:
+                                expected[key] = value
+                            done += 1
+                        if matched is not None:
+                            break
+            finally:
+                shutil.rmtree(directory)
+
+            print(f"{policy:>10} {trial:>6} {acknowledged.value:>13,} "
+                  f"{matched if matched is not None else '-':>10} {recover_s * 1000:>11.1f} "
+                  f"{'yes' if matched is not None else 'NO':>4}")
+
+
+def zipf_trace(keys: int, requests: int, skew: float, seed: int) -> list:
+    """
+    Returns requests keys drawn from keys distinct ones with Zipf's law: key rank r is requested
+    with probability proportional to 1 / r ** skew
+    """
+    import itertools
+    import random
+
+    weights = itertools.accumulate(1 / rank ** skew for rank in range(1, keys + 1))
+    names = ['key' + str(rank) for rank in range(keys)]
+    return random.Random(seed).choices(names, cum_weights=list(weights), k=requests)
+
+
+def bench_cache() -> None:
+    """
+    Replays Zipfian traces against bounded caches of each eviction policy (get, then put on a miss)
+    and compares hit ratios and operations per second
+    """
+    keys = 100000
+    requests = 300000
+
+    print("\ncache - Zipfian traces, 300K requests over 100K keys")
+    print("---------------------------------------------------")
+    print(f"{'skew':>5} {'entries':>8} {'policy':>7} {'hit ratio':>10} {'ops/s':>10} {'evictions':>10}")
+
+    for skew in (0.8, 1.0):
+        trace = zipf_trace(keys, requests, skew, seed=16)
+        for max_entries in (1000, 10000):
+            for policy in ('lru', 'lfu', 'clock'):
+                cache = hash_map_cache.HashMap(hash, max_entries=max_entries, policy=policy)
+
+                def replay():
+                    for key in trace:
+                        if cache.get(key) is None:
+                            cache.put(key, key)
+
+                seconds = timed(replay)
+                print(f"{skew:>5} {max_entries:>8} {policy:>7} {cache.hit_ratio():>10.3f} "
+                      f"{requests / seconds:>10,.0f} {cache.evictions:>10,}")
+
+
+class ManualClock:
+    """
+    Clock for the ttl benchmark that only moves when the benchmark advances it, once per operation,
+    so expiry does not depend on how fast the machine runs or how often the map reads the clock
+    """
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def bench_ttl() -> None:
+    """
+    Puts short-lived keys into each engine, once with the expiry time stored inside the value and checked
+    on every get, and once with put's ttl, then compares ops/second and the dead entries left in the table
+    """
+    import random
+
+    operations = 200000
+    key_space = 100000
+    ttl = 10.0
+    generator = random.Random(17)
+    trace = [('key' + str(generator.randrange(key_space)), generator.random() < 0.5) for _ in range(operations)]
+
+    print("\nttl - 200K ops (50% put with a 10s ttl, 50% get) over 100K keys, the clock moving 1ms per op")
+    print("------------------------------------------------------------------------------------------")
+    print(f"{'engine':>7} {'expiry':>10} {'ops/s':>10} {'size':>8} {'live':>8} {'capacity':>9}")
+
+    for name, module in (('chain', hash_map_sc), ('open', hash_map_oa)):
+        for mode in ('in value', 'ttl'):
+            m = module.HashMap(1024, hash_functions.fnv1a)
+            if module is hash_map_sc:
+                m.set_resize_policy(max_load_factor=1.0)
+            clock = ManualClock()
+
+            if mode == 'in value':
+                def run():
+                    for key, is_put in trace:
+                        clock.now += 0.001
+                        if is_put:
+                            m.put(key, (clock() + ttl, key))
+                        else:
+                            value = m.get(key)
+                            if value is not None and value[0] <= clock():
+                                value = None
+            else:
+                m.clock = clock
+
+                def run():
+                    for key, is_put in trace:
+                        clock.now += 0.001
+                        if is_put:
+                            m.put(key, key, ttl)
+                        else:
+                            m.get(key)
+
+            seconds = timed(run)
+            now = clock.now
+            if mode == 'in value':
+                live = sum(1 for _, value in m.items() if value[0] > now)
+            else:
+                live = sum(1 for _ in m.keys())
+            print(f"{name:>7} {mode:>10} {operations / seconds:>10,.0f} {m.size:>8,} {live:>8,} {m.capacity:>9,}")
+
+
+def probe_summary(lengths: list) -> str:
+    """
+    Returns the mean, p99 and max of a list of probe lengths, formatted for a results table
+    """
+    lengths = sorted(lengths)
+    return f"{sum(lengths) / len(lengths):>6.2f} {percentile(lengths, 0.99):>4} {lengths[-1]:>4}"
+
+
+def bench_robin_hood() -> None:
+    """
+    Compares the quadratic probing map, which keeps its load at or below 0.5, against the Robin Hood map
+    filled to loads of 0.5 up to 0.9: put, hit and miss throughput, the probe lengths of hits and misses,
+    and the Robin Hood map's histogram of probe distances
+    """
+    count = 100000
+    keys = ['key' + str(i) for i in range(count)]
+    misses = ['miss' + str(i) for i in range(count)]
+
+    print("\nrobin_hood - 100K keys, quadratic probing against Robin Hood at increasing load")
+    print("-------------------------------------------------------------------------------")
+    print(f"{'engine':>10} {'load':>5} {'put/s':>10} {'hit/s':>10} {'miss/s':>10} "
+          f"{'hit mean':>8} {'p99':>4} {'max':>4} {'miss mean':>9} {'p99':>4} {'max':>4}")
+
+    m = hash_map_oa.HashMap(16, hash)
+    put_seconds = timed(lambda: [m.put(key, key) for key in keys])
+    hit_seconds = timed(lambda: [m.get(key) for key in keys])
+    miss_seconds = timed(lambda: [m.get(key) for key in misses])
+    print(f"{'quadratic':>10} {m.table_load():>5.2f} {count / put_seconds:>10,.0f} {count / hit_seconds:>10,.0f} "
+          f"{count / miss_seconds:>10,.0f} {probe_summary(oa_probe_lengths(m, keys)):>18} "
+          f"{probe_summary(oa_probe_lengths(m, misses)):>19}")
+
+    histograms = []
+    for load in (0.5, 0.75, 0.875, 0.9):
+        # a fixed capacity for the target load, with the growth threshold out of the way
+        m = hash_map_robin_hood.HashMap(int(count / load), hash)
+        m.max_load_factor = 0.95
+        put_seconds = timed(lambda: [m.put(key, key) for key in keys])
+        hit_seconds = timed(lambda: [m.get(key) for key in keys])
+        miss_seconds = timed(lambda: [m.get(key) for key in misses])
+        hits = [m.probe_length(key) for key in keys]
+        miss_lengths = [m.probe_length(key) for key in misses]
+        print(f"{'robin hood':>10} {m.table_load():>5.2f} {count / put_seconds:>10,.0f} "
+              f"{count / hit_seconds:>10,.0f} {count / miss_seconds:>10,.0f} {probe_summary(hits):>18} "
+              f"{probe_summary(miss_lengths):>19}")
+        histograms.append((load, m.probe_histogram()))
+
+    print("\nRobin Hood entries by distance from their home slot")
+    print(f"{'load':>5} " + ' '.join(f"{distance:>6}" for distance in range(8)) + f" {'8+':>6}")
+    for load, histogram in histograms:
+        histogram = histogram + [0] * (8 - len(histogram))
+        print(f"{load:>5} " + ' '.join(f"{entries:>6,}" for entries in histogram[:8]) + f" {sum(histogram[8:]):>6,}")
+
+
+def bench_cuckoo() -> None:
+    """
+    Compares hit and miss lookup latency percentiles (p50 / p99 / p999 / max), throughput and the most slots
+    (or chain nodes) any lookup examines, for the chaining map and every open addressing engine against
+    cuckoo hashing, with Python's hash and with fnv1a
+    """
+    count = 100000
+    keys = ['key' + str(i) for i in range(count)]
+    misses = ['miss' + str(i) for i in range(count)]
+    engines = (
+        ('chaining', lambda function: hash_map_sc.HashMap(count, function),
+         lambda m, keys: [m.get_linked_list(key).length() for key in keys]),
+        ('quadratic', lambda function: hash_map_oa.HashMap(16, function), oa_probe_lengths),
+        ('robin hood', lambda function: hash_map_robin_hood.HashMap(16, function),
+         lambda m, keys: [m.probe_length(key) for key in keys]),
+        ('cuckoo', lambda function: hash_map_cuckoo.HashMap(16, function),
+         lambda m, keys: [m.probe_length(key) for key in keys]),
+    )
+
+    print("\ncuckoo - get latency of 100K hits and misses (microseconds), gets/second and most slots examined")
+    print("------------------------------------------------------------------------------------------------")
+    print(f"{'function':>8} {'engine':>10} {'load':>5} {'lookup':>6} {'p50':>6} {'p99':>6} {'p999':>6} {'max':>8} "
+          f"{'gets/s':>10} {'max slots':>9}")
+
+    for function in (hash, hash_functions.fnv1a):
+        for name, create, probe_lengths in engines:
+            m = create(function)
+            m.put_many((key, key) for key in keys)
+
+            for lookup, lookup_keys in (('hit', keys), ('miss', misses)):
+                # the cyclic garbage collector is paused so its pauses do not show up as lookup latency
+                clock = time.perf_counter_ns
+                latencies = []
+                gc.disable()
+                try:
+                    for key in lookup_keys:
+                        start = clock()
+                        m.get(key)
+                        latencies.append(clock() - start)
+                finally:
+                    gc.enable()
+
+                gets_per_second = count / timed(lambda: [m.get(key) for key in lookup_keys])
+                latencies.sort()
+                print(f"{function.__name__:>8} {name:>10} {m.table_load():>5.2f} {lookup:>6} "
+                      f"{percentile(latencies, 0.5) / 1000:>6.2f} {percentile(latencies, 0.99) / 1000:>6.2f} "
+                      f"{percentile(latencies, 0.999) / 1000:>6.2f} {latencies[-1] / 1000:>8.2f} "
+                      f"{gets_per_second:>10,.0f} {max(probe_lengths(m, lookup_keys)):>9}")
+
+
+def bench_swiss() -> None:
+    """
+    Compares put, hit and miss throughput of quadratic probing against the SwissTable-style map filled to its
+    0.875 growth threshold and filled to half that, along with the Python-level comparisons per lookup: buckets probed for quadratic
+    probing (each a hash and key check) against key comparisons on tag matches for the SwissTable
+    """
+    # 2^13 groups of 16 slots at a load of exactly 0.875
+    count = 114688
+    keys = ['key' + str(i) for i in range(count)]
+    misses = ['miss' + str(i) for i in range(count)]
+
+    print("\nswiss - 115K keys, quadratic probing against SwissTable-style groups of 16")
+    print("--------------------------------------------------------------------------")
+    print(f"{'engine':>16} {'load':>5} {'put/s':>10} {'hit/s':>10} {'miss/s':>10} {'hit cmp':>8} {'miss cmp':>9}")
+
+    # the SwissTable also runs at about the load quadratic probing settles at, for the same memory per slot
+    engines = (
+        ('quadratic', hash_map_oa.HashMap, 16, oa_probe_lengths),
+        ('swiss', hash_map_swiss.HashMap, 16, lambda m, keys: [m.key_comparisons(key) for key in keys]),
+        ('swiss', hash_map_swiss.HashMap, 2 * count / 0.875, lambda m, keys: [m.key_comparisons(key) for key in keys]),
+    )
+    for function in (hash, hash_functions.fnv1a):
+        for name, engine, capacity, comparisons in engines:
+            m = engine(int(capacity), function)
+            put_seconds = timed(lambda: [m.put(key, key) for key in keys])
+            hit_seconds = timed(lambda: [m.get(key) for key in keys])
+            miss_seconds = timed(lambda: [m.get(key) for key in misses])
+            hit_comparisons = sum(comparisons(m, keys)) / count
+            miss_comparisons = sum(comparisons(m, misses)) / count
+            print(f"{name + ' ' + function.__name__:>16} {m.table_load():>5.2f} {count / put_seconds:>10,.0f} "
+                  f"{count / hit_seconds:>10,.0f} {count / miss_seconds:>10,.0f} {hit_comparisons:>8.3f} "
+                  f"{miss_comparisons:>9.3f}")
+
+
+def bench_stats() -> None:
+    """
+    Compares ops/second of each engine with statistics never enabled, enabled and then disabled again,
+    and enabled, on the same mixed workload (best of three runs), then prints part of the enabled map's snapshot
+    """
+    import random
+
+    operations = 200000
+    key_space = 50000
+    generator = random.Random(21)
+    trace = [('key' + str(generator.randrange(key_space)), generator.random()) for _ in range(operations)]
+
+    print("\nstats - 200K ops (30% put, 60% get, 10% remove) over 50K keys, with and without statistics")
+    print("-----------------------------------------------------------------------------------------")
+    print(f"{'engine':>7} {'stats':>9} {'ops/s':>10} {'overhead':>9}")
+
+    for name, module in (('chain', hash_map_sc), ('open', hash_map_oa)):
+        baseline = None
+        for mode in ('never', 'disabled', 'enabled'):
+            # best of three fresh runs, since the differences are small next to the noise
+            seconds = None
+            for _ in range(3):
+                m = module.HashMap(1024, hash_functions.fnv1a)
+                if module is hash_map_sc:
+                    m.set_resize_policy(max_load_factor=1.0)
+                if mode != 'never':
+                    m.enable_stats()
+                if mode == 'disabled':
+                    m.disable_stats()
+
+                def run():
+                    for key, draw in trace:
+                        if draw < 0.3:
+                            m.put(key, draw)
+                        elif draw < 0.9:
+                            m.get(key)
+                        else:
+                            m.remove(key)
+
+                run_seconds = timed(run)
+                seconds = min(seconds or run_seconds, run_seconds)
+            baseline = baseline or seconds
+            print(f"{name:>7} {mode:>9} {operations / seconds:>10,.0f} {seconds / baseline - 1:>9.1%}")
+
+        snapshot = m.stats.snapshot()
+        probes = snapshot['probes']['get']
+        print(f"{'':>7} hit ratio {snapshot['hit_ratio']:.3f}, {snapshot['resizes']} resizes, get probes mean "
+              f"{probes['mean']:.2f} p99 {probes['p99']} max {probes['max']}, collision rate "
+              f"{snapshot['table']['collision_rate']:.3f}")
+
+
+def bench_suite() -> None:
+    """
+    Runs the benchmark suite of benchmark_suite.py at 1K and 10K keys, once per case; run benchmark_suite.py
+    itself for bigger maps, JSON results and comparisons against a baseline
+    """
+    # imported here: benchmark_suite imports this module
+    import benchmark_suite
+
+    print("\nsuite - every operation, engine, hash function and key distribution at 1K and 10K keys")
+    print("--------------------------------------------------------------------------------------")
+    print(f"{'engine':>15} {'function':>15} {'keys':>10} {'size':>9} {'operation':>9} {'ops/s':>12}")
+    benchmark_suite.run_suite((1000, 10000), repeat=1, time_limit=10.0, report=benchmark_suite.print_case)
+
+
+def bench_numpy() -> None:
+    """
+    Compares putting and batch / one-at-a-time looking up 1M random integer IDs with the open addressing map,
+    the IDs turned into strings and hashed with fnv1a, against the NumPy map holding them as int64 keys
+    """
+    # imported here: only this benchmark needs NumPy
+    try:
+        import numpy
+        import hash_map_numpy
+    except ImportError:
+        print("\nnumpy - skipped: NumPy is not installed")
+        return
+
+    count = 1000000
+    generator = numpy.random.default_rng(23)
+    ids = generator.integers(0, 2 ** 62, count, dtype=numpy.int64)
+    missing = generator.integers(2 ** 62, 2 ** 63 - 1, count, dtype=numpy.int64)
+    sample = 100000
+
+    print("\nnumpy - 1M random int64 IDs: open addressing on str(id) with fnv1a against the NumPy map")
+    print("---------------------------------------------------------------------------------------")
+    print(f"{'engine':>12} {'put/s':>11} {'batch hit/s':>12} {'batch miss/s':>13} {'get/s':>10}")
+
+    # the string map's batch timings include turning the IDs into strings, which its callers have to do
+    oa = hash_map_oa.HashMap(16, hash_functions.fnv1a)
+    put_seconds = timed(lambda: oa.put_many(zip([str(i) for i in ids.tolist()], ids.tolist())))
+    hit_seconds = timed(lambda: oa.get_many([str(i) for i in ids.tolist()]))
+    miss_seconds = timed(lambda: oa.get_many([str(i) for i in missing.tolist()]))
+    sample_keys = [str(i) for i in ids[:sample].tolist()]
+    get_seconds = timed(lambda: [oa.get(key) for key in sample_keys])
+    rows = [('open', put_seconds, hit_seconds, miss_seconds, get_seconds)]
+
+    m = hash_map_numpy.HashMap(16, numpy.int64, numpy.int64)
+    put_seconds = timed(m.put_arrays, ids, ids)
+    hit_seconds = timed(m.get_many, ids, -1)
+    miss_seconds = timed(m.get_many, missing, -1)
+    sample_ids = ids[:sample].tolist()
+    get_seconds = timed(lambda: [m.get(key) for key in sample_ids])
+    rows.append(('numpy', put_seconds, hit_seconds, miss_seconds, get_seconds))
+
+    for name, put_seconds, hit_seconds, miss_seconds, get_seconds in rows:
+        print(f"{name:>12} {count / put_seconds:>11,.0f} {count / hit_seconds:>12,.0f} "
+              f"{count / miss_seconds:>13,.0f} {sample / get_seconds:>10,.0f}")
+    print(f"batch lookup speedup: {rows[0][2] / rows[1][2]:.1f}x hits, {rows[0][3] / rows[1][3]:.1f}x misses")
+
+
+def bench_prefilter() -> None:
+    """
+    Compares get throughput on a miss-heavy workload (90% of lookups for absent keys) without a prefilter and
+    with Bloom prefilters of a 1% and a 0.1% false positive rate, with the share of misses that got past the
+    filter and the filter's memory
+    """
+    import random
+
+    count = 100000
+    lookups = 200000
+    generator = random.Random(29)
+    keys = ['key' + str(i) for i in range(count)]
+    trace = [keys[generator.randrange(count)] if generator.random() < 0.1 else 'miss' + str(generator.randrange(10 ** 9))
+             for _ in range(lookups)]
+    misses = sum(1 for key in trace if key.startswith('miss'))
+
+    print("\nprefilter - 100K keys, 200K gets of which 90% miss, with and without a Bloom prefilter")
+    print("-------------------------------------------------------------------------------------")
+    print(f"{'engine':>7} {'function':>16} {'filter':>7} {'get/s':>10} {'passed':>7} {'filter KB':>10} {'bits/key':>9}")
+
+    for name, module in (('chain', hash_map_sc), ('open', hash_map_oa)):
+        for function in (hash_functions.fnv1a, hash_map_sc.hash_function_2):
+            for rate in (None, 0.01, 0.001):
+                m = module.HashMap(1024, function)
+                if module is hash_map_sc:
+                    m.set_resize_policy(max_load_factor=1.0)
+                m.put_many((key, key) for key in keys)
+                if rate is not None:
+                    m.set_prefilter(rate)
+
+                seconds = timed(lambda: [m.get(key) for key in trace])
+                if rate is None:
+                    passed, filter_kb, bits = '', '', ''
+                else:
+                    passed = f"{sum(1 for key in trace if key.startswith('miss') and key in m.prefilter) / misses:.2%}"
+                    filter_kb = f"{m.prefilter.memory() / 1024:,.0f}"
+                    bits = f"{m.prefilter.memory() * 8 / m.size:.1f}"
+                print(f"{name:>7} {function.__name__:>16} {str(rate or '-'):>7} {lookups / seconds:>10,.0f} "
+                      f"{passed:>7} {filter_kb:>10} {bits:>9}")
+
+
+def bench_async() -> None:
+    """
+    Grows a map to 5M entries from a task on an asyncio event loop, 1024 keys per step, while one task measures how
+    late a 1 ms sleep wakes up (the event loop's lag) and another keeps reading keys already put. Compares each
+    engine used directly, whose resizes rebuild the table in one call, against the asyncio facade. The cyclic
+    garbage collector is off during each run: its full collections of millions of nodes stall the loop for
+    seconds whichever map is used, and would hide the map's own pauses
+    """
+    count = 5000000
+    step = 1024
+    keys = ['key' + str(i) for i in range(count)]
+
+    async def grow(put_many, get, resizing) -> tuple:
+        lags = []
+        reads = [0, 0]
+        inserted = [0]
+        done = [False]
+
+        async def monitor() -> None:
+            while not done[0]:
+                start = time.perf_counter()
+                await asyncio.sleep(0.001)
+                lags.append(time.perf_counter() - start - 0.001)
+
+        async def reader() -> None:
+            while not done[0]:
+                if inserted[0]:
+                    await get(keys[reads[0] * 7919 % inserted[0]])
+                    reads[0] += 1
+                    reads[1] += resizing()
+                await asyncio.sleep(0)
+
+        tasks = [asyncio.create_task(monitor()), asyncio.create_task(reader())]
+        start = time.perf_counter()
+        for offset in range(0, count, step):
+            batch = keys[offset:offset + step]
+            await put_many(zip(batch, batch))
+            inserted[0] = offset + len(batch)
+            await asyncio.sleep(0)
+        seconds = time.perf_counter() - start
+        done[0] = True
+        await asyncio.gather(*tasks)
+        lags.sort()
+        return seconds, percentile(lags, 0.99), lags[-1], reads[0], reads[1]
+
+    def direct(engine: str) -> tuple:
+        if engine == 'chaining':
+            m = hash_map_sc.HashMap(1024, hash_functions.builtin_hash)
+            m.set_resize_policy(max_load_factor=1.0)
+        else:
+            m = hash_map_oa.HashMap(1024, hash_functions.builtin_hash)
+
+        async def put_many(items) -> None:
+            m.put_many(items)
+
+        async def get(key: str) -> object:
+            return m.get(key)
+
+        return put_many, get, lambda: m.old_buckets is not None
+
+    def facade(engine: str) -> tuple:
+        m = hash_map_async.HashMap(1024, hash_functions.builtin_hash, engine)
+        return m.put_many, m.get, lambda: m.lock.locked() or m.map.old_buckets is not None
+
+    print("\nasync - event loop lag while a map grows to 5M entries, 1024 keys per step, with a reader task")
+    print("-------------------------------------------------------------------------------------------")
+    print(f"{'engine':>16} {'map':>7} {'seconds':>8} {'p99 lag ms':>11} {'max lag ms':>11} {'reads':>9} "
+          f"{'while resizing':>15}")
+    for engine in hash_map_async.ENGINES:
+        for name, make in (('direct', direct), ('facade', facade)):
+            gc.collect()
+            gc.disable()
+            try:
+                seconds, p99, worst, reads, resizing_reads = asyncio.run(grow(*make(engine)))
+            finally:
+                gc.enable()
+            print(f"{engine:>16} {name:>7} {seconds:>8.1f} {p99 * 1e3:>11.2f} {worst * 1e3:>11.1f} {reads:>9,} "
+                  f"{resizing_reads:>15,}")
+
+
+BENCHMARKS = {
+    'sc_upsert': bench_sc_upsert,
+    'sc_resize_policy': bench_sc_resize_policy,
+    'incremental_resize': bench_incremental_resize,
+    'oa_churn': bench_oa_churn,
+    'oa_memory': bench_oa_memory,
+    'rehash_cost': bench_rehash_cost,
+    'hash_functions': bench_hash_functions,
+    'bulk_load': bench_bulk_load,
+    'batch_lookup': bench_batch_lookup,
+    'iteration': bench_iteration,
+    'concurrent': bench_concurrent,
+    'sharded': bench_sharded,
+    'shared': bench_shared,
+    'snapshot': bench_snapshot,
+    'durable': bench_durable,
+    'crash_recovery': bench_crash_recovery,
+    'cache': bench_cache,
+    'ttl': bench_ttl,
+    'robin_hood': bench_robin_hood,
+    'cuckoo': bench_cuckoo,
+    'swiss': bench_swiss,
+    'stats': bench_stats,
+    'suite': bench_suite,
+    'numpy': bench_numpy,
+    'prefilter': bench_prefilter,
+    'async': bench_async,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            sys.exit(f"unknown benchmark: {name} (choose from {', '.join(BENCHMARKS)})")
+        BENCHMARKS[name]()
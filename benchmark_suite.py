@@ -0,0 +1,295 @@
+# Description: This file contains a reproducible benchmark suite for the chaining and open addressing HashMaps, with
+# machine-readable results and a comparison against a saved baseline.
+# Run it with:
+#     python benchmark_suite.py --sizes 1000,100000 --output results.json
+# and check a later run for regressions with:
+#     python benchmark_suite.py --sizes 1000,100000 --baseline results.json
+# which exits with status 1 if any operation got slower than the baseline by more than --threshold.
+
+# Every case fills one engine with size keys of one distribution hashed by one function, then times each operation
+# in OPERATIONS on it in turn, keeping the best of --repeat fresh runs. Keys and traces come from seeded generators,
+# so the same options always measure the same work. Cases whose inserts take longer than --time-limit (such as
+# hash_function_1 on anagrams, where every key collides) are recorded as timed out instead of run to completion.
+# Sizes of 1M keys and more need several GB of memory.
+# This file contains:
+# (1) make_keys: the keys, miss keys and lookup trace of each distribution
+# (2) run_case: times every operation on one engine / function / distribution / size
+# (3) run_suite: runs every case and returns the JSON-ready results
+# (4) compare: matches results against a baseline and returns the regressions
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+
+import hash_functions
+import hash_map_oa
+import hash_map_sc
+from benchmark import timed, zipf_trace
+
+
+ENGINES = ('chaining', 'open_addressing')
+
+FUNCTIONS = {
+    'hash_function_1': hash_map_sc.hash_function_1,
+    'hash_function_2': hash_map_sc.hash_function_2,
+    'fnv1a': hash_functions.fnv1a,
+    'siphash': hash_functions.make_siphash(0),
+    'builtin_hash': hash_functions.builtin_hash,
+}
+
+DISTRIBUTIONS = ('sequential', 'random', 'zipfian', 'anagram')
+
+# timed in this order on the same map; churn replaces a quarter of the keys and remove then empties the map
+OPERATIONS = ('insert', 'overwrite', 'hit', 'miss', 'get_keys', 'iteration', 'resize', 'churn', 'remove')
+
+# the characters anagram keys are permutations of; 11 distinct characters give 39.9M keys
+ANAGRAM_LETTERS = 'abcdefghijk'
+
+# keys inserted between checks of the time limit
+CHUNK = 1024
+
+
+def make_keys(distribution: str, size: int, seed: int) -> tuple:
+    """
+    Args:
+        distribution: 'sequential' ('key' + str(i)), 'random' (random 12-letter strings), 'zipfian' (sequential
+            keys, looked up with Zipf's law at skew 1.0) or 'anagram' (permutations of one string, which all
+            have the same hash_function_1 hash)
+        size: the number of keys
+        seed: the seed of the random generator
+
+    Returns: the keys, size other keys of the same kind that are not among them, and the keys to look up
+        for the hit operation
+    """
+    if distribution == 'sequential' or distribution == 'zipfian':
+        keys = ['key' + str(i) for i in range(size)]
+        misses = ['key' + str(i) for i in range(size, 2 * size)]
+    elif distribution == 'random':
+        generator = random.Random(seed)
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        unique = {}
+        while len(unique) < 2 * size:
+            unique[''.join(generator.choices(letters, k=12))] = None
+        keys = list(unique)
+        misses = keys[size:]
+        keys = keys[:size]
+    elif distribution == 'anagram':
+        permutations = (''.join(letters) for letters in itertools.permutations(ANAGRAM_LETTERS))
+        keys = list(itertools.islice(permutations, size))
+        misses = list(itertools.islice(permutations, size))
+    else:
+        raise ValueError(f"unknown distribution: {distribution}")
+
+    lookups = zipf_trace(size, size, 1.0, seed) if distribution == 'zipfian' else keys
+    return keys, misses, lookups
+
+
+def make_map(engine: str, function) -> object:
+    """
+    Returns an empty map of the given engine with a small table, so inserting grows it as it would in use.
+    """
+    if engine == 'chaining':
+        m = hash_map_sc.HashMap(16, function)
+        m.set_resize_policy(max_load_factor=1.0)
+        return m
+    if engine == 'open_addressing':
+        return hash_map_oa.HashMap(16, function)
+    raise ValueError(f"unknown engine: {engine}")
+
+
+def run_case(engine: str, function_name: str, distribution: str, size: int, repeat: int = 3,
+             time_limit: float = 60.0, seed: int = 0) -> list:
+    """
+    Times every operation of OPERATIONS on one engine, hash function, key distribution and size, keeping
+    the fastest of repeat runs on fresh maps.
+
+    Returns: one result dict per operation, with the number of operations (or entries, for get_keys,
+        iteration and resize), the seconds they took and operations per second; or a single result with
+        operation 'insert' and status 'timeout' if filling the map took longer than time_limit seconds
+    """
+    function = FUNCTIONS[function_name]
+    keys, misses, lookups = make_keys(distribution, size, seed)
+
+    # churn: each group of four operations removes an original key, adds a miss key and gets two keys
+    quarter = size // 4
+    generator = random.Random(seed)
+    churn = []
+    for index in range(quarter):
+        churn.append((0, keys[index]))
+        churn.append((1, misses[index]))
+        churn.append((2, keys[generator.randrange(quarter, size)]))
+        churn.append((2, misses[generator.randrange(index + 1)]))
+    remaining = keys[quarter:] + misses[:quarter]
+
+    best = {}
+    case = {'engine': engine, 'function': function_name, 'distribution': distribution, 'size': size}
+    for _ in range(repeat):
+        m = make_map(engine, function)
+
+        # fill in chunks so a hopeless case is abandoned once it passes the time limit
+        start = time.perf_counter()
+        for chunk in range(0, size, CHUNK):
+            for key in keys[chunk:chunk + CHUNK]:
+                m.put(key, key)
+            if time.perf_counter() - start > time_limit:
+                return [dict(case, operation='insert', status='timeout', ops=min(chunk + CHUNK, size),
+                             seconds=time_limit)]
+        seconds = {'insert': time.perf_counter() - start}
+
+        def churn_run():
+            for operation, key in churn:
+                if operation == 0:
+                    m.remove(key)
+                elif operation == 1:
+                    m.put(key, key)
+                else:
+                    m.get(key)
+
+        seconds['overwrite'] = timed(lambda: [m.put(key, None) for key in keys])
+        seconds['hit'] = timed(lambda: [m.get(key) for key in lookups])
+        seconds['miss'] = timed(lambda: [m.get(key) for key in misses])
+        seconds['get_keys'] = timed(m.get_keys)
+        seconds['iteration'] = timed(lambda: [None for _ in m.items()])
+        seconds['resize'] = timed(m.resize_table, m.capacity * 2)
+        seconds['churn'] = timed(churn_run)
+        seconds['remove'] = timed(lambda: [m.remove(key) for key in remaining])
+
+        for operation in OPERATIONS:
+            best[operation] = min(best.get(operation, seconds[operation]), seconds[operation])
+
+    counts = {'churn': len(churn), 'remove': len(remaining)}
+    results = []
+    for operation in OPERATIONS:
+        ops = counts.get(operation, size)
+        results.append(dict(case, operation=operation, status='ok', ops=ops, seconds=best[operation],
+                            ops_per_second=ops / best[operation] if best[operation] else None))
+    return results
+
+
+def run_suite(sizes, engines=ENGINES, functions=tuple(FUNCTIONS), distributions=DISTRIBUTIONS,
+              repeat: int = 3, time_limit: float = 60.0, seed: int = 0, report=None) -> dict:
+    """
+    Runs run_case for every combination of the given sizes, engines, hash functions and distributions,
+    calling report(results) after each case, and returns the results with a description of the run:
+    {'meta': {...}, 'results': [...]}.
+    """
+    results = []
+    for size, engine, function_name, distribution in itertools.product(sizes, engines, functions, distributions):
+        case = run_case(engine, function_name, distribution, size, repeat, time_limit, seed)
+        results.extend(case)
+        if report is not None:
+            report(case)
+
+    meta = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'sizes': list(sizes),
+        'repeat': repeat,
+        'time_limit': time_limit,
+        'seed': seed,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def result_key(result: dict) -> tuple:
+    """
+    Returns what identifies a result across runs: its engine, function, distribution, size and operation.
+    """
+    return result['engine'], result['function'], result['distribution'], result['size'], result['operation']
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.1) -> list:
+    """
+    Matches every completed result with the same case and operation in baseline.
+
+    Returns: (result, baseline result, ratio of new to old ops per second) for every result slower than its
+        baseline by more than threshold (0.1 = 10%), slowest first; a case that completed in the baseline but
+        timed out now counts with a ratio of 0, and results missing from the baseline are ignored
+    """
+    old = {result_key(result): result for result in baseline['results'] if result['status'] == 'ok'}
+    regressions = []
+    for result in results['results']:
+        previous = old.get(result_key(result))
+        if previous is None:
+            continue
+        ratio = result['ops_per_second'] / previous['ops_per_second'] if result['status'] == 'ok' else 0.0
+        if ratio < 1 - threshold:
+            regressions.append((result, previous, ratio))
+    regressions.sort(key=lambda regression: regression[2])
+    return regressions
+
+
+def print_case(results: list, file=sys.stdout) -> None:
+    """
+    Prints the results of one case to file as a table row per operation.
+    """
+    for result in results:
+        speed = f"{result['ops_per_second']:>12,.0f}" if result['status'] == 'ok' else f"{result['status']:>12}"
+        print(f"{result['engine']:>15} {result['function']:>15} {result['distribution']:>10} {result['size']:>9,} "
+              f"{result['operation']:>9} {speed}", file=file, flush=True)
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the chaining and open addressing HashMaps.")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="comma-separated map sizes, from 1000 up to 10000000 (default: %(default)s)")
+    parser.add_argument('--engines', default=','.join(ENGINES), help="default: %(default)s")
+    parser.add_argument('--functions', default=','.join(FUNCTIONS), help="default: %(default)s")
+    parser.add_argument('--distributions', default=','.join(DISTRIBUTIONS), help="default: %(default)s")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per case, keeping the fastest (default: 3)")
+    parser.add_argument('--time-limit', type=float, default=60.0,
+                        help="seconds a case may spend inserting before it is abandoned (default: 60)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the results as JSON to this file ('-' for standard output)")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="slowdown that counts as a regression (default: 0.1, i.e. 10%%)")
+    arguments = parser.parse_args(argv)
+
+    sizes = [int(size) for size in arguments.sizes.split(',')]
+    engines = arguments.engines.split(',')
+    functions = arguments.functions.split(',')
+    distributions = arguments.distributions.split(',')
+    for name, chosen, known in (('engine', engines, ENGINES), ('function', functions, FUNCTIONS),
+                                ('distribution', distributions, DISTRIBUTIONS)):
+        for value in chosen:
+            if value not in known:
+                parser.error(f"unknown {name}: {value} (choose from {', '.join(known)})")
+
+    # the table goes to standard error when the JSON goes to standard output
+    table = sys.stderr if arguments.output == '-' else sys.stdout
+    print(f"{'engine':>15} {'function':>15} {'keys':>10} {'size':>9} {'operation':>9} {'ops/s':>12}", file=table)
+
+    results = run_suite(sizes, engines, functions, distributions, arguments.repeat, arguments.time_limit,
+                        arguments.seed, lambda case: print_case(case, table))
+
+    if arguments.output == '-':
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    elif arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=1)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, arguments.threshold)
+        print(f"\n{len(regressions)} regressions over {arguments.threshold:.0%} against {arguments.baseline}",
+              file=table)
+        for result, previous, ratio in regressions:
+            now = f"{result['ops_per_second']:,.0f}" if result['status'] == 'ok' else result['status']
+            print(f"{result['engine']:>15} {result['function']:>15} {result['distribution']:>10} "
+                  f"{result['size']:>9,} {result['operation']:>9} {previous['ops_per_second']:>12,.0f} -> {now}"
+                  f" ({ratio - 1:+.0%})", file=table)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,151 @@
+# Description: This file contains the blocked Bloom filter behind the prefilter of the chaining and open addressing
+# HashMaps (set_prefilter), which lets a lookup of a key that was never put return without touching the buckets.
+
+# A Bloom filter can say for certain that a key was never added, but only that one probably was: a miss passes
+# it with a small, tunable false positive rate and then searches the buckets as before. The filter is blocked:
+# every key sets k bits in a single 64-bit block, so a check is one array read and one mask comparison. Keys are
+# hashed with Python's built-in hash, mixed by one multiplication, rather than with the map's hash function: it
+# runs in C (and is cached on str objects), and it keeps the filter useful when the map's own hash function sends
+# many keys to the same value, as hash_function_1 does. The result differs between processes, so filters are
+# never saved; maps rebuild them instead. The bits of a removed key cannot be cleared, so they stay set until the
+# filter is rebuilt, which the maps do when they resize or compact and whenever more keys have been added than
+# the filter was sized for.
+# The module contains:
+# (1) BloomFilter: add keys, test them with `in`, and report the filter's memory and expected false positive rate
+# (2) block_masks: the table of k-bit masks a key's hash selects from
+
+import math
+import random
+from array import array
+
+
+MASK_64 = (1 << 64) - 1
+
+# multiplier that spreads Python's hash of small ints (which is the int itself) over all 64 bits
+MIX_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# bits of the mixed hash that pick a key's mask; the ones above them pick its block. Fewer masks make more keys
+# share the same bits, which pushes the false positive rate above what false_positive_rate expects
+MASK_BITS = 14
+MASK_INDEX = (1 << MASK_BITS) - 1
+
+# the most bits a key may set in its 64-bit block
+MAX_BITS_PER_KEY = 16
+
+# masks for each number of bits per key, built the first time it is needed
+MASKS = {}
+
+
+def block_masks(bits_per_key: int) -> array:
+    """
+    Returns the 2 ** MASK_BITS masks for bits_per_key bits per key: each sets bits_per_key distinct bits
+    chosen at random, from a generator seeded with bits_per_key so every filter uses the same table.
+    """
+    if bits_per_key not in MASKS:
+        generator = random.Random(bits_per_key)
+        masks = array('Q')
+        for _ in range(1 << MASK_BITS):
+            mask = 0
+            for bit in generator.sample(range(64), bits_per_key):
+                mask |= 1 << bit
+            masks.append(mask)
+        MASKS[bits_per_key] = masks
+    return MASKS[bits_per_key]
+
+
+def false_positive_rate(count: int, blocks: int, bits_per_key: int) -> float:
+    """
+    Returns the expected false positive rate of a filter of blocks 64-bit blocks holding count keys: the chance
+    that all bits of a new key are set, averaged over the Poisson-distributed number of keys in its block.
+    """
+    load = count / blocks
+    probability = math.exp(-load)
+    rate = 0.0
+    # sum the Poisson terms out to well past the mean
+    for keys in range(int(load + 10 * math.sqrt(load) + 20)):
+        if keys:
+            probability *= load / keys
+        rate += probability * (1 - (1 - bits_per_key / 64) ** keys) ** bits_per_key
+    return rate
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, target_rate: float = 0.01) -> None:
+        """
+        Initializes an empty filter sized so that once capacity keys have been added, the expected false
+        positive rate is at most target_rate (between 0 and 1): the smallest number of blocks for which some
+        number of bits per key reaches it, with that number of bits.
+        """
+        if not 0 < target_rate < 1:
+            raise ValueError("target_rate must be between 0 and 1")
+        self.capacity = max(capacity, 1)
+        self.target_rate = target_rate
+
+        # start from the bits a classic Bloom filter would need and add blocks until the blocked one gets there
+        blocks = max(math.ceil(self.capacity * -math.log(target_rate) / math.log(2) ** 2 / 64), 1)
+        while True:
+            rates = [(false_positive_rate(self.capacity, blocks, bits), bits)
+                     for bits in range(1, MAX_BITS_PER_KEY + 1)]
+            rate, bits = min(rates)
+            if rate <= target_rate:
+                break
+            blocks = math.ceil(blocks * 1.05)
+
+        self.bits_per_key = bits
+        self.masks = block_masks(bits)
+        self.blocks = array('Q', bytes(8 * blocks))
+        self.count = 0
+
+    def add(self, key: object) -> None:
+        """
+        Sets the key's bits. count only goes up when that changes the filter, so adding keys that are
+        already in it (as resizing a map does) does not use up capacity.
+        """
+        mixed = (hash(key) * MIX_MULTIPLIER) & MASK_64
+        index = ((mixed >> MASK_BITS) * len(self.blocks)) >> (64 - MASK_BITS)
+        mask = self.masks[mixed & MASK_INDEX]
+        block = self.blocks[index]
+        if block & mask != mask:
+            self.blocks[index] = block | mask
+            self.count += 1
+
+    def __contains__(self, key: object) -> bool:
+        """
+        Returns False if the key was certainly never added, and True if it probably was.
+        """
+        # the low bits of the mixed hash pick the mask, and the rest of it is scaled down to a block index
+        mixed = (hash(key) * MIX_MULTIPLIER) & MASK_64
+        mask = self.masks[mixed & MASK_INDEX]
+        return self.blocks[((mixed >> MASK_BITS) * len(self.blocks)) >> (64 - MASK_BITS)] & mask == mask
+
+    def is_full(self) -> bool:
+        """
+        Returns True once more keys have been added than the filter was sized for.
+        """
+        return self.count > self.capacity
+
+    def memory(self) -> int:
+        """
+        Returns the size of the filter's bits in bytes; the 128 KB table of masks is shared by every filter
+        with the same number of bits per key.
+        """
+        return len(self.blocks) * self.blocks.itemsize
+
+    def false_positive_rate(self) -> float:
+        """
+        Returns the expected false positive rate with the keys added so far.
+        """
+        return false_positive_rate(self.count, len(self.blocks), self.bits_per_key)
+
+
+if __name__ == "__main__":
+
+    print("\nfalse positive rates")
+    print("--------------------")
+    for target in (0.1, 0.01, 0.001):
+        bloom = BloomFilter(10000, target)
+        for i in range(10000):
+            bloom.add('key' + str(i))
+        misses = sum(1 for i in range(100000) if 'miss' + str(i) in bloom)
+        print(target, bloom.bits_per_key, bloom.memory(), round(bloom.false_positive_rate(), 5), misses / 100000,
+              all('key' + str(i) in bloom for i in range(10000)))
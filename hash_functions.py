@@ -0,0 +1,164 @@
+# Description: This file contains hash functions that can be passed to either HashMap in place of
+# hash_function_1 / hash_function_2, plus checks of how well a hash function distributes keys.
+
+# hash_function_1 sums the characters, so every anagram collides and short keys land in a tiny range;
+# hash_function_2 only weights each character by its position. The functions here spread keys over the
+# full 64-bit range:
+# (1) fnv1a: 64-bit FNV-1a over the key's UTF-8 bytes
+# (2) make_siphash: returns a SipHash-2-4 keyed hash for a given seed, for keys chosen by untrusted users
+# (3) builtin_hash: Python's built-in hash (implemented in C) followed by the MurmurHash3 64-bit finalizer
+# and two quality checks:
+# (4) chi_square: how evenly a hash function spreads keys over a number of buckets
+# (5) avalanche: how many output bits change when one input bit changes
+
+MASK_64 = (1 << 64) - 1
+
+FNV_OFFSET_BASIS = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+
+
+def fnv1a(key: str) -> int:
+    """
+    Returns the 64-bit FNV-1a hash of the key's UTF-8 bytes.
+    """
+    hash = FNV_OFFSET_BASIS
+    for byte in key.encode():
+        hash = ((hash ^ byte) * FNV_PRIME) & MASK_64
+    return hash
+
+
+def fmix64(hash: int) -> int:
+    """
+    MurmurHash3's 64-bit finalizer: mixes every input bit into every output bit.
+    """
+    hash &= MASK_64
+    hash ^= hash >> 33
+    hash = (hash * 0xff51afd7ed558ccd) & MASK_64
+    hash ^= hash >> 33
+    hash = (hash * 0xc4ceb9fe1a85ec53) & MASK_64
+    hash ^= hash >> 33
+    return hash
+
+
+def builtin_hash(key: str) -> int:
+    """
+    Returns Python's built-in hash of the key passed through fmix64.
+    The fastest option here, but string hashes are randomized per process (see PYTHONHASHSEED),
+    so the result must not be stored or shared between processes.
+    """
+    return fmix64(hash(key))
+
+
+# the result differs between processes, so stored hashes must not be reused (see snapshot.is_stable)
+builtin_hash.stable = False
+
+
+def rotate_left(value: int, bits: int) -> int:
+    """
+    Rotates a 64-bit value left by the given number of bits.
+    """
+    return ((value << bits) | (value >> (64 - bits))) & MASK_64
+
+
+def siphash24(k0: int, k1: int, data: bytes) -> int:
+    """
+    Returns the SipHash-2-4 hash of data under the 128-bit key (k0, k1).
+    """
+    v0 = k0 ^ 0x736f6d6570736575
+    v1 = k1 ^ 0x646f72616e646f6d
+    v2 = k0 ^ 0x6c7967656e657261
+    v3 = k1 ^ 0x7465646279746573
+
+    def rounds(count: int) -> None:
+        nonlocal v0, v1, v2, v3
+        for _ in range(count):
+            v0 = (v0 + v1) & MASK_64
+            v1 = rotate_left(v1, 13) ^ v0
+            v0 = rotate_left(v0, 32)
+            v2 = (v2 + v3) & MASK_64
+            v3 = rotate_left(v3, 16) ^ v2
+            v0 = (v0 + v3) & MASK_64
+            v3 = rotate_left(v3, 21) ^ v0
+            v2 = (v2 + v1) & MASK_64
+            v1 = rotate_left(v1, 17) ^ v2
+            v2 = rotate_left(v2, 32)
+
+    # compress every full 8-byte word
+    length = len(data)
+    end = length - length % 8
+    for offset in range(0, end, 8):
+        word = int.from_bytes(data[offset:offset + 8], 'little')
+        v3 ^= word
+        rounds(2)
+        v0 ^= word
+
+    # the last word holds the remaining bytes and the length in its top byte
+    word = int.from_bytes(data[end:], 'little') | ((length & 0xff) << 56)
+    v3 ^= word
+    rounds(2)
+    v0 ^= word
+
+    v2 ^= 0xff
+    rounds(4)
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+def make_siphash(seed: int):
+    """
+    Returns a hash function that computes SipHash-2-4 of a key's UTF-8 bytes, keyed by the given seed.
+    Without the seed, nobody can pick keys that collide, so it is safe for keys chosen by untrusted users.
+    """
+    k0 = fmix64(seed)
+    k1 = fmix64(seed ^ 0x9e3779b97f4a7c15)
+
+    def siphash(key: str) -> int:
+        return siphash24(k0, k1, key.encode())
+
+    return siphash
+
+
+def chi_square(function, keys: list, buckets: int) -> float:
+    """
+    Returns the chi-square statistic of the bucket counts hash % buckets for the given keys, divided by
+    its degrees of freedom. A uniform hash gives about 1.0; much larger values mean keys pile up in some buckets.
+    """
+    counts = [0] * buckets
+    for key in keys:
+        counts[function(key) % buckets] += 1
+
+    expected = len(keys) / buckets
+    statistic = sum((count - expected) ** 2 for count in counts) / expected
+    return statistic / (buckets - 1)
+
+
+def avalanche(function, keys: list, bits: int = 64) -> tuple:
+    """
+    Flips each of the low 7 bits of each character of every key and records which of the
+    low output bits change.
+    Returns (mean, worst): the average probability that an output bit flips, ideally 0.5,
+    and the largest distance of any single output bit's flip probability from 0.5.
+    """
+    flips = [0] * bits
+    trials = 0
+    for key in keys:
+        hash = function(key)
+        for position in range(len(key)):
+            for bit in range(7):
+                changed = key[:position] + chr(ord(key[position]) ^ (1 << bit)) + key[position + 1:]
+                difference = hash ^ function(changed)
+                for output_bit in range(bits):
+                    flips[output_bit] += (difference >> output_bit) & 1
+                trials += 1
+
+    probabilities = [count / trials for count in flips]
+    mean = sum(probabilities) / bits
+    worst = max(abs(probability - 0.5) for probability in probabilities)
+    return mean, worst
+
+
+if __name__ == "__main__":
+
+    keys = ['key' + str(i) for i in range(10000)]
+    for name, function in (('fnv1a', fnv1a), ('siphash', make_siphash(42)), ('builtin_hash', builtin_hash)):
+        mean, worst = avalanche(function, keys[:200])
+        print(name, round(chi_square(function, keys, 1024), 2), round(mean, 3), round(worst, 3))
@@ -0,0 +1,408 @@
+# Description: This file contains an asyncio facade over the chaining and open addressing HashMaps, for services
+# that run on an event loop and cannot let a single call on the map stall every other task.
+
+# There is one class: HashMap, which owns a hash_map_sc.HashMap or hash_map_oa.HashMap and exposes awaitable
+# methods. Single-key operations run the engine's code directly, and every chunk of them yields to the loop once,
+# so a task awaiting puts in a tight loop does not starve the others. Everything whose cost grows with the table
+# is cut into chunks of buckets with a yield to the loop after each one:
+#   growing builds the new table a chunk at a time, switches the engine to it with an incremental resize
+#   (start_resize), and a background task moves the old buckets over a chunk at a time; the engines look keys
+#   up in both tables while that runs, so reads are served and writes carry on throughout
+#   compacting (open addressing) is the same rebuild at the same capacity, which leaves the tombstones behind
+#   clear, get_keys and save (a snapshot file, see snapshot.py) work through the table a chunk at a time
+# Writers wait only while a new table is being built or a consistent view is being collected (get_keys, save);
+# readers never wait. The engine's own resizes, which would rebuild the table in one call, never fire: put
+# makes room before the engine would, and automatic compaction on remove is done here instead.
+# The HashMap class contains:
+# (1) put / get / remove / contains_key: awaitable single-key operations
+# (2) put_many / get_many / contains_many: batched variants that yield to the loop between chunks
+# (3) keys / values / items / async for: iterate a chunk of buckets at a time
+# (4) resize_table / compact: rebuild the table cooperatively
+# (5) clear / get_keys / save: the other whole-table operations, chunked
+# (6) finish_resize: completes an incremental resize in progress, a chunk at a time
+
+import asyncio
+from array import array
+from itertools import islice
+
+from a6_include import *
+import hash_map_oa
+import hash_map_sc
+
+
+ENGINES = {'chaining': hash_map_sc, 'open_addressing': hash_map_oa}
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, engine: str = 'chaining', chunk: int = 1024) -> None:
+        """
+        Init new asyncio HashMap over an engine ('chaining' or 'open_addressing') of the given capacity. chunk is
+        the number of buckets (or keys, for batches) handled between two yields to the event loop.
+        """
+        if engine not in ENGINES:
+            raise ValueError("engine must be one of " + ', '.join(ENGINES))
+        if chunk < 1:
+            raise ValueError("chunk must be at least 1")
+
+        self.map = ENGINES[engine].HashMap(capacity, function)
+        if engine == 'chaining':
+            self.map.set_resize_policy(max_load_factor=1.0)
+        else:
+            # tombstones are cleared by compact below, which yields while it works
+            self.map.compact_threshold = None
+        # the background task below does the moving, so each operation moves only the least it can
+        self.map.set_incremental_resize(1)
+
+        self.chunk = chunk
+        self.operations = 0
+        # held while a new table is built or a consistent view is collected; writers wait for it, readers do not
+        self.lock = asyncio.Lock()
+        # the task moving buckets into a new table in the background, if one is running
+        self.migration = None
+
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return self.map.size
+
+    @property
+    def size(self) -> int:
+        """
+        The number of key/value pairs in the hash map.
+        """
+        return self.map.size
+
+    @property
+    def capacity(self) -> int:
+        """
+        The capacity of the current table.
+        """
+        return self.map.capacity
+
+    def is_chaining(self) -> bool:
+        """
+        Returns True if the engine is the chaining HashMap.
+        """
+        return isinstance(self.map, hash_map_sc.HashMap)
+
+    async def tick(self) -> None:
+        """
+        Counts one operation and yields to the event loop once every chunk of them.
+        """
+        self.operations += 1
+        if self.operations >= self.chunk:
+            self.operations = 0
+            await asyncio.sleep(0)
+
+    async def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map. Replaces the given key's old value with the new given value
+        if the key already exists in the hash map. Otherwise, it will add the new key/value pair. Waits while
+        a new table is being built, which this put starts itself if the table is full.
+        """
+        async with self.lock:
+            await self.make_room(1)
+            self.map.put(key, value)
+        await self.tick()
+
+    async def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key or None if the key is not found.
+        """
+        value = self.map.get(key)
+        await self.tick()
+        return value
+
+    async def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map; otherwise returns False.
+        """
+        found = self.map.contains_key(key)
+        await self.tick()
+        return found
+
+    async def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map; does nothing if key is not found.
+        On open addressing, compacts the table once tombstones fill a quarter of it.
+        """
+        async with self.lock:
+            self.map.remove(key)
+            threshold = hash_map_oa.HashMap.compact_threshold
+            if not self.is_chaining() and self.map.tombstones > threshold * self.map.capacity:
+                await self.rebuild(self.map.capacity)
+        await self.tick()
+
+    async def put_many(self, items) -> None:
+        """
+        Puts every key/value pair from an iterable of pairs, a chunk at a time, making room for each chunk
+        before it goes in and yielding to the loop after it.
+        """
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, self.chunk))
+            if not batch:
+                return
+
+            async with self.lock:
+                await self.make_room(len(batch))
+                # the engines' put_many finishes any incremental resize first, so while one is running
+                # the pairs go in one by one instead
+                if self.map.old_buckets is None:
+                    self.map.put_many(batch)
+                else:
+                    for key, value in batch:
+                        self.map.put(key, value)
+            await asyncio.sleep(0)
+
+    async def get_many(self, keys, default: object = None) -> list:
+        """
+        Returns a list with the value of each of the given keys, in the same order, or default for keys
+        that are not in the hash map. Looks them up a chunk at a time.
+        """
+        values = []
+        iterator = iter(keys)
+        while True:
+            batch = list(islice(iterator, self.chunk))
+            if not batch:
+                return values
+            values.extend(self.map.get_many(batch, default))
+            await asyncio.sleep(0)
+
+    async def contains_many(self, keys) -> list:
+        """
+        Returns a list with True for each of the given keys that is in the hash map and False otherwise,
+        in the same order as the keys. Looks them up a chunk at a time.
+        """
+        found = []
+        iterator = iter(keys)
+        while True:
+            batch = list(islice(iterator, self.chunk))
+            if not batch:
+                return found
+            found.extend(self.map.contains_many(batch))
+            await asyncio.sleep(0)
+
+    def __aiter__(self):
+        """
+        Iterates over the keys of the hash map with async for, like keys().
+        """
+        return self.keys()
+
+    async def keys(self):
+        """
+        Yields every key in the hash map.
+        """
+        async for key, _ in self.items():
+            yield key
+
+    async def values(self):
+        """
+        Yields every value in the hash map.
+        """
+        async for _, value in self.items():
+            yield value
+
+    async def items(self):
+        """
+        Yields every (key, value) pair in bucket order, yielding to the loop after each chunk of buckets.
+        Raises RuntimeError if keys are added, removed or moved while the iteration is in progress, like
+        the engines' iterators; replacing the value of an existing key is allowed.
+        """
+        await self.finish_resize()
+        m = self.map
+        modifications = m.modifications
+
+        for start in range(0, m.capacity, self.chunk):
+            for key, value in self.bucket_items(start, min(start + self.chunk, m.capacity)):
+                yield key, value
+                if m.modifications != modifications:
+                    raise RuntimeError("HashMap changed during iteration")
+            await asyncio.sleep(0)
+            if m.modifications != modifications:
+                raise RuntimeError("HashMap changed during iteration")
+
+    async def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys stored in the hash map. Writers wait until
+        it is done, so the keys are those of a single moment.
+        """
+        keys_array = DynamicArray()
+        async with self.lock:
+            await self.finish_resize()
+            for start in range(0, self.map.capacity, self.chunk):
+                for key, _ in self.bucket_items(start, min(start + self.chunk, self.map.capacity)):
+                    keys_array.append(key)
+                await asyncio.sleep(0)
+        return keys_array
+
+    async def clear(self) -> None:
+        """
+        Clears the contents of the hash map; it does not change the underlying hash table capacity.
+        The empty table is built a chunk at a time before it replaces the current one.
+        """
+        async with self.lock:
+            # a migration still running could grow the table while the empty one is being built
+            await self.finish_resize()
+            buckets = await self.new_table(self.map.capacity)
+            self.map.clear(buckets)
+
+    async def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the internal hash table, building the new table and moving the key/value pairs
+        into it a chunk of buckets at a time. Returns once the new table is in use; the remaining buckets
+        are moved by a background task (await finish_resize to wait for it).
+        """
+        async with self.lock:
+            await self.rebuild(new_capacity)
+
+    async def compact(self) -> None:
+        """
+        Rebuilds an open addressing table at the same capacity, clearing out every tombstone, a chunk
+        at a time. Does nothing on a chaining map, which has no tombstones.
+        """
+        if self.is_chaining():
+            return
+        async with self.lock:
+            await self.rebuild(self.map.capacity)
+
+    async def save(self, path: str) -> None:
+        """
+        Writes the hash map to a snapshot file at path, in the format of the engines' save (see snapshot.py).
+        The entries are collected a chunk of buckets at a time while writers wait, then encoded and written
+        to the file in a worker thread.
+        """
+        # imported here: snapshot imports the other HashMap modules
+        import snapshot
+
+        async with self.lock:
+            await self.finish_resize()
+            m = self.map
+            entries = []
+            if self.is_chaining():
+                engine, index, collect = snapshot.SC, array('q', [0]), snapshot.collect_sc
+            else:
+                engine, index, collect = snapshot.OA, array('q', [snapshot.EMPTY_SLOT]) * m.capacity, snapshot.collect_oa
+            for start in range(0, m.capacity, self.chunk):
+                collect(m, start, min(start + self.chunk, m.capacity), index, entries)
+                await asyncio.sleep(0)
+            capacity, function = m.capacity, m.hash_function
+
+        await asyncio.to_thread(snapshot.write, path, engine, capacity, function, index, entries)
+
+    async def finish_resize(self) -> None:
+        """
+        Completes any incremental resize in progress, moving a chunk of buckets at a time.
+        """
+        while self.map.old_buckets is not None:
+            self.map.rehash_some(self.chunk)
+            await asyncio.sleep(0)
+
+    async def make_room(self, count: int) -> None:
+        """
+        Rebuilds the table, cooperatively, if count more keys could make the engine resize or compact
+        it in one call. Called with the lock held.
+        """
+        m = self.map
+        if self.is_chaining():
+            new_capacity = m.policy_capacity(m.size + count)
+            if new_capacity > m.capacity:
+                await self.rebuild(new_capacity)
+            return
+
+        # open addressing keeps live entries and tombstones below half the table; when live entries
+        # alone would fill less than a quarter of it, clearing out the tombstones is enough
+        if m.size + m.tombstones + count < 0.5 * m.capacity:
+            return
+        new_capacity = m.capacity
+        if m.size + count >= 0.25 * new_capacity:
+            # otherwise double, as put would, until the keys fit
+            new_capacity *= 2
+            while m.size + count >= 0.5 * new_capacity:
+                new_capacity *= 2
+        await self.rebuild(new_capacity)
+
+    async def rebuild(self, new_capacity: int) -> None:
+        """
+        Builds an empty table of new_capacity a chunk at a time, switches the engine to it and starts the
+        background task that moves the old buckets over. Called with the lock held.
+        """
+        # open addressing needs a bucket for every key
+        if new_capacity < 1 or (not self.is_chaining() and new_capacity < self.map.size):
+            return
+
+        # only one migration can be in flight at a time
+        await self.finish_resize()
+        buckets = await self.new_table(new_capacity)
+        self.map.start_resize(new_capacity, buckets)
+        self.migration = asyncio.get_running_loop().create_task(self.finish_resize())
+
+    async def new_table(self, capacity: int) -> DynamicArray:
+        """
+        Returns an empty table of the engine's kind with the given capacity, built a chunk of buckets
+        at a time.
+        """
+        buckets = DynamicArray()
+        # filled through the underlying list, as the engines' batch methods read it
+        data = buckets.data
+        for start in range(0, capacity, self.chunk):
+            count = min(self.chunk, capacity - start)
+            if self.is_chaining():
+                data.extend([LinkedList() for _ in range(count)])
+            else:
+                data.extend([None] * count)
+            await asyncio.sleep(0)
+        return buckets
+
+    def bucket_items(self, start: int, stop: int) -> list:
+        """
+        Returns the (key, value) pairs stored in buckets start to stop of the current table,
+        skipping tombstones and expired keys.
+        """
+        m = self.map
+        buckets = m.buckets.data
+        now = m.clock() if m.expiring else None
+        pairs = []
+        if self.is_chaining():
+            for index in range(start, stop):
+                for node in buckets[index]:
+                    if now is None or not m.is_expired(node, now):
+                        pairs.append((node.key, node.value))
+        else:
+            for index in range(start, stop):
+                entry = buckets[index]
+                if m.is_live(entry, now):
+                    pairs.append((entry.key, entry.value))
+        return pairs
+
+
+if __name__ == "__main__":
+
+    async def main() -> None:
+        for engine in ENGINES:
+            print("\n" + engine)
+            print("-" * len(engine))
+            m = HashMap(8, hash_map_sc.hash_function_2, engine, chunk=16)
+            await m.put_many(('key' + str(i), i) for i in range(500))
+            for i in range(0, 500, 2):
+                await m.remove('key' + str(i))
+            await m.put('extra', -1)
+            await m.finish_resize()
+            keys = await m.get_keys()
+            print(m.size, m.capacity, keys.length(), await m.get('key1'), await m.get('key2'),
+                  await m.contains_many(['key3', 'key4', 'extra']))
+            count = 0
+            async for _ in m:
+                count += 1
+            await m.clear()
+            print(count, m.size, m.capacity)
+
+            # the engine's statistics wrapper takes the table the facade builds for a resize
+            m = HashMap(8, hash_map_sc.hash_function_2, engine, chunk=16)
+            stats = m.map.enable_stats()
+            await m.put_many(('key' + str(i), i) for i in range(500))
+            await m.finish_resize()
+            print(m.size, m.capacity, stats.resizes, stats.resize_micros.count, await m.get('key499'))
+
+    asyncio.run(main())
@@ -0,0 +1,434 @@
+# Description: This file contains a bounded cache built on the chaining HashMap in hash_map_sc.py, which
+# evicts entries once it holds too many of them, or once their estimated size goes over a byte budget.
+
+# The chaining HashMap maps each key to a CacheEntry holding the value. The entries are also threaded onto the
+# eviction policy's own doubly linked lists through their prev / next fields, so finding, moving and evicting
+# an entry are all O(1); the entries stay the same objects when the HashMap resizes and copies its nodes.
+# There are three eviction policies, each with insert / access / remove / clear / victim methods:
+# (1) LRUPolicy: evicts the least recently used entry; one list ordered by last use
+# (2) LFUPolicy: evicts the least frequently used entry, the least recently used among ties; a list of
+#     FrequencyNodes in increasing order of use count, each with the list of entries used that many times
+# (3) ClockPolicy: an approximation of LRU that never moves entries on a hit; entries sit on a ring and a hit
+#     only sets the entry's referenced bit, which the clock hand clears as it sweeps round looking for a victim
+# and one class: HashMap, the cache, which contains:
+# (4) get / put / remove / contains_key / clear: the map methods, with get counting hits and misses
+# (5) hits / misses / evictions / hit_ratio: the counters
+
+import sys
+
+import hash_map_sc
+from a6_include import *
+from hash_map_sc import hash_function_1, hash_function_2
+
+
+class CacheEntry:
+    def __init__(self, key: str, value: object, size: int) -> None:
+        """
+        Initializes an entry of the cache: its key, value, estimated size in bytes and policy bookkeeping.
+        """
+        self.key = key
+        self.value = value
+        self.size = size
+        self.prev = None
+        self.next = None
+        # LFU: the FrequencyNode the entry is listed under; CLOCK: whether it was used since the hand passed
+        self.frequency = None
+        self.referenced = False
+
+
+class EntryList:
+    def __init__(self) -> None:
+        """
+        Initializes an empty circular doubly linked list of CacheEntries, with a sentinel as its head.
+        The most recently added entry is right after the sentinel and the oldest is right before it.
+        """
+        self.sentinel = CacheEntry(None, None, 0)
+        self.sentinel.prev = self.sentinel.next = self.sentinel
+
+    def is_empty(self) -> bool:
+        """
+        Returns True if the list holds no entries.
+        """
+        return self.sentinel.next is self.sentinel
+
+    def push_front(self, entry: CacheEntry) -> None:
+        """
+        Links the entry in right after the sentinel.
+        """
+        entry.prev = self.sentinel
+        entry.next = self.sentinel.next
+        self.sentinel.next.prev = entry
+        self.sentinel.next = entry
+
+    def unlink(self, entry: CacheEntry) -> None:
+        """
+        Unlinks the entry from the list it is in.
+        """
+        entry.prev.next = entry.next
+        entry.next.prev = entry.prev
+        entry.prev = entry.next = None
+
+    def clear(self) -> None:
+        """
+        Empties the list.
+        """
+        self.sentinel.prev = self.sentinel.next = self.sentinel
+
+    def oldest(self) -> CacheEntry:
+        """
+        Returns the entry right before the sentinel, or None if the list is empty.
+        """
+        return None if self.is_empty() else self.sentinel.prev
+
+
+class LRUPolicy:
+    def __init__(self) -> None:
+        """
+        Initializes the least recently used policy: one list, most recently used first.
+        """
+        self.entries = EntryList()
+
+    def insert(self, entry: CacheEntry) -> None:
+        """
+        Starts tracking a new entry.
+        """
+        self.entries.push_front(entry)
+
+    def access(self, entry: CacheEntry) -> None:
+        """
+        Records a use of the entry.
+        """
+        self.entries.unlink(entry)
+        self.entries.push_front(entry)
+
+    def remove(self, entry: CacheEntry) -> None:
+        """
+        Stops tracking the entry.
+        """
+        self.entries.unlink(entry)
+
+    def clear(self) -> None:
+        """
+        Stops tracking every entry.
+        """
+        self.entries.clear()
+
+    def victim(self) -> CacheEntry:
+        """
+        Returns the entry to evict next, or None if there are none.
+        """
+        return self.entries.oldest()
+
+
+class FrequencyNode:
+    def __init__(self, count: int) -> None:
+        """
+        Initializes the list of the LFU entries used count times, to be linked in between the other counts.
+        """
+        self.count = count
+        self.entries = EntryList()
+        self.prev = None
+        self.next = None
+
+
+class LFUPolicy:
+    def __init__(self) -> None:
+        """
+        Initializes the least frequently used policy: a circular list of FrequencyNodes in increasing order
+        of count, whose sentinel's next is the lowest count, so an access moves an entry to the next node
+        and eviction takes from the first node.
+        """
+        self.head = FrequencyNode(0)
+        self.head.prev = self.head.next = self.head
+
+    def insert(self, entry: CacheEntry) -> None:
+        """
+        Starts tracking a new entry.
+        """
+        self.move(entry, self.head)
+
+    def access(self, entry: CacheEntry) -> None:
+        """
+        Records a use of the entry.
+        """
+        node = entry.frequency
+        node.entries.unlink(entry)
+        self.move(entry, node)
+        if node.entries.is_empty():
+            self.drop(node)
+
+    def remove(self, entry: CacheEntry) -> None:
+        """
+        Stops tracking the entry.
+        """
+        node = entry.frequency
+        node.entries.unlink(entry)
+        if node.entries.is_empty():
+            self.drop(node)
+
+    def clear(self) -> None:
+        """
+        Stops tracking every entry.
+        """
+        self.head.prev = self.head.next = self.head
+
+    def victim(self) -> CacheEntry:
+        """
+        Returns the entry to evict next, or None if there are none.
+        """
+        first = self.head.next
+        return None if first is self.head else first.entries.oldest()
+
+    def move(self, entry: CacheEntry, node: FrequencyNode) -> None:
+        """
+        Adds the entry to the FrequencyNode for one more use than node, creating it after node if needed.
+        """
+        following = node.next
+        if following is self.head or following.count != node.count + 1:
+            following = FrequencyNode(node.count + 1)
+            following.prev = node
+            following.next = node.next
+            node.next.prev = following
+            node.next = following
+
+        following.entries.push_front(entry)
+        entry.frequency = following
+
+    def drop(self, node: FrequencyNode) -> None:
+        """
+        Unlinks an empty FrequencyNode.
+        """
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+
+class ClockPolicy:
+    def __init__(self) -> None:
+        """
+        Initializes the CLOCK policy: a ring of entries and a hand, which is the sentinel's position.
+        New entries go in just behind the hand, so they are the last it reaches.
+        """
+        self.entries = EntryList()
+
+    def insert(self, entry: CacheEntry) -> None:
+        """
+        Starts tracking a new entry.
+        """
+        entry.referenced = False
+        self.entries.push_front(entry)
+
+    def access(self, entry: CacheEntry) -> None:
+        """
+        Records a use of the entry.
+        """
+        entry.referenced = True
+
+    def remove(self, entry: CacheEntry) -> None:
+        """
+        Stops tracking the entry.
+        """
+        self.entries.unlink(entry)
+
+    def clear(self) -> None:
+        """
+        Stops tracking every entry.
+        """
+        self.entries.clear()
+
+    def victim(self) -> CacheEntry:
+        """
+        Returns the entry to evict next, or None if there are none.
+        """
+        # sweep backwards from the hand, giving every referenced entry a second chance; each entry is
+        # passed at most once per reference, so eviction is O(1) amortized
+        while True:
+            entry = self.entries.oldest()
+            if entry is None or not entry.referenced:
+                return entry
+            entry.referenced = False
+            self.entries.unlink(entry)
+            self.entries.push_front(entry)
+
+
+POLICIES = {'lru': LRUPolicy, 'lfu': LFUPolicy, 'clock': ClockPolicy}
+
+
+def entry_size(key: str, value: object) -> int:
+    """
+    Returns the default size estimate of an entry: sys.getsizeof of its key and of its value.
+    """
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class HashMap:
+    def __init__(self, function, max_entries: int = None, max_bytes: int = None, policy: str = 'lru',
+                 sizeof=entry_size) -> None:
+        """
+        Init new bounded cache. Once it holds more than max_entries entries, or its entries' sizes (as estimated
+        by sizeof(key, value)) add up to more than max_bytes, entries are evicted as chosen by policy:
+        'lru', 'lfu', 'clock', or an object with the same methods as those policies.
+        """
+        if max_entries is None and max_bytes is None:
+            raise ValueError("give max_entries, max_bytes or both")
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.policy = POLICIES[policy]() if isinstance(policy, str) else policy
+
+        # a count limit fixes the table size (one spare bucket covers the put before an eviction);
+        # a byte budget leaves it to the resize policy
+        self.map = hash_map_sc.HashMap(max_entries + 1 if max_entries is not None else 16, function)
+        self.map.set_resize_policy(max_load_factor=1.0)
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """
+        Returns the number of entries in the cache.
+        """
+        return self.map.size
+
+    @property
+    def size(self) -> int:
+        """
+        The number of entries in the cache.
+        """
+        return self.map.size
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Returns the value cached for the given key, counting a hit, or default if it is not cached,
+        counting a miss.
+        """
+        entry = self.map.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self.policy.access(entry)
+        return entry.value
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Caches the value for the given key, replacing any value cached for it, then evicts entries until
+        the cache is back within its limits. A value bigger than max_bytes on its own is not cached, and
+        drops whatever was cached for the key without evicting anything else.
+        """
+        size = self.sizeof(key, value) if self.max_bytes is not None else 0
+        entry = self.map.get(key)
+
+        # a value that cannot fit must not evict the rest of the cache to make room; it only
+        # replaces what was cached for the key
+        if self.max_bytes is not None and size > self.max_bytes:
+            if entry is not None:
+                self.discard(entry)
+            return
+
+        if entry is not None:
+            self.bytes += size - entry.size
+            entry.value = value
+            entry.size = size
+            self.policy.access(entry)
+        else:
+            entry = CacheEntry(key, value, size)
+            self.map.put(key, entry)
+            self.bytes += size
+            self.policy.insert(entry)
+
+        self.evict()
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key from the cache; does nothing if it is not cached.
+        """
+        entry = self.map.get(key)
+        if entry is not None:
+            self.discard(entry)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is cached, without counting a hit or miss or counting as a use.
+        """
+        return self.map.contains_key(key)
+
+    def clear(self) -> None:
+        """
+        Empties the cache, clearing the policy in place so one passed in keeps its settings. The counters
+        are kept.
+        """
+        self.map.clear()
+        self.policy.clear()
+        self.bytes = 0
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys in the cache.
+        """
+        return self.map.get_keys()
+
+    def hit_ratio(self) -> float:
+        """
+        Returns the fraction of gets that were hits, or 0.0 before the first get.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def evict(self) -> None:
+        """
+        Evicts the policy's victims until the cache is within max_entries and max_bytes.
+        """
+        while ((self.max_entries is not None and self.map.size > self.max_entries) or
+               (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            self.discard(self.policy.victim())
+            self.evictions += 1
+
+    def discard(self, entry: CacheEntry) -> None:
+        """
+        Removes an entry from the policy and the map.
+        """
+        self.policy.remove(entry)
+        self.map.remove(entry.key)
+        self.bytes -= entry.size
+
+
+if __name__ == "__main__":
+
+    print("\nLRU cache of 3 entries")
+    print("----------------------")
+    m = HashMap(hash_function_2, max_entries=3)
+    for key in ('a', 'b', 'c'):
+        m.put(key, key.upper())
+    m.get('a')
+    m.put('d', 'D')
+    print(m.contains_key('b'), m.get('a'), m.get('b'), m.hits, m.misses, m.evictions)
+
+    print("\nOversized values under a byte budget")
+    print("------------------------------------")
+    for policy in POLICIES:
+        m = HashMap(hash_function_2, max_bytes=30, policy=policy, sizeof=lambda key, value: len(value))
+        for key in ('a', 'b', 'c'):
+            m.put(key, key * 10)
+        m.put('d', 'd' * 31)
+        m.put('a', 'a' * 31)
+        print(policy, m.get_keys().length(), m.contains_key('a'), m.contains_key('d'), m.bytes, m.evictions)
+
+    print("\nClearing keeps the policy object")
+    print("--------------------------------")
+    for policy in POLICIES:
+        m = HashMap(hash_function_2, max_entries=2, policy=POLICIES[policy]())
+        chosen = m.policy
+        m.put('a', 'A')
+        m.put('b', 'B')
+        m.get('a')
+        m.clear()
+        m.put('c', 'C')
+        m.put('d', 'D')
+        m.put('e', 'E')
+        print(policy, m.policy is chosen, len(m), m.contains_key('c'), m.contains_key('e'), m.evictions)
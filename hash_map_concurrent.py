@@ -0,0 +1,280 @@
+# Description: This file contains a thread-safe hash table that utilizes chaining (LinkedLists) for resolving
+# collisions, for sharing one map between threads without wrapping it in a single global lock.
+
+# There is one class: HashMap, which represents a DynamicArray that contains LinkedLists at each index, like the
+# HashMap in hash_map_sc.py. Writers lock only the stripe their bucket belongs to: bucket i is guarded by
+# lock i % stripes, and the capacity is always a multiple of the number of stripes so a key keeps its stripe
+# across resizes. Readers take no lock at all: the table (buckets and capacity) is published as one tuple,
+# nodes are linked in and out with single reference assignments, and a resize builds a whole new table from
+# copies of the nodes before swapping it in, so a reader always walks a consistent table.
+# The HashMap class contains the same methods as the one in hash_map_sc.py, including:
+# (1) empty_buckets: returns the number of empty buckets in the hash table
+# (2) table_load: returns the current hash table load factor
+# (3) clear: clears the contents of the hash map without changing the underlying capacity
+# (4) put: updates the key/value pairs in the hash map
+# (5) contains_key: confirms if a given key is in the hash map
+# (6) get: returns the value associated with the given key
+# (7) remove: removes the given key and its associated value from the hash map
+# (8) resize_table: changes the capacity of the internal hash table
+# (9) get_keys: returns a DynamicArray that contains all the keys stored in the hash map
+
+import threading
+
+from a6_include import *
+from hash_map_sc import hash_function_1, hash_function_2
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, stripes: int = 16, max_load_factor: float = 1.0) -> None:
+        """
+        Init new thread-safe HashMap based on DA with SLL for collision resolution. The capacity is rounded up
+        to a multiple of stripes, and the table doubles once the map holds more than max_load_factor * capacity
+        entries, however they are spread over the stripes: the total is checked by puts into a stripe over its
+        share of that, so a put into a stripe still under its share may take the map a little past it.
+        """
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+
+        self.hash_function = function
+        self.stripes = stripes
+        self.max_load_factor = max_load_factor
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.stripe_sizes = [0] * stripes
+        self.table = self.new_table(capacity)
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form
+        """
+        buckets, capacity = self.table
+        out = ''
+        for i in range(capacity):
+            out += str(i) + ': ' + str(buckets[i]) + '\n'
+        return out
+
+    @property
+    def capacity(self) -> int:
+        """
+        The capacity of the current table.
+        """
+        return self.table[1]
+
+    @property
+    def size(self) -> int:
+        """
+        The number of key/value pairs in the hash map. Exact when no writer is running.
+        """
+        return sum(self.stripe_sizes)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return self.size
+
+    def new_table(self, capacity: int) -> tuple:
+        """
+        Returns an empty (buckets, capacity) table, with the capacity rounded up to a multiple of the stripes.
+        """
+        capacity = max(capacity, 1)
+        capacity += -capacity % self.stripes
+        return DynamicArray([LinkedList() for _ in range(capacity)]), capacity
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map; it does not change the underlying hash table capacity.
+        """
+        self.acquire_all()
+        try:
+            self.table = self.new_table(self.table[1])
+            self.stripe_sizes = [0] * self.stripes
+        finally:
+            self.release_all()
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key or None if the key is not found. Takes no lock.
+        """
+        hash = self.hash_function(key)
+        buckets, capacity = self.table
+        node = self.find_node(buckets[hash % capacity], key, hash)
+        return node.value if node is not None else None
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map; otherwise returns False. Takes no lock.
+        """
+        hash = self.hash_function(key)
+        buckets, capacity = self.table
+        return self.find_node(buckets[hash % capacity], key, hash) is not None
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map. Replaces the given key's old value with the new given value
+        if the key already exists in the hash map. Otherwise, it will add the new key/value pair.
+        """
+        hash = self.hash_function(key)
+        stripe = hash % self.stripes
+
+        with self.locks[stripe]:
+            buckets, capacity = self.table
+            linked_list = buckets[hash % capacity]
+
+            node = self.find_node(linked_list, key, hash)
+            if node is not None:
+                node.value = value
+                return
+
+            self.link_node(linked_list, key, value, hash)
+            self.stripe_sizes[stripe] += 1
+            # the map can only be over its load once some stripe is over its share of it, so only then is the
+            # O(stripes) total worth adding up
+            over_share = self.stripe_sizes[stripe] > self.max_load_factor * capacity / self.stripes
+
+        # the unlocked total can miss a concurrent put, which then makes its own check; grow confirms it
+        if over_share and self.size > self.max_load_factor * capacity:
+            self.grow(capacity)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map; does nothing if key is not found.
+        """
+        hash = self.hash_function(key)
+        stripe = hash % self.stripes
+
+        with self.locks[stripe]:
+            buckets, capacity = self.table
+            # unlinking only changes one next pointer, so a reader standing on the removed node can still move on
+            if buckets[hash % capacity].remove(key):
+                self.stripe_sizes[stripe] -= 1
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+        """
+        buckets, capacity = self.table
+        return sum(1 for index in range(capacity) if buckets[index].head is None)
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor.
+        """
+        return self.size / self.table[1]
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the internal hash table, rounded up to a multiple of the stripes. All existing
+        key/value pairs are copied into a new table, which replaces the old one in a single assignment, so
+        lock-free readers see either table in full. Does nothing if the new capacity is less than 1.
+        """
+        if new_capacity < 1:
+            return
+
+        self.acquire_all()
+        try:
+            self.rehash(new_capacity)
+        finally:
+            self.release_all()
+
+    def grow(self, capacity: int) -> None:
+        """
+        Doubles the table from the given capacity if the whole map is over max_load_factor. Both are checked
+        again under all the locks, where the stripe sizes add up to the exact size, so of the puts that see
+        the map over its load only the first resizes.
+        """
+        self.acquire_all()
+        try:
+            if self.table[1] == capacity and sum(self.stripe_sizes) > self.max_load_factor * capacity:
+                self.rehash(capacity * 2)
+        finally:
+            self.release_all()
+
+    def rehash(self, new_capacity: int) -> None:
+        """
+        Copies every node into a new table of the given capacity and swaps it in. The caller holds all the locks.
+        """
+        old_buckets, old_capacity = self.table
+        buckets, capacity = self.new_table(new_capacity)
+        for index in range(old_capacity):
+            for node in old_buckets[index]:
+                # copy the nodes: readers may still be walking the old chains
+                self.link_node(buckets[node.hash % capacity], node.key, node.value, node.hash)
+
+        self.table = buckets, capacity
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys stored in the hash map, taken from one table.
+        """
+        buckets, capacity = self.table
+        keys_array = DynamicArray()
+        for index in range(capacity):
+            for node in buckets[index]:
+                keys_array.append(node.key)
+        return keys_array
+
+    def acquire_all(self) -> None:
+        """
+        Acquires every stripe lock, always in the same order so two threads doing it cannot deadlock.
+        """
+        for lock in self.locks:
+            lock.acquire()
+
+    def release_all(self) -> None:
+        """
+        Releases every stripe lock.
+        """
+        for lock in reversed(self.locks):
+            lock.release()
+
+    def link_node(self, linked_list: LinkedList, key: str, value: object, hash: int) -> None:
+        """
+        Inserts a new node at the front of the LinkedList. The node, including its stored hash, is complete
+        before the head is pointed at it, so a lock-free reader sees all of it or none of it.
+        """
+        node = SLNode(key, value)
+        node.hash = hash
+        node.next = linked_list.head
+        linked_list.head = node
+        linked_list.size += 1
+
+    def find_node(self, linked_list: LinkedList, key: str, hash: int) -> SLNode:
+        """
+        Returns the node holding the given key in the LinkedList, or None if the key is not there.
+        """
+        node = linked_list.head
+        while node is not None:
+            if node.hash == hash and node.key == key:
+                return node
+            node = node.next
+        return None
+
+
+if __name__ == "__main__":
+
+    print("\nconcurrent put / get from 4 threads")
+    print("-----------------------------------")
+    m = HashMap(16, hash_function_2, stripes=4)
+
+    def worker(offset: int) -> None:
+        for i in range(offset, 2000, 4):
+            m.put(str(i), i * 10)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = all(m.get(str(i)) == i * 10 for i in range(2000))
+    print(m.size, m.capacity, result)
+
+    print("\nkeys all in one stripe still grow the table")
+    print("-------------------------------------------")
+    m = HashMap(16, lambda key: int(key) * 4, stripes=4)
+    for i in range(16):
+        m.put(str(i), i)
+    print(m.size, m.capacity, m.table_load())
+    m.put('16', 16)
+    print(m.size, m.capacity, m.table_load())
@@ -0,0 +1,497 @@
+# Description: This file contains a hash table that utilizes bucketized cuckoo hashing for resolving collisions,
+# with the same interface as the HashMap in hash_map_oa.py, so that every lookup examines a fixed number of slots.
+
+# The table is split into `tables` sub-tables of equal size, each an array of buckets of `slots` slots. The hash
+# function's result is mixed with a different odd multiplier per sub-table to pick one candidate bucket in each,
+# and a key only ever lives in one of its candidate buckets, so get, contains_key and remove look at no more than
+# tables * slots slots whatever the load. An insert takes a free slot in any candidate bucket; when they are all
+# full it evicts a random resident of one of them and re-inserts that one into its other buckets, and so on,
+# for at most max_kicks evictions. If the chain of evictions runs out, the table grows and every entry is placed
+# again. Keys whose hashes are equal share all of their candidate buckets, so when more than tables * slots of
+# them exist no table size can hold them; those (and only those) go to a small overflow stash that lookups check
+# after the buckets. With a reasonable hash function the stash stays empty. The table is stored as parallel
+# per-slot lists of keys, values and cached hashes, and it grows once its load factor passes max_load_factor.
+# The HashMap class contains the same methods as the one in hash_map_oa.py, including:
+# (1) empty_buckets: returns the number of empty buckets in the hash table
+# (2) table_load: returns the current hash table load factor
+# (3) clear: clears the contents of the hash map without changing the underlying capacity
+# (4) put: updates the key/value pairs in the hash map
+# (5) contains_key: confirms if a given key is in the hash map
+# (6) get: returns the value associated with the given key
+# (7) remove: removes the given key and its associated value from the hash map
+# (8) resize_table: changes the capacity of the internal hash table
+# (9) get_keys: returns a DynamicArray that contains all the keys stored in the hash map
+# (10) max_probes / probe_length: the most slots any lookup examines (while the stash is empty), and the slots
+#      a lookup of a given key examines
+
+import random
+from itertools import islice
+from operator import length_hint
+
+from a6_include import *
+from hash_map_oa import BATCH_SIZE, hash_function_1, hash_function_2
+
+
+# cached hashes are kept as unsigned 64-bit integers
+HASH_MASK = (1 << 64) - 1
+
+
+def mix64(value: int) -> int:
+    """
+    Returns the SplitMix64 finalizer of value: a 64-bit integer in which every bit depends on every bit of value.
+    """
+    value = (value + 0x9E3779B97F4A7C15) & HASH_MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & HASH_MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & HASH_MASK
+    return value ^ (value >> 31)
+
+
+class HashMap:
+    # load factor above which put grows the table
+    max_load_factor = 0.9
+
+    # longest chain of evictions an insert tries before growing the table
+    max_kicks = 100
+
+    # below this load factor a failed insert cannot be blamed on the table being full, so instead of
+    # growing, the entry goes to the stash
+    min_grow_load = 0.25
+
+    # bumped by every change to which slots hold entries, so iterators can detect it
+    modifications = 0
+
+    def __init__(self, capacity: int, function, tables: int = 2, slots: int = 4) -> None:
+        """
+        Initialize new HashMap that uses cuckoo hashing for collision resolution, with the given number of
+        sub-tables (one hash function derived from function for each) and slots per bucket. The capacity
+        is rounded up to a whole number of buckets in every sub-table.
+        """
+        if tables < 2 or slots < 1:
+            raise ValueError("cuckoo hashing needs at least 2 tables and 1 slot per bucket")
+
+        self.hash_function = function
+        self.tables = tables
+        self.slots = slots
+        self.size = 0
+        self.multipliers = [mix64(table) | 1 for table in range(tables)]
+        self.random = random.Random(0)
+        self.allocate(capacity)
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form
+        """
+        out = ''
+        for i in range(self.capacity):
+            if self.slot_keys[i] is not None:
+                slot = f"K: {self.slot_keys[i]} V: {self.slot_values[i]}"
+            else:
+                slot = 'None'
+            out += str(i) + ': ' + slot + '\n'
+        for key, value, _ in self.stash:
+            out += 'stash: K: ' + str(key) + ' V: ' + str(value) + '\n'
+        return out
+
+    def allocate(self, capacity: int) -> None:
+        """
+        Replaces the slots with empty ones for at least the given capacity, and empties the stash.
+        """
+        bucket_size = self.tables * self.slots
+        self.table_buckets = max(-(-capacity // bucket_size), 1)
+        self.capacity = self.table_buckets * bucket_size
+        self.slot_keys = [None] * self.capacity
+        self.slot_values = [None] * self.capacity
+        self.slot_hashes = [0] * self.capacity
+        self.stash = []
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map; it does not change the underlying hash table capacity.
+        """
+        self.size = 0
+        self.modifications += 1
+        self.allocate(self.capacity)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key or None if the key is not found.
+        """
+        hash = self.hash_function(key) & HASH_MASK
+        index = self.find_index(key, hash)
+        if index != -1:
+            return self.slot_values[index]
+        if self.stash:
+            position = self.find_stash(key, hash)
+            if position != -1:
+                return self.stash[position][1]
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key / value pair in the hash map. If the given key already exists in
+        the hash map, its associated value must be replaced with the new value. If the given key is
+        not in the hash map, a key / value pair must be added.
+        """
+        # grow before the new entry would take the table past the maximum load factor
+        if self.size + 1 > self.max_load_factor * self.capacity:
+            self.resize_table(self.capacity * 2)
+
+        self.insert(key, value, self.hash_function(key) & HASH_MASK)
+
+    def put_many(self, items) -> None:
+        """
+        Puts every key / value pair from an iterable of pairs. If the iterable knows its length, the table is
+        grown once up front instead of doubling repeatedly; keys are hashed a batch at a time, and the
+        load factor is checked once per batch instead of once per pair.
+        """
+        # presize from the length hint so the whole load fits below the maximum load factor
+        self.reserve(self.size + length_hint(items))
+
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, BATCH_SIZE))
+            if not batch:
+                return
+
+            # make room for the whole batch, then insert it without further checks
+            self.reserve(self.size + len(batch))
+
+            hashes = [self.hash_function(key) & HASH_MASK for key, _ in batch]
+            for (key, value), hash in zip(batch, hashes):
+                self.insert(key, value, hash)
+
+    @classmethod
+    def from_items(cls, items, function, capacity: int = None) -> 'HashMap':
+        """
+        Returns a new HashMap holding the given key / value pairs. Unless a capacity is given, the table is
+        sized from the length of items (when known) so every pair fits without a resize.
+        """
+        if capacity is None:
+            capacity = int(length_hint(items) / cls.max_load_factor) + 1
+
+        m = cls(capacity, function)
+        m.put_many(items)
+        return m
+
+    def reserve(self, count: int) -> None:
+        """
+        Doubles the capacity with a single resize_table call until count entries
+        stay within the maximum load factor. Does nothing if they already do.
+        """
+        new_capacity = self.capacity
+        while count > self.max_load_factor * new_capacity:
+            new_capacity *= 2
+
+        if new_capacity != self.capacity:
+            self.resize_table(new_capacity)
+
+    def insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Replaces the value of the key if it is in the table, otherwise adds the entry, growing the table
+        if no chain of evictions makes room for it. Does not check the load factor.
+        """
+        index = self.find_index(key, hash)
+        if index != -1:
+            self.slot_values[index] = value
+            return
+        if self.stash:
+            position = self.find_stash(key, hash)
+            if position != -1:
+                self.stash[position][1] = value
+                return
+
+        self.size += 1
+        self.modifications += 1
+        homeless = self.place(key, value, hash)
+        if homeless is not None:
+            self.rehome(*homeless)
+
+    def place(self, key: str, value: object, hash: int):
+        """
+        Puts an entry known not to be in the table into a free slot of one of its candidate buckets, evicting
+        residents to their other buckets when they are all full. Returns None once every entry has a slot, or
+        the (key, value, hash) left without one after max_kicks evictions, which may not be the entry passed in.
+        """
+        keys, values, hashes = self.slot_keys, self.slot_values, self.slot_hashes
+        slots = self.slots
+
+        for _ in range(self.max_kicks + 1):
+            starts = self.bucket_starts(hash)
+            for start in starts:
+                for index in range(start, start + slots):
+                    if keys[index] is None:
+                        keys[index], values[index], hashes[index] = key, value, hash
+                        return None
+
+            # every candidate slot is taken: swap the entry with a random resident, which then looks for a slot
+            index = self.random.choice(starts) + self.random.randrange(slots)
+            (key, keys[index]), (value, values[index]) = (keys[index], key), (values[index], value)
+            hash, hashes[index] = hashes[index], hash
+
+        return key, value, hash
+
+    def rehome(self, key: str, value: object, hash: int) -> None:
+        """
+        Finds room for an entry that place could not fit (and that self.size already counts): grows the table
+        and places it again, unless the table is so empty that its hash must collide with too many others,
+        in which case it goes to the stash.
+        """
+        if self.table_load() < self.min_grow_load:
+            self.stash.append([key, value, hash])
+            return
+
+        self.resize_table(self.capacity * 2)
+        homeless = self.place(key, value, hash)
+        if homeless is not None:
+            self.rehome(*homeless)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map. If the key is not
+        in the hash map, the method does nothing.
+        """
+        hash = self.hash_function(key) & HASH_MASK
+        index = self.find_index(key, hash)
+        if index != -1:
+            # no other entry's position depends on this slot, so it can simply be emptied
+            self.slot_keys[index], self.slot_values[index], self.slot_hashes[index] = None, None, 0
+        else:
+            position = self.find_stash(key, hash) if self.stash else -1
+            if position == -1:
+                return
+            del self.stash[position]
+
+        self.size -= 1
+        self.modifications += 1
+
+    def get_many(self, keys, default: object = None) -> list:
+        """
+        Returns a list with the value of each of the given keys, in the same order, or default for keys
+        that are not in the hash map.
+        """
+        keys = list(keys)
+        hashes = [self.hash_function(key) & HASH_MASK for key in keys]
+
+        values = []
+        for key, hash in zip(keys, hashes):
+            index = self.find_index(key, hash)
+            if index != -1:
+                values.append(self.slot_values[index])
+            else:
+                position = self.find_stash(key, hash) if self.stash else -1
+                values.append(self.stash[position][1] if position != -1 else default)
+        return values
+
+    def contains_many(self, keys) -> list:
+        """
+        Returns a list with True for each of the given keys that is in the hash map and False otherwise,
+        in the same order as the keys.
+        """
+        keys = list(keys)
+        hashes = [self.hash_function(key) & HASH_MASK for key in keys]
+        return [self.find_index(key, hash) != -1 or (bool(self.stash) and self.find_stash(key, hash) != -1)
+                for key, hash in zip(keys, hashes)]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise it returns False.
+        """
+        hash = self.hash_function(key) & HASH_MASK
+        if self.find_index(key, hash) != -1:
+            return True
+        return bool(self.stash) and self.find_stash(key, hash) != -1
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+        """
+        return self.capacity - self.size + len(self.stash)
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor.
+        """
+        return self.size / self.capacity
+
+    def max_probes(self) -> int:
+        """
+        Returns the most slots a lookup examines: one bucket in every sub-table (plus the stash, if it is not empty).
+        """
+        return self.tables * self.slots
+
+    def probe_length(self, key: str) -> int:
+        """
+        Returns the number of slots (and stash entries) a lookup of the given key examines,
+        whether or not it is in the table.
+        """
+        hash = self.hash_function(key) & HASH_MASK
+        examined = 0
+        for start in self.bucket_starts(hash):
+            for index in range(start, start + self.slots):
+                examined += 1
+                if self.slot_hashes[index] == hash and self.slot_keys[index] == key:
+                    return examined
+        position = self.find_stash(key, hash)
+        return examined + (position + 1 if position != -1 else len(self.stash))
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the internal hash table. All existing key/value pairs will transfer to the new
+        hash table, and all hash table links will be rehashed. Does nothing if the new capacity is less than 1
+        or too small to hold every entry.
+        """
+        if new_capacity < 1 or new_capacity < self.size:
+            return
+
+        entries = [(self.slot_keys[index], self.slot_values[index], self.slot_hashes[index])
+                   for index in range(self.capacity) if self.slot_keys[index] is not None]
+        entries.extend((key, value, hash) for key, value, hash in self.stash)
+        self.allocate(new_capacity)
+        self.modifications += 1
+
+        # entries are placed by their cached hashes, so no key is hashed again
+        homeless = []
+        for key, value, hash in entries:
+            left = self.place(key, value, hash)
+            if left is not None:
+                homeless.append(left)
+        for left in homeless:
+            self.rehome(*left)
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys stored in the hash map.
+        """
+        keys_array = DynamicArray()
+        for key in self.keys():
+            keys_array.append(key)
+        return keys_array
+
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the hash map, like keys().
+        """
+        return self.keys()
+
+    def keys(self):
+        """
+        Yields every key in the hash map in slot order, then the stash.
+        """
+        for key, _ in self.items():
+            yield key
+
+    def values(self):
+        """
+        Yields every value in the hash map in slot order, then the stash.
+        """
+        for _, value in self.items():
+            yield value
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map in slot order, then the stash. Raises RuntimeError if
+        entries are added, removed or moved while the iteration is in progress; replacing the value of an
+        existing key is allowed.
+        """
+        modifications = self.modifications
+        keys, values = self.slot_keys, self.slot_values
+
+        for index in range(self.capacity):
+            if keys[index] is not None:
+                yield keys[index], values[index]
+                if self.modifications != modifications:
+                    raise RuntimeError("HashMap changed during iteration")
+
+        for key, value, _ in list(self.stash):
+            yield key, value
+            if self.modifications != modifications:
+                raise RuntimeError("HashMap changed during iteration")
+
+    def bucket_starts(self, hash: int) -> list:
+        """
+        Returns the index of the first slot of the key's candidate bucket in each sub-table.
+        """
+        table_buckets, slots = self.table_buckets, self.slots
+        starts = []
+        for table, multiplier in enumerate(self.multipliers):
+            mixed = (hash * multiplier) & HASH_MASK
+            starts.append((table * table_buckets + (mixed ^ (mixed >> 32)) % table_buckets) * slots)
+        return starts
+
+    def find_index(self, key: str, hash: int) -> int:
+        """
+        Args:
+            key: the key to look for
+            hash: the key's hash, masked with HASH_MASK
+
+        Returns: the index of the slot holding the key, or -1 if the key is not in the buckets
+        """
+        keys = self.slot_keys
+        table_buckets, slots = self.table_buckets, self.slots
+
+        # one bucket per sub-table; a bucket is searched with one slice and a C-level membership test
+        # (empty slots hold None, which never equals a key)
+        for table, multiplier in enumerate(self.multipliers):
+            mixed = (hash * multiplier) & HASH_MASK
+            start = (table * table_buckets + (mixed ^ (mixed >> 32)) % table_buckets) * slots
+            bucket = keys[start:start + slots]
+            if key in bucket:
+                return start + bucket.index(key)
+
+        return -1
+
+    def find_stash(self, key: str, hash: int) -> int:
+        """
+        Returns the position of the key in the stash, or -1 if it is not there.
+        """
+        for position, (stashed_key, _, stashed_hash) in enumerate(self.stash):
+            if stashed_hash == hash and stashed_key == key:
+                return position
+        return -1
+
+
+if __name__ == "__main__":
+
+    print("\nPDF - put example 1")
+    print("-------------------")
+    m = HashMap(50, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.size, m.capacity, len(m.stash))
+
+    print("\nPDF - remove example 1")
+    print("----------------------")
+    m = HashMap(50, hash_function_1)
+    print(m.get('key1'))
+    m.put('key1', 10)
+    print(m.get('key1'))
+    m.remove('key1')
+    print(m.get('key1'))
+    m.remove('key4')
+
+    print("\nPDF - resize example 2")
+    print("----------------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(1, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.size, m.capacity)
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            result &= m.contains_key(str(key))
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.size, m.capacity, round(m.table_load(), 2))
@@ -0,0 +1,551 @@
+# Description: This file contains an open addressing hash table for int64 keys (or fixed-width byte string keys)
+# whose keys, values and control bytes live in NumPy arrays, so whole arrays of keys are hashed, probed, inserted
+# and looked up with vectorized operations. It needs NumPy, which the other HashMaps do not.
+
+# Keys are hashed with the MurmurHash3 64-bit finalizer (hash_functions.fmix64), applied to the key itself for
+# integers and folded over the key's 8-byte words for byte strings, so integer IDs no longer have to be turned into
+# strings and hashed a character at a time. The table has a power-of-two capacity, probes triangularly (home slot,
+# then 1, 3, 6, ... slots further on) and leaves a tombstone in the control array on remove, like hash_map_oa.py.
+# The batch methods (put_arrays / put_many, find_indices, get_many, contains_many) run one probe step of every key
+# at once: each pass gathers the control byte and key of every key's current slot, settles the keys that matched or
+# hit an empty slot, and moves the rest one step along their probe sequences, so a batch takes as many NumPy passes
+# as its longest probe sequence. The scalar put / get / remove API of hash_map_oa.HashMap is kept, but each call
+# goes through NumPy element access one slot at a time, so it gains only the cheaper hashing: batches are where
+# this table pays off.
+# Values are stored in an array of value_dtype: object (the default) holds anything, while a numeric dtype keeps
+# values unboxed. Byte string keys follow NumPy's fixed-width bytes rules, so trailing zero bytes are ignored.
+# The HashMap class contains the same methods as the one in hash_map_oa.py, including:
+# (1) empty_buckets: returns the number of empty buckets in the hash table
+# (2) table_load: returns the current hash table load factor
+# (3) clear: clears the contents of the hash map without changing the underlying capacity
+# (4) put: updates the key/value pairs in the hash map
+# (5) contains_key: confirms if a given key is in the hash map
+# (6) get: returns the value associated with the given key
+# (7) remove: removes the given key and its associated value from the hash map
+# (8) resize_table: changes the capacity of the internal hash table
+# (9) get_keys: returns a DynamicArray that contains all the keys stored in the hash map
+# (10) put_arrays / find_indices / get_many / contains_many: vectorized bulk insert and lookup over key arrays
+# (11) arrays: the keys and values of every entry as two NumPy arrays
+
+import operator
+
+import numpy
+
+from a6_include import *
+from hash_functions import MASK_64, fmix64
+
+
+# control bytes
+EMPTY = 0
+FULL = 1
+DELETED = 2
+
+# odd multiplier that combines the words of a byte string key before each fmix64 round
+WORD_MULTIPLIER = 0x9E3779B97F4A7C15
+
+FMIX_1 = numpy.uint64(0xff51afd7ed558ccd)
+FMIX_2 = numpy.uint64(0xc4ceb9fe1a85ec53)
+
+
+def fmix64_array(hashes: numpy.ndarray) -> numpy.ndarray:
+    """
+    Returns fmix64 of every element of a uint64 array; multiplication wraps around at 64 bits
+    exactly as the masked multiplications of fmix64 do.
+    """
+    hashes = hashes ^ (hashes >> numpy.uint64(33))
+    hashes *= FMIX_1
+    hashes ^= hashes >> numpy.uint64(33)
+    hashes *= FMIX_2
+    hashes ^= hashes >> numpy.uint64(33)
+    return hashes
+
+
+class HashMap:
+    # load factor, counting tombstones, above which put makes room; kept low so batches need few probe passes
+    max_load_factor = 0.5
+
+    # bumped by every change to which slots hold entries, so iterators can detect it
+    modifications = 0
+
+    def __init__(self, capacity: int, key_dtype=numpy.int64, value_dtype=object) -> None:
+        """
+        Initialize new HashMap for keys of key_dtype: numpy.int64 (the default) or a fixed-width bytes dtype
+        such as 'S16', whose width is rounded up to a whole number of 8-byte words. The capacity is rounded up
+        to a power of two.
+        """
+        key_dtype = numpy.dtype(key_dtype)
+        if key_dtype.kind == 'S':
+            key_dtype = numpy.dtype(f"S{-(-key_dtype.itemsize // 8) * 8}")
+        elif key_dtype != numpy.int64:
+            raise TypeError("keys must be numpy.int64 or a fixed-width bytes dtype")
+
+        self.key_dtype = key_dtype
+        self.value_dtype = numpy.dtype(value_dtype)
+        self.capacity = self.round_capacity(capacity)
+        self.size = 0
+        self.tombstones = 0
+        self.allocate(self.capacity)
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form
+        """
+        out = ''
+        for i in range(self.capacity):
+            if self.control[i] == FULL:
+                slot = f"K: {self.slot_keys.item(i)} V: {self.slot_values.item(i)}"
+            else:
+                slot = 'TS' if self.control[i] == DELETED else 'None'
+            out += str(i) + ': ' + slot + '\n'
+        return out
+
+    def allocate(self, capacity: int) -> None:
+        """
+        Replaces the slots with empty ones for the given capacity.
+        """
+        self.control = numpy.zeros(capacity, dtype=numpy.uint8)
+        self.slot_keys = numpy.zeros(capacity, dtype=self.key_dtype)
+        self.slot_values = numpy.empty(capacity, dtype=self.value_dtype)
+        self.mask = capacity - 1
+
+    def round_capacity(self, capacity: int) -> int:
+        """
+        Returns the smallest power of two that is at least capacity (and at least 1).
+        """
+        return 1 << max(capacity - 1, 0).bit_length()
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map; it does not change the underlying hash table capacity.
+        """
+        self.size = 0
+        self.tombstones = 0
+        self.modifications += 1
+        self.allocate(self.capacity)
+
+    def get(self, key) -> object:
+        """
+        Returns the value associated with the given key or None if the key is not found.
+        """
+        key = self.normalize_key(key)
+        index = self.find_index(key, self.hash_key(key))
+        if index != -1:
+            return self.slot_values.item(index)
+
+    def put(self, key, value: object) -> None:
+        """
+        Updates the key / value pair in the hash map. If the given key already exists in
+        the hash map, its associated value must be replaced with the new value. If the given key is
+        not in the hash map, a key / value pair must be added.
+        """
+        key = self.normalize_key(key)
+        hash = self.hash_key(key)
+
+        index = self.find_index(key, hash)
+        if index != -1:
+            self.slot_values[index] = value
+            return
+
+        if self.size + self.tombstones + 1 > self.max_load_factor * self.capacity:
+            self.make_room(self.size + 1)
+
+        # the key is not in the table, so it takes the first free slot on its probe sequence, tombstones included
+        control = self.control
+        index = hash & self.mask
+        step = 0
+        while control[index] == FULL:
+            step += 1
+            index = (index + step) & self.mask
+
+        if control[index] == DELETED:
+            self.tombstones -= 1
+        control[index] = FULL
+        self.slot_keys[index] = key
+        self.slot_values[index] = value
+        self.size += 1
+        self.modifications += 1
+
+    def put_many(self, items) -> None:
+        """
+        Puts every key / value pair from an iterable of pairs, as one put_arrays call.
+        """
+        keys, values = [], []
+        for key, value in items:
+            keys.append(key)
+            values.append(value)
+        self.put_arrays(keys, values)
+
+    def put_arrays(self, keys, values) -> None:
+        """
+        Puts the key / value pairs of two equally long sequences or arrays. When a key is repeated, its
+        last value wins, as with a loop of puts. Existing keys have their values replaced in one vectorized
+        assignment, the table grows at most once, and the new keys are inserted a probe step at a time.
+        """
+        keys = self.key_array(keys)
+        values = self.value_array(values)
+        if len(keys) != len(values):
+            raise ValueError("keys and values must have the same length")
+        if len(keys) == 0:
+            return
+
+        # keep the last occurrence of each key: unique on the reversed keys finds the first of each
+        _, first = numpy.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - first
+        keys, values = keys[last], values[last]
+
+        indices = self.find_indices(keys)
+        found = indices != -1
+        self.slot_values[indices[found]] = values[found]
+
+        new = ~found
+        count = int(numpy.count_nonzero(new))
+        if count == 0:
+            return
+        if self.size + self.tombstones + count > self.max_load_factor * self.capacity:
+            self.make_room(self.size + count)
+        self.insert_new(keys[new], values[new])
+
+    def find_indices(self, keys) -> numpy.ndarray:
+        """
+        Returns an int64 array with the slot index of each of the given keys (-1 for missing keys), in the same
+        order as the keys. All the keys are hashed at once and probed a step at a time together.
+        """
+        keys = self.key_array(keys)
+        indices = numpy.full(len(keys), -1, dtype=numpy.int64)
+
+        # positions of the keys still being probed, and their current slots
+        pending = numpy.arange(len(keys))
+        slots = (self.hash_keys(keys) & numpy.uint64(self.mask)).astype(numpy.int64)
+        step = 0
+
+        while len(pending):
+            control = self.control[slots]
+            hit = (control == FULL) & (self.slot_keys[slots] == keys[pending])
+            indices[pending[hit]] = slots[hit]
+
+            # keys that matched or reached an empty slot are settled; the rest move one step on
+            going = (control != EMPTY) & ~hit
+            pending, slots = pending[going], slots[going]
+            step += 1
+            slots = (slots + step) & self.mask
+
+        return indices
+
+    def get_many(self, keys, default: object = None) -> numpy.ndarray:
+        """
+        Returns an array of value_dtype with the value of each of the given keys, in the same order,
+        or default for keys that are not in the hash map; with a numeric value_dtype, default must be a number.
+        """
+        indices = self.find_indices(keys)
+        found = indices != -1
+        result = numpy.full(len(indices), default, dtype=self.value_dtype)
+        result[found] = self.slot_values[indices[found]]
+        return result
+
+    def contains_many(self, keys) -> numpy.ndarray:
+        """
+        Returns a bool array with True for each of the given keys that is in the hash map and False otherwise,
+        in the same order as the keys.
+        """
+        return self.find_indices(keys) != -1
+
+    def remove(self, key) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        """
+        key = self.normalize_key(key)
+        index = self.find_index(key, self.hash_key(key))
+        if index == -1:
+            return
+
+        # leave a tombstone so probe sequences running through this slot stay intact
+        self.control[index] = DELETED
+        if self.value_dtype == object:
+            self.slot_values[index] = None
+        self.size -= 1
+        self.tombstones += 1
+        self.modifications += 1
+
+    def contains_key(self, key) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise it returns False.
+        """
+        key = self.normalize_key(key)
+        return self.find_index(key, self.hash_key(key)) != -1
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+        """
+        return self.capacity - self.size - self.tombstones
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor.
+        """
+        return self.size / self.capacity
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the internal hash table, rounded up to a power of two. All existing key/value
+        pairs will transfer to the new hash table, and all hash table links will be rehashed. Does nothing if
+        the new capacity is less than 1 or would not leave at least one empty slot, which every probe stops at.
+        """
+        if new_capacity < 1:
+            return
+        new_capacity = self.round_capacity(new_capacity)
+        if new_capacity <= self.size:
+            return
+
+        keys, values = self.arrays()
+        self.capacity = new_capacity
+        self.allocate(new_capacity)
+        self.size = 0
+        self.tombstones = 0
+        self.insert_new(keys, values)
+
+    def make_room(self, count: int) -> None:
+        """
+        Rebuilds the table so count entries fit under max_load_factor with no tombstones: at the same
+        capacity if they already fit there, doubling it otherwise.
+        """
+        new_capacity = self.capacity
+        while count > self.max_load_factor * new_capacity:
+            new_capacity *= 2
+        self.resize_table(new_capacity)
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys stored in the hash map.
+        """
+        return DynamicArray(self.arrays()[0].tolist())
+
+    def arrays(self) -> tuple:
+        """
+        Returns two new arrays holding the key and the value of every entry, in slot order.
+        """
+        full = self.control == FULL
+        return self.slot_keys[full], self.slot_values[full]
+
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the hash map, like keys().
+        """
+        return self.keys()
+
+    def keys(self):
+        """
+        Yields every key in the hash map in slot order, as a Python int or bytes.
+        """
+        slot_keys = self.slot_keys
+        for index in self.iter_slots():
+            yield slot_keys.item(index)
+
+    def values(self):
+        """
+        Yields every value in the hash map in slot order.
+        """
+        slot_values = self.slot_values
+        for index in self.iter_slots():
+            yield slot_values.item(index)
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map in slot order.
+        """
+        slot_keys, slot_values = self.slot_keys, self.slot_values
+        for index in self.iter_slots():
+            yield slot_keys.item(index), slot_values.item(index)
+
+    def iter_slots(self):
+        """
+        Yields the index of every full slot. Raises RuntimeError if entries are added or removed while the
+        iteration is in progress; replacing the value of an existing key is allowed.
+        """
+        modifications = self.modifications
+        for index in numpy.flatnonzero(self.control == FULL).tolist():
+            yield index
+            if self.modifications != modifications:
+                raise RuntimeError("HashMap changed during iteration")
+
+    def probe_length(self, key) -> int:
+        """
+        Returns the number of slots a lookup of the given key examines, whether or not it is in the table.
+        """
+        key = self.normalize_key(key)
+        index = self.hash_key(key) & self.mask
+        step = 0
+        while self.control[index] != EMPTY:
+            if self.control[index] == FULL and self.slot_keys[index] == key:
+                break
+            step += 1
+            index = (index + step) & self.mask
+        return step + 1
+
+    def find_index(self, key, hash: int) -> int:
+        """
+        Args:
+            key: the key to look for, as returned by normalize_key
+            hash: the key's hash, as returned by hash_key
+
+        Returns: the index of the slot holding the key, or -1 if the key is not in the table
+        """
+        control, slot_keys, mask = self.control, self.slot_keys, self.mask
+        index = hash & mask
+        step = 0
+
+        # probe triangularly until an empty slot ends the sequence, passing over tombstones
+        while True:
+            state = control[index]
+            if state == EMPTY:
+                return -1
+            if state == FULL and slot_keys[index] == key:
+                return index
+            step += 1
+            index = (index + step) & mask
+
+    def insert_new(self, keys: numpy.ndarray, values: numpy.ndarray) -> None:
+        """
+        Inserts keys known to be distinct and absent from the table, with their values, into free slots,
+        one probe step of all of them at a time. When several keys want the same free slot in a step, the
+        first takes it and the others move on, as they would have had the keys been put one by one.
+        The table must have room for all of them.
+        """
+        pending = numpy.arange(len(keys))
+        slots = (self.hash_keys(keys) & numpy.uint64(self.mask)).astype(numpy.int64)
+        step = 0
+
+        while len(pending):
+            control = self.control[slots]
+            free = numpy.flatnonzero(control != FULL)
+            _, first = numpy.unique(slots[free], return_index=True)
+            winners = free[first]
+
+            taken = slots[winners]
+            self.tombstones -= int(numpy.count_nonzero(control[winners] == DELETED))
+            self.control[taken] = FULL
+            self.slot_keys[taken] = keys[pending[winners]]
+            self.slot_values[taken] = values[pending[winners]]
+
+            going = numpy.ones(len(pending), dtype=bool)
+            going[winners] = False
+            pending, slots = pending[going], slots[going]
+            step += 1
+            slots = (slots + step) & self.mask
+
+        self.size += len(keys)
+        self.modifications += 1
+
+    def normalize_key(self, key):
+        """
+        Returns the key as the table stores it: a Python int in the int64 range, or bytes no wider than
+        the key dtype with trailing zero bytes removed. Raises TypeError or OverflowError for other keys.
+        """
+        if self.key_dtype.kind == 'S':
+            if not isinstance(key, bytes):
+                raise TypeError("keys of this HashMap must be bytes")
+            if len(key) > self.key_dtype.itemsize:
+                raise OverflowError(f"key is longer than {self.key_dtype.itemsize} bytes")
+            return key.rstrip(b'\0')
+
+        key = operator.index(key)
+        if not -2 ** 63 <= key < 2 ** 63:
+            raise OverflowError("key does not fit in int64")
+        return key
+
+    def key_array(self, keys) -> numpy.ndarray:
+        """
+        Returns the keys as an array of the key dtype, raising OverflowError instead of truncating
+        byte string keys that are too long.
+        """
+        if self.key_dtype.kind == 'S':
+            array = numpy.asarray(keys, dtype=bytes) if not isinstance(keys, numpy.ndarray) else keys
+            if array.dtype.kind != 'S':
+                raise TypeError("keys of this HashMap must be bytes")
+            if array.dtype.itemsize > self.key_dtype.itemsize:
+                raise OverflowError(f"a key is longer than {self.key_dtype.itemsize} bytes")
+            return array.astype(self.key_dtype, copy=False)
+
+        return numpy.asarray(keys, dtype=numpy.int64)
+
+    def value_array(self, values) -> numpy.ndarray:
+        """
+        Returns the values as a one-dimensional array of the value dtype; with the object dtype, tuples
+        and lists stay single values instead of becoming rows of a two-dimensional array.
+        """
+        if self.value_dtype != object:
+            return numpy.asarray(values, dtype=self.value_dtype)
+
+        values = list(values)
+        array = numpy.empty(len(values), dtype=object)
+        for index, value in enumerate(values):
+            array[index] = value
+        return array
+
+    def hash_key(self, key) -> int:
+        """
+        Returns the hash of one normalized key, equal to what hash_keys returns for it.
+        """
+        if self.key_dtype.kind == 'S':
+            data = key.ljust(self.key_dtype.itemsize, b'\0')
+            hash = 0
+            for start in range(0, len(data), 8):
+                hash = fmix64((hash * WORD_MULTIPLIER & MASK_64) ^ int.from_bytes(data[start:start + 8], 'little'))
+            return hash
+
+        return fmix64(key)
+
+    def hash_keys(self, keys: numpy.ndarray) -> numpy.ndarray:
+        """
+        Returns the uint64 hashes of an array of the key dtype.
+        """
+        if self.key_dtype.kind == 'S':
+            # the key width is a whole number of words; spelling it out keeps an empty batch reshapeable
+            words = numpy.ascontiguousarray(keys).view('<u8').reshape(len(keys), self.key_dtype.itemsize // 8)
+            hashes = numpy.zeros(len(keys), dtype=numpy.uint64)
+            for column in range(words.shape[1]):
+                hashes = fmix64_array((hashes * numpy.uint64(WORD_MULTIPLIER)) ^ words[:, column])
+            return hashes
+
+        return fmix64_array(keys.view(numpy.uint64))
+
+
+if __name__ == "__main__":
+
+    print("\nPDF - put example 1")
+    print("-------------------")
+    m = HashMap(50)
+    for i in range(150):
+        m.put(i * 7919, i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.size, m.capacity)
+
+    print("\nPDF - remove example 1")
+    print("----------------------")
+    m = HashMap(50)
+    print(m.get(1))
+    m.put(1, 10)
+    print(m.get(1))
+    m.remove(1)
+    print(m.get(1))
+    m.remove(4)
+
+    print("\nbatch example")
+    print("-------------")
+    m = HashMap(16, numpy.int64, numpy.int64)
+    m.put_arrays(numpy.arange(0, 1000, 3), numpy.arange(0, 1000, 3) * 2)
+    print(m.size, m.capacity, m.get_many([0, 1, 3, 999], default=-1), m.contains_many([5, 6]))
+
+    print("\nbyte string keys")
+    print("----------------")
+    m = HashMap(16, 'S12')
+    m.put_many([(b'alpha', 1), (b'beta', 2)])
+    print(m.get(b'alpha'), m.get(b'beta'), m.get(b'gamma'), m.get_many([b'beta', b'delta']), m.key_dtype)
+    print(m.get_many([]), m.contains_many([]), HashMap(16).get_many([]))
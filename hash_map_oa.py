@@ -14,8 +14,15 @@
 # (9) get_keys: returns a DynamicArray that contains all the keys stored in the hash map
 
 
+import time
+from itertools import islice
+from operator import length_hint
+
 from a6_include import *
+from bloom import BloomFilter
 
+# number of pairs put_many hashes and inserts at a time
+BATCH_SIZE = 1024
 
 class HashEntry:
 
@@ -37,6 +44,14 @@ class HashEntry:
         return f"K: {self.key} V: {self.value} TS: {self.is_tombstone}"
 
 
+# the tombstone an incremental resize leaves in every old bucket it has moved, so probe sequences through it
+# still reach the entries not moved yet. One shared entry, whose hash matches no key, rather than a new one
+# per bucket: the old table then holds nothing that has to be freed all at once when the resize ends
+MOVED = HashEntry(None, None)
+MOVED.hash = None
+MOVED.is_tombstone = True
+
+
 def hash_function_1(key: str) -> int:
     """
     Sample Hash function #1 to be used with HashMap implementation
@@ -62,6 +77,36 @@ def hash_function_2(key: str) -> int:
 
 
 class HashMap:
+    # number of tombstones in the current table, and the fraction of the table they may fill
+    # before remove compacts it in place (None turns automatic compaction off)
+    tombstones = 0
+    compact_threshold = 0.25
+
+    # bumped by every change to which buckets hold entries, so iterators can detect it
+    modifications = 0
+
+    # incremental resizing, disabled by default; see set_incremental_resize
+    rehash_step = None
+    old_buckets = None
+    old_capacity = 0
+    rehash_index = 0
+
+    # write-ahead log of a durable map (see set_durable)
+    log = None
+
+    # per-key expiry (see put's ttl): the number of live entries with an expiry time, the clock those times
+    # are read from, and the reaper's position and number of buckets it samples on every put / remove
+    expiring = 0
+    clock = time.monotonic
+    reap_index = 0
+    reap_step = 4
+
+    # opt-in hot-path statistics (see enable_stats)
+    stats = None
+
+    # Bloom filter of the keys that lets most misses return without probing; see set_prefilter
+    prefilter = None
+
     def __init__(self, capacity: int, function) -> None:
         """
         Initialize new HashMap that uses Quadratic Probing for collision resolution
@@ -87,12 +132,30 @@ class HashMap:
             out += str(i) + ': ' + str(self.buckets[i]) + '\n'
         return out
 
-    def clear(self) -> None:
+    def clear(self, buckets: DynamicArray = None) -> None:
         """
         Clears the contents of the hash map; it does not change the underlying hash table capacity.
+        buckets may be an empty table of the same capacity built beforehand, as the asyncio
+        facade (hash_map_async.py) does a chunk at a time.
         """
+        if self.log is not None:
+            self.log.clear()
+
         # reset the size
         self.size = 0
+        self.tombstones = 0
+        self.expiring = 0
+        self.modifications += 1
+
+        # drop any table left over from an incremental resize
+        self.old_buckets = None
+
+        if self.prefilter is not None:
+            self.prefilter = BloomFilter(self.prefilter.capacity, self.prefilter.target_rate)
+
+        if buckets is not None:
+            self.buckets = buckets
+            return
 
         for i in range(self.capacity):
             self.buckets.set_at_index(i, None)
@@ -101,99 +164,249 @@ class HashMap:
         """
         Returns the value associated with the given key or None if the key is not found.
         """
+        # a key the prefilter has never seen is not in the map
+        if self.prefilter is not None and key not in self.prefilter:
+            return None
+
         # quadratic probing required
-        # get index from hash
-        index = self.get_hash_index(key) % self.capacity
-        # set counter
-        counter = 0
+        self.rehash_some(self.rehash_step)
+        hash = self.hash_function(key)
 
-        if self.buckets[index] is None:
-            return
-        elif self.buckets[index].is_tombstone:
-            return
-        elif self.buckets[index].key == key:
+        # look in the current table first
+        index = self.find_index(key, hash, self.buckets, self.capacity)
+        if index != -1:
             return self.buckets[index].value
 
-        # rehash and get new index if key not yet found
-        counter += 1
-        new_index = (index + counter ** 2) % self.capacity
+        # then in the table an incremental resize is still moving entries out of
+        if self.old_buckets is not None:
+            index = self.find_index(key, hash, self.old_buckets, self.old_capacity)
+            if index != -1:
+                return self.old_buckets[index].value
 
-        # returns the value if key is found with first rehashing of the new index
-        if self.buckets[new_index] is None:
-            return
-        elif self.buckets[new_index].is_tombstone:
-            return
-        elif self.buckets[new_index].key == key:
-            return self.buckets[new_index].value
-
-        # keep probing until the correct key is reached or if counter reaches capacity
-        while self.buckets[new_index].key != key and counter <= self.capacity:
-            counter += 1
-            new_index = (index + counter ** 2) % self.capacity
-            if self.buckets[new_index] is None:
-                return
-            elif self.buckets[new_index].is_tombstone:
-                return
-
-        # returns None if tombstone is flagged True or appropriate value if the key is found
-        if self.buckets[new_index].is_tombstone:
-            return
-        else:
-            return self.buckets[new_index].value
-
-    def put(self, key: str, value: object) -> None:
+    def put(self, key: str, value: object, ttl: float = None) -> None:
         """
         Updates the key / value pair in the hash map. If the given key already exists in
         the hash map, its associated value must be replaced with the new value. If the given key is
         not in the hash map, a key / value pair must be added.
+        With a ttl, the key expires ttl seconds from now: it then counts as absent, and its bucket is
+        reclaimed like a tombstone. Without one, any earlier expiry of the key is dropped.
         """
         # remember, if the load factor is greater than or equal to 0.5,
         # resize the table before putting the new key/value pair
         #
+        # a durable map logs the change before making it, with the expiry as a time of day, which still
+        # means the same when the log is replayed after a restart
+        if self.log is not None:
+            self.log.put(key, value, None if ttl is None else time.time() + ttl)
+
         # quadratic probing required
+        self.rehash_some(self.rehash_step)
 
-        # get load factor
-        load_factor = self.table_load()
+        # get load factor, counting tombstones since they lengthen probe sequences just like live entries
+        load_factor = self.occupied_load()
 
-        # resize if load factor is >= 0.5
+        # resize if load factor is >= 0.5; if live entries alone fill less than half of that,
+        # clearing out the tombstones frees enough room without growing
         if load_factor >= 0.5:
-            self.resize_table(self.capacity * 2)
+            if self.table_load() < 0.25:
+                self.compact()
+            else:
+                self.start_resize(self.capacity * 2)
 
-        # set counter
-        counter = 0
-
-        # get index from hash
-        index = self.get_hash_index(key) % self.capacity
-
-        # insert value at index if the spot there is empty
-        if self.buckets[index] is None:
-            self.buckets[index] = HashEntry(key, value)
-            self.size += 1
-        elif self.buckets[index].key == key:
-            self.buckets[index] = HashEntry(key, value)
-        elif self.buckets[index].is_tombstone:
-            self.buckets[index] = HashEntry(key, value)
-            self.size += 1
-        else:
-            # keep rehashing index and probing until a free spot is found, then insert key/value pair
-            counter += 1
-            new_index = (index + counter ** 2) % self.capacity
-            while self.buckets[new_index] is not None and counter <= self.capacity:
-                # replace value if key is already in table
-                if self.buckets[new_index].key == key:
-                    self.buckets[new_index] = HashEntry(key, value)
-                    break
-                # replace value at tombstone locations
-                elif self.buckets[new_index].is_tombstone:
-                    self.buckets[index] = HashEntry(key, value)
-                    self.size += 1
-                    break
-                counter += 1
-                new_index = (index + counter ** 2) % self.capacity
-            # add value at locations where nothing is there yet
-            if self.buckets[new_index] is None:
-                self.buckets[new_index] = HashEntry(key, value)
-                self.size += 1
+        hash = self.hash_function(key)
+
+        # while resizing incrementally, new entries only go into the current table,
+        # so retire the key from the old table if it is still there
+        if self.old_buckets is not None:
+            index = self.find_index(key, hash, self.old_buckets, self.old_capacity)
+            if index != -1:
+                self.old_buckets[index].is_tombstone = True
+                self.size -= 1
+                if getattr(self.old_buckets[index], 'expires', None) is not None:
+                    self.expiring -= 1
+
+        # store the hash on the entry so it never has to be computed again
+        entry = HashEntry(key, value)
+        entry.hash = hash
+        if ttl is not None:
+            entry.expires = self.clock() + ttl
+            self.expiring += 1
+        self.insert_entry(entry)
+
+        if self.expiring:
+            self.reap(self.reap_step)
+
+    def put_many(self, items) -> None:
+        """
+        Puts every key / value pair from an iterable of pairs. If the iterable knows its length, the table is
+        grown once up front instead of doubling repeatedly; keys are hashed a batch at a time, and the
+        load factor is checked once per batch instead of once per pair.
+        """
+        # bulk loads work on a single table
+        self.finish_resize()
+
+        # presize from the length hint so the whole load fits below a 0.5 load factor
+        self.reserve(self.size + self.tombstones + length_hint(items))
+
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, BATCH_SIZE))
+            if not batch:
+                return
+
+            # a durable map logs the whole batch with one write
+            if self.log is not None:
+                self.log.put_many(batch)
+
+            # make room for the whole batch, then insert it without further checks
+            self.reserve(self.size + self.tombstones + len(batch))
+
+            hashes = [self.hash_function(key) for key, _ in batch]
+            for (key, value), hash in zip(batch, hashes):
+                entry = HashEntry(key, value)
+                entry.hash = hash
+                self.insert_entry(entry)
+
+    @classmethod
+    def from_items(cls, items, function, capacity: int = None) -> 'HashMap':
+        """
+        Returns a new HashMap holding the given key / value pairs. Unless a capacity is given, the table is
+        sized from the length of items (when known) so every pair fits without a resize.
+        """
+        if capacity is None:
+            capacity = 2 * length_hint(items) + 1
+
+        m = cls(capacity, function)
+        m.put_many(items)
+        return m
+
+    def save(self, path: str) -> None:
+        """
+        Writes the hash map to a snapshot file at path: its capacity, hash function, and the slot, stored
+        hash and expiry time of every entry and tombstone; expired entries are saved as tombstones (see snapshot.py).
+        """
+        # imported here: snapshot imports the other HashMap modules
+        import snapshot
+        snapshot.save_oa(self, path)
+
+    @classmethod
+    def load(cls, path: str, function=None, lazy: bool = False) -> 'HashMap':
+        """
+        Returns the hash map saved at path. function defaults to the saved hash function; when it is that
+        function, every entry goes straight back into its saved slot without probing, otherwise the keys are
+        hashed and inserted again. With lazy=True, returns a read-only snapshot.HashMap that reads the file
+        through mmap as keys are looked up, so loading does not take longer for bigger maps.
+        """
+        import snapshot
+        if lazy:
+            return snapshot.HashMap(path, function)
+
+        header, index, hashes, keys, values, expiries = snapshot.read(path)
+        function, trusted = snapshot.check_function(header, function, snapshot.OA)
+        m = cls(0, function)
+        m.capacity = header['capacity']
+        m.buckets = DynamicArray([None] * m.capacity)
+        if not trusted:
+            m.put_many(zip(keys, values))
+            # putting the keys that had a ttl again with the time they have left restores their expiry,
+            # and keys whose time ran out since the snapshot was saved are dropped
+            for key, value, expires in zip(keys, values, expiries or ()):
+                left = snapshot.time_left(expires)
+                if left is not None and left > 0:
+                    m.put(key, value, left)
+                elif left is not None:
+                    m.remove(key)
+            return m
+
+        # the saved slots keep every probe sequence intact, tombstones included
+        buckets = m.buckets.data
+        now = m.clock()
+        for slot, entry_number in enumerate(index):
+            left = None
+            if entry_number >= 0 and expiries is not None:
+                left = snapshot.time_left(expiries[entry_number])
+            # keys whose time ran out since the snapshot was saved become tombstones
+            if left is not None and left <= 0:
+                entry_number = snapshot.TOMBSTONE_SLOT
+            if entry_number >= 0:
+                entry = HashEntry(keys[entry_number], values[entry_number])
+                entry.hash = hashes[entry_number]
+                if left is not None:
+                    entry.expires = now + left
+                    m.expiring += 1
+                buckets[slot] = entry
+                m.size += 1
+            elif entry_number == snapshot.TOMBSTONE_SLOT:
+                entry = HashEntry(None, None)
+                entry.hash = None
+                entry.is_tombstone = True
+                buckets[slot] = entry
+                m.tombstones += 1
+        return m
+
+    def enable_stats(self, export_interval: float = None) -> object:
+        """
+        Starts counting this map's operations, probe lengths and resizes, and returns the hash_map_stats.Stats
+        that hold them (read them with its snapshot method). With export_interval, its exporters are called
+        with a snapshot every export_interval seconds. Maps without statistics pay nothing for them.
+        """
+        # imported here: hash_map_stats imports the HashMap modules
+        import hash_map_stats
+        return hash_map_stats.enable(self, export_interval)
+
+    def disable_stats(self) -> object:
+        """
+        Stops counting and returns the statistics collected so far, or None if none were being collected.
+        """
+        import hash_map_stats
+        return hash_map_stats.disable(self)
+
+    def set_durable(self, directory: str, fsync: str = 'always', interval: float = 0.05,
+                    checkpoint_bytes: int = 64 * 2 ** 20) -> None:
+        """
+        Makes every later put, remove and clear survive a crash: each is appended to a write-ahead log in
+        directory before it is applied, and HashMap.recover(directory) rebuilds the map. fsync is 'always'
+        (synced before returning), 'interval' (synced every interval seconds) or 'never'. Once the log
+        reaches checkpoint_bytes, a snapshot is written in the background and older logs are deleted.
+        See wal.py for the details.
+        """
+        # imported here: wal imports snapshot, which imports the other HashMap modules
+        import wal
+        self.log = wal.create(self, directory, fsync, interval, checkpoint_bytes)
+
+    @classmethod
+    def recover(cls, directory: str, function=None, fsync: str = 'always', interval: float = 0.05,
+                checkpoint_bytes: int = 64 * 2 ** 20) -> 'HashMap':
+        """
+        Returns the durable HashMap kept in directory, as of its last logged change, and keeps logging to it.
+        """
+        import wal
+        return wal.recover(cls, directory, function, fsync, interval, checkpoint_bytes)
+
+    def checkpoint(self) -> None:
+        """
+        Snapshots a durable map now and deletes the logs the snapshot replaces, so recovery has less to replay.
+        """
+        self.log.checkpoint()
+
+    def close_log(self) -> None:
+        """
+        Syncs and closes a durable map's log; later changes are no longer logged.
+        """
+        self.log.close()
+        self.log = None
+
+    def reserve(self, count: int) -> None:
+        """
+        Doubles the capacity with a single resize_table call until count occupied buckets
+        stay below a 0.5 load factor. Does nothing if they already do.
+        """
+        new_capacity = self.capacity
+        while count >= 0.5 * new_capacity:
+            new_capacity *= 2
+
+        if new_capacity != self.capacity:
+            self.resize_table(new_capacity)
 
     def remove(self, key: str) -> None:
         """
@@ -201,81 +414,136 @@ class HashMap:
         in the hash map, the method does nothing.
         """
         # quadratic probing required
+        self.rehash_some(self.rehash_step)
 
-        # set counter
-        counter = 0
+        hash = self.hash_function(key)
 
-        # get index from hash
-        index = self.get_hash_index(key) % self.capacity
+        # find the key in the current table, or in the old table during an incremental resize
+        buckets, index = self.buckets, self.find_index(key, hash, self.buckets, self.capacity)
+        if index == -1 and self.old_buckets is not None:
+            buckets, index = self.old_buckets, self.find_index(key, hash, self.old_buckets, self.old_capacity)
 
-        # insert value at index if the spot there is empty
-        if self.buckets[index] is None:
+        # do nothing if key is not found
+        if index == -1:
+            if self.expiring:
+                self.reap(self.reap_step)
             return
-        elif self.buckets[index].key == key:
-            if self.buckets[index].is_tombstone is False:
-                self.buckets[index].is_tombstone = True
-                self.size -= 1
+
+        if self.log is not None:
+            self.log.remove(key)
+
+        # flag the entry as a tombstone so probe sequences running through it stay intact
+        buckets[index].is_tombstone = True
+        self.size -= 1
+        self.modifications += 1
+        if getattr(buckets[index], 'expires', None) is not None:
+            self.expiring -= 1
+
+        # only the current table's tombstones are tracked; the old table is dropped once migrated
+        if buckets is self.buckets:
+            self.tombstones += 1
+            if self.compact_threshold is not None and self.tombstones >= self.compact_threshold * self.capacity:
+                self.compact()
+
+        if self.expiring:
+            self.reap(self.reap_step)
+
+    def get_many(self, keys, default: object = None) -> list:
+        """
+        Returns a list with the value of each of the given keys, in the same order, or default for keys
+        that are not in the hash map.
+        """
+        return [entry.value if entry is not None else default for entry in self.find_entries(keys)]
+
+    def contains_many(self, keys) -> list:
+        """
+        Returns a list with True for each of the given keys that is in the hash map and False otherwise,
+        in the same order as the keys.
+        """
+        return [entry is not None for entry in self.find_entries(keys)]
+
+    def find_entries(self, keys) -> list:
+        """
+        Returns the live entry holding each of the given keys (None for missing keys), in the same order
+        as the keys. The keys are hashed as a batch, repeated keys are probed only once, and the probing
+        reads the table's underlying list directly instead of going through the bounds-checked DynamicArray.
+        """
+        keys = list(keys)
+        # keys the prefilter rules out are neither hashed nor probed for
+        prefilter = self.prefilter
+        if prefilter is None:
+            hashes = [self.hash_function(key) for key in keys]
         else:
-            # otherwise, keep rehashing index and probing until key is found
-            counter += 1
-            new_index = (index + counter ** 2) % self.capacity
-            while self.buckets[new_index] is not None and counter <= self.capacity:
-                # update tombstone flag for a HashEntry if the appropriate key is found and
-                # the tombstone flag hasn't already been updated
-                if self.buckets[new_index].key == key:
-                    if self.buckets[new_index].is_tombstone is False:
-                        self.buckets[new_index].is_tombstone = True
-                        self.size -= 1
-                counter += 1
-                new_index = (index + counter ** 2) % self.capacity
-            # do nothing if key is not found
-            if self.buckets[new_index] is None:
-                return
+            hashes = [self.hash_function(key) if key in prefilter else None for key in keys]
+
+        # a batch advances an incremental resize by one step, like a single lookup
+        self.rehash_some(self.rehash_step)
+
+        buckets, capacity = self.buckets.data, self.capacity
+        found = {}
+        entries = []
+        for key, hash in zip(keys, hashes):
+            if hash is None:
+                entries.append(None)
+                continue
+            if key in found:
+                entries.append(found[key])
+                continue
+
+            result = None
+            if self.expiring:
+                # keys with a ttl need the expiry checks of find_index
+                index = self.find_index(key, hash, self.buckets, self.capacity)
+                if index != -1:
+                    result = buckets[index]
+            else:
+                index = hash % capacity
+                for counter in range(capacity):
+                    entry = buckets[(index + counter * counter) % capacity]
+                    if entry is None:
+                        break
+                    if entry.hash == hash and entry.key == key and entry.is_tombstone is False:
+                        result = entry
+                        break
+
+            # keys that are not in the current table may not have been migrated yet
+            if result is None and self.old_buckets is not None:
+                old_index = self.find_index(key, hash, self.old_buckets, self.old_capacity)
+                if old_index != -1:
+                    result = self.old_buckets[old_index]
+
+            found[key] = result
+            entries.append(result)
+
+        return entries
 
     def contains_key(self, key: str) -> bool:
         """
         Returns True if the given key is in the hash map, otherwise it returns False.
         """
-        # quadratic probing required
-
-        # get index from hash
-        index = self.get_hash_index(key)
-        # set counter
-        counter = 0
-
-        if self.buckets[index] is None:
+        if self.prefilter is not None and key not in self.prefilter:
             return False
-        elif self.buckets[index].key == key:
-            return True
 
-        # rehash and get new index if key not yet found
-        counter += 1
-        new_index = (index + counter ** 2) % self.capacity
+        # quadratic probing required
+        self.rehash_some(self.rehash_step)
+
+        hash = self.hash_function(key)
 
-        # check if key is found with first rehashing of index
-        if self.buckets[new_index] is None:
-            return False
-        elif self.buckets[new_index].key == key:
+        if self.find_index(key, hash, self.buckets, self.capacity) != -1:
             return True
 
-        # keep rehashing and probing until key is found
-        while self.buckets[new_index].key != key and counter <= self.capacity:
-            counter += 1
-            new_index = (index + counter ** 2) % self.capacity
-            if self.buckets[new_index] is None:
-                return False
+        if self.old_buckets is not None:
+            return self.find_index(key, hash, self.old_buckets, self.old_capacity) != -1
 
-        if self.buckets[new_index].key == key:
-            return True
-        else:
-            return False
+        return False
 
     def empty_buckets(self) -> int:
         """
         Returns the number of empty buckets in the hash table.
         """
         # god bless Hannah Boehm for this idea
-        return self.capacity - self.size
+        # (tombstones are not empty: they still have to be probed through)
+        return self.capacity - self.size - self.tombstones
 
     def table_load(self) -> float:
         """
@@ -283,6 +551,40 @@ class HashMap:
         """
         return self.size / self.capacity
 
+    def occupied_load(self) -> float:
+        """
+        Returns the fraction of the hash table taken up by live entries and tombstones together.
+        """
+        return (self.size + self.tombstones) / self.capacity
+
+    def compact(self) -> None:
+        """
+        Rehashes the live entries at the same capacity, clearing out every tombstone in the current table.
+        """
+        # complete any incremental resize so every entry lives in the current table
+        self.finish_resize()
+
+        # collect the live entries and empty the table in place
+        entries = []
+        for index in range(self.capacity):
+            entry = self.buckets[index]
+            if entry is not None and entry.is_tombstone is False:
+                entries.append(entry)
+            self.buckets[index] = None
+        self.tombstones = 0
+        self.modifications += 1
+
+        # the entries are about to be added to a new prefilter, which drops the bits of removed keys;
+        # with the resize finished above they include every key, so the prefilter misses none
+        if self.prefilter is not None:
+            self.prefilter = self.new_prefilter(self.prefilter.target_rate)
+
+        # reinsert the same entry objects, counting them again, so the size stays right even if an
+        # insert has to grow the table (resize_table counts only the entries already back in it)
+        self.size = 0
+        for entry in entries:
+            self.insert_entry(entry)
+
     def resize_table(self, new_capacity: int) -> None:
         """
         Changes the capacity of the internal hash table. All existing key/value pairs will transfer to the new
@@ -292,21 +594,138 @@ class HashMap:
         if new_capacity < 1 or new_capacity < self.size:
             return
 
+        # complete any incremental resize so every entry lives in the current table
+        self.finish_resize()
+
         # store current hash table
         curr_table = self.buckets
 
+        # the entries are about to be added to a new prefilter, which drops the bits of removed keys
+        if self.prefilter is not None:
+            self.prefilter = self.new_prefilter(self.prefilter.target_rate)
+
         # reset buckets and other attributes
         self.buckets = DynamicArray()
         self.size = 0
+        self.tombstones = 0
+        self.modifications += 1
         self.capacity = new_capacity
         for i in range(new_capacity):
             self.buckets.append(None)
 
-        # rehash and refill the buckets
+        # refill the buckets with the same entries, placed by their stored hashes
         for i in range(curr_table.length()):
             if curr_table[i] is not None and curr_table[i].is_tombstone is False:
-                self.put(curr_table[i].key, curr_table[i].value)
+                self.insert_entry(curr_table[i])
+
+    def set_incremental_resize(self, step: int = 8) -> None:
+        """
+        Makes the automatic resize in put incremental: instead of rehashing the whole table at once, the old
+        table is kept alongside the new one and step of its buckets are moved over on every
+        get/put/remove/contains_key. Passing None goes back to rehashing everything at once.
+        """
+        if step is not None and step < 1:
+            raise ValueError("step must be at least 1")
+
+        if step is None:
+            self.finish_resize()
+        self.rehash_step = step
+
+    def start_resize(self, new_capacity: int, buckets: DynamicArray = None) -> None:
+        """
+        Resizes the table to new_capacity, either at once with resize_table or, in incremental mode,
+        by switching to an empty table of the new capacity and migrating the old buckets a few at a time.
+        In incremental mode, buckets may be that empty table built beforehand, as the asyncio facade
+        (hash_map_async.py) does a chunk at a time.
+        """
+        if self.rehash_step is None:
+            self.resize_table(new_capacity)
+            return
+
+        if new_capacity < 1 or new_capacity < self.size:
+            return
+
+        # only one migration can be in flight at a time
+        self.finish_resize()
 
+        self.old_buckets = self.buckets
+        self.old_capacity = self.capacity
+        self.rehash_index = 0
+
+        # build the empty table in one allocation so starting the resize stays cheap
+        if buckets is None:
+            buckets = DynamicArray([None] * new_capacity)
+        self.buckets = buckets
+        self.capacity = new_capacity
+        self.tombstones = 0
+        self.modifications += 1
+
+    def rehash_some(self, count: int) -> None:
+        """
+        Moves the live entries of up to count buckets of the old table into the current table
+        during an incremental resize.
+        """
+        if self.old_buckets is None:
+            return
+
+        # the insert below can fall back to resize_table, which completes the migration itself,
+        # so the old table is re-checked on every step
+        while count > 0 and self.old_buckets is not None:
+            index = self.rehash_index
+            self.rehash_index += 1
+            count -= 1
+
+            entry = self.old_buckets[index]
+            if entry is not None and entry.is_tombstone is False:
+                # leave a tombstone behind so probe sequences through this bucket still reach
+                # the entries that have not been moved yet
+                self.old_buckets[index] = MOVED
+                self.insert_entry(entry, counted=True)
+
+            # the migration is done once every old bucket has been moved
+            if self.rehash_index == self.old_capacity:
+                self.old_buckets = None
+
+    def finish_resize(self) -> None:
+        """
+        Completes any incremental resize in progress.
+        """
+        if self.old_buckets is not None:
+            self.rehash_some(self.old_capacity - self.rehash_index)
+
+    def set_prefilter(self, false_positive_rate: float = 0.01) -> None:
+        """
+        Keeps a Bloom filter of the keys next to the table (see bloom.py), so get, contains_key and the batch
+        lookups return at once for most missing keys, without hashing them or walking a probe sequence; only
+        about false_positive_rate of the misses get past it. The filter is sized for twice the current number
+        of keys and rebuilt when the table resizes or compacts or the filter fills up, which also drops the
+        bits of removed keys. Passing None removes the filter. Its size in bytes is prefilter.memory().
+        """
+        if false_positive_rate is None:
+            self.prefilter = None
+        else:
+            self.prefilter = self.new_prefilter(false_positive_rate)
+            self.rebuild_prefilter()
+
+    def new_prefilter(self, false_positive_rate: float) -> BloomFilter:
+        """
+        Returns an empty Bloom filter with room for twice the keys in the map.
+        """
+        return BloomFilter(max(2 * self.size, 64), false_positive_rate)
+
+    def rebuild_prefilter(self) -> None:
+        """
+        Replaces the prefilter with a new one, sized for the current number of keys, holding every live key
+        in the map, including the ones an incremental resize has not moved yet.
+        """
+        prefilter = self.new_prefilter(self.prefilter.target_rate)
+        tables = [self.buckets] if self.old_buckets is None else [self.buckets, self.old_buckets]
+        for buckets in tables:
+            for index in range(buckets.length()):
+                entry = buckets[index]
+                if entry is not None and entry.is_tombstone is False:
+                    prefilter.add(entry.key)
+        self.prefilter = prefilter
 
     def get_keys(self) -> DynamicArray:
         """
@@ -316,12 +735,71 @@ class HashMap:
         keys_array = DynamicArray()
 
         # go through each bucket and its LinkedLists to add the keys to the array
+        now = self.clock() if self.expiring else None
         for index in range(self.capacity):
-            if self.buckets[index] is not None and self.buckets[index].is_tombstone is False:
+            if self.is_live(self.buckets[index], now):
                 keys_array.append(self.buckets[index].key)
 
+        # include the entries an incremental resize has not moved yet
+        if self.old_buckets is not None:
+            for index in range(self.rehash_index, self.old_capacity):
+                if self.is_live(self.old_buckets[index], now):
+                    keys_array.append(self.old_buckets[index].key)
+
         return keys_array
 
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the hash map, like keys().
+        """
+        return self.keys()
+
+    def keys(self):
+        """
+        Yields every key in the hash map, read straight from the buckets without building an array.
+        """
+        for entry in self.iter_entries():
+            yield entry.key
+
+    def values(self):
+        """
+        Yields every value in the hash map, read straight from the buckets without building an array.
+        """
+        for entry in self.iter_entries():
+            yield entry.value
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map, read straight from the buckets without building an array.
+        """
+        for entry in self.iter_entries():
+            yield entry.key, entry.value
+
+    def iter_entries(self):
+        """
+        Yields every live entry in bucket order. Raises RuntimeError if entries are added, removed or moved
+        while the iteration is in progress; replacing the value of an existing key is allowed.
+        """
+        # move everything into one table first, so lookups made while iterating have nothing left to migrate
+        self.finish_resize()
+        modifications = self.modifications
+
+        buckets = self.buckets
+        for index in range(self.capacity):
+            entry = buckets[index]
+            if entry is not None and entry.is_tombstone is False:
+                if self.expiring and self.is_expired(entry, self.clock()):
+                    continue
+                yield entry
+                if self.modifications != modifications:
+                    raise RuntimeError("HashMap changed during iteration")
+
     def get_hash_index(self, key: str) -> int:
         """
         Args:
@@ -336,6 +814,159 @@ class HashMap:
 
         return index
 
+    def find_index(self, key: str, hash: int, buckets: DynamicArray, capacity: int) -> int:
+        """
+        Args:
+            key: the key to look for
+            hash: the key's hash, as returned by the HashMap's function
+            buckets: the table to probe
+            capacity: the capacity of that table
+
+        Returns: the index of the live entry holding the key, or -1 if the key is not in the table
+        """
+        index = hash % capacity
+        now = self.clock() if self.expiring else None
+
+        # probe quadratically until an empty bucket ends the sequence; tombstones are skipped over,
+        # and stored hashes are compared first so most other keys are skipped without a key comparison
+        for counter in range(capacity):
+            new_index = (index + counter ** 2) % capacity
+            entry = buckets[new_index]
+            if entry is None:
+                return -1
+            # expired entries met along the way are reclaimed as tombstones
+            if now is not None and entry.is_tombstone is False and self.is_expired(entry, now):
+                self.expire_entry(buckets, new_index)
+                continue
+            if entry.hash == hash and entry.key == key and entry.is_tombstone is False:
+                return new_index
+
+        return -1
+
+    def probe_length(self, key: str) -> int:
+        """
+        Returns the number of buckets a lookup of key examines in the current table: the probes up to
+        and including its entry, or up to and including the empty bucket that ends the sequence.
+        """
+        hash = self.hash_function(key)
+        index = hash % self.capacity
+        for counter in range(self.capacity):
+            entry = self.buckets[(index + counter ** 2) % self.capacity]
+            if entry is None or (entry.hash == hash and entry.key == key and entry.is_tombstone is False):
+                return counter + 1
+        return self.capacity
+
+    def insert_entry(self, entry: HashEntry, counted: bool = False) -> None:
+        """
+        Places the entry in the current table by its stored hash, replacing the live entry with the same key
+        if there is one, otherwise reusing the first tombstone or empty bucket on the key's probe sequence.
+        counted is True when the entry is already included in self.size.
+        """
+        while True:
+            index, found = self.find_slot(entry.key, entry.hash)
+            if found:
+                # replace value if key is already in table
+                current = self.buckets[index]
+                self.buckets[index] = entry
+                if counted:
+                    self.size -= 1
+                if getattr(current, 'expires', None) is not None:
+                    self.expiring -= 1
+                return
+
+            if index != -1:
+                if self.buckets[index] is not None:
+                    self.tombstones -= 1
+                self.buckets[index] = entry
+                self.modifications += 1
+                if not counted:
+                    self.size += 1
+                if self.prefilter is not None:
+                    self.prefilter.add(entry.key)
+                    if self.prefilter.is_full():
+                        self.rebuild_prefilter()
+                return
+
+            # the probe sequence can miss free buckets when the capacity is not prime; grow and try again.
+            # resize_table recounts the size from the entries in the table, which this one is not in yet
+            self.resize_table(self.capacity * 2)
+            counted = False
+
+    def find_slot(self, key: str, hash: int) -> tuple:
+        """
+        Args:
+            key: the key to place
+            hash: the key's hash, as returned by the HashMap's function
+
+        Returns: (index, True) for the bucket of the live entry holding the key in the current table, or else
+        (index, False) for the first tombstone or empty bucket on the key's probe sequence, with index -1
+        if the sequence has neither
+        """
+        index = hash % self.capacity
+        free_index = -1
+        now = self.clock() if self.expiring else None
+
+        for counter in range(self.capacity):
+            new_index = (index + counter ** 2) % self.capacity
+            current = self.buckets[new_index]
+            if current is None:
+                if free_index == -1:
+                    free_index = new_index
+                break
+            # an expired entry becomes a tombstone, and its bucket can be reused right away
+            if now is not None and current.is_tombstone is False and self.is_expired(current, now):
+                self.expire_entry(self.buckets, new_index)
+            if current.is_tombstone:
+                if free_index == -1:
+                    free_index = new_index
+            elif current.hash == hash and current.key == key:
+                return new_index, True
+
+        return free_index, False
+
+    def is_expired(self, entry: HashEntry, now: float) -> bool:
+        """
+        Returns True if the entry has an expiry time and it has passed.
+        """
+        expires = getattr(entry, 'expires', None)
+        return expires is not None and expires <= now
+
+    def is_live(self, entry: HashEntry, now: float) -> bool:
+        """
+        Returns True if the bucket holds an entry that is neither a tombstone nor expired. now is None
+        when no entry can expire.
+        """
+        return (entry is not None and entry.is_tombstone is False and
+                (now is None or not self.is_expired(entry, now)))
+
+    def expire_entry(self, buckets: DynamicArray, index: int) -> None:
+        """
+        Turns the expired entry at the index into a tombstone, as remove would.
+        """
+        buckets[index].is_tombstone = True
+        self.size -= 1
+        self.expiring -= 1
+        self.modifications += 1
+        if buckets is self.buckets:
+            self.tombstones += 1
+
+    def reap(self, count: int) -> int:
+        """
+        Checks the next count buckets of the table, carrying on from where the last call stopped, and reclaims
+        the expired entries among them. Called with reap_step on every put and remove while any key has a ttl,
+        so expired keys nobody looks up are reclaimed a few buckets at a time, never by a full scan.
+        Returns the number of entries reclaimed.
+        """
+        now = self.clock()
+        reclaimed = 0
+        for _ in range(min(count, self.capacity)):
+            self.reap_index = (self.reap_index + 1) % self.capacity
+            entry = self.buckets[self.reap_index]
+            if entry is not None and entry.is_tombstone is False and self.is_expired(entry, now):
+                self.expire_entry(self.buckets, self.reap_index)
+                reclaimed += 1
+        return reclaimed
+
 
 if __name__ == "__main__":
 
@@ -518,3 +1149,25 @@ if __name__ == "__main__":
     # m.remove('100')
     # m.resize_table(2)
     # print(m.get_keys())
+
+    print("\ncompact during an incremental resize")
+    print("------------------------------------")
+    m = HashMap(8, hash_function_2)
+    m.set_incremental_resize(1)
+    for i in range(40):
+        m.put('key' + str(i), i)
+    print(m.size, m.old_buckets is not None)
+    m.compact()
+    print(m.size, m.old_buckets is None, all(m.get('key' + str(i)) == i for i in range(40)))
+
+    print("\nprefilter after a compact during an incremental resize")
+    print("------------------------------------------------------")
+    m = HashMap(8, hash_function_2)
+    m.set_incremental_resize(1)
+    m.set_prefilter()
+    for i in range(40):
+        m.put('key' + str(i), i)
+    m.compact()
+    keys = ['key' + str(i) for i in range(40)]
+    print(all(m.contains_key(key) for key in keys), all(m.get(key) is not None for key in keys),
+          m.get_many(keys) == list(range(40)))
@@ -0,0 +1,528 @@
+# Description: This file contains a hash table that utilizes open addressing and quadratic probing for
+# resolving collisions, with the same interface as the HashMap in hash_map_oa.py but a compact storage layout.
+
+# Instead of a DynamicArray of HashEntry objects, the table is stored as parallel arrays, laid out like
+# CPython's compact dict: the slots probed by quadratic probing hold only a control byte (empty / tombstone / full)
+# and a 4-byte index into dense arrays of cached hashes, keys and values, which grow only as entries are added.
+# An entry costs about 35 bytes rather than a HashEntry object with its own __dict__ plus a list slot,
+# and overwriting a value or rehashing a key never allocates anything.
+# The HashMap class contains the same methods as the one in hash_map_oa.py, including:
+# (1) empty_buckets: returns the number of empty buckets in the hash table
+# (2) table_load: returns the current hash table load factor
+# (3) clear: clears the contents of the hash map without changing the underlying capacity
+# (4) put: updates the key/value pairs in the hash map
+# (5) contains_key: confirms if a given key is in the hash map
+# (6) get: returns the value associated with the given key
+# (7) remove: removes the given key and its associated value from the hash map
+# (8) resize_table: changes the capacity of the internal hash table
+# (9) get_keys: returns a DynamicArray that contains all the keys stored in the hash map
+
+from array import array
+from itertools import islice
+from operator import length_hint
+
+from a6_include import *
+from hash_map_oa import BATCH_SIZE, hash_function_1, hash_function_2
+
+
+# slot states stored in the control array
+EMPTY = 0
+TOMBSTONE = 1
+FULL = 2
+
+# cached hashes are kept as unsigned 64-bit integers
+HASH_MASK = (1 << 64) - 1
+
+# placeholder left in the dense key array when an entry is removed
+DELETED = object()
+
+
+class HashMap:
+    # fraction of the table tombstones may fill before remove compacts it in place
+    # (None turns automatic compaction off)
+    compact_threshold = 0.25
+
+    # bumped by every change to which slots hold entries, so iterators can detect it
+    modifications = 0
+
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses Quadratic Probing for collision resolution,
+        stored as a control byte and an entry index per slot plus dense arrays of hashes, keys and values
+        """
+        self.capacity = capacity
+        self.hash_function = function
+        self.size = 0
+        self.tombstones = 0
+        self.allocate(capacity)
+        self.entry_hashes = array('Q')
+        self.entry_keys = []
+        self.entry_values = []
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form
+        """
+        out = ''
+        for i in range(self.capacity):
+            if self.control[i] == FULL:
+                entry = self.slot_entries[i]
+                slot = f"K: {self.entry_keys[entry]} V: {self.entry_values[entry]} TS: False"
+            elif self.control[i] == TOMBSTONE:
+                slot = 'TS: True'
+            else:
+                slot = 'None'
+            out += str(i) + ': ' + slot + '\n'
+        return out
+
+    def allocate(self, capacity: int) -> None:
+        """
+        Replaces the slots with empty ones for the given capacity.
+        """
+        self.control = bytearray(capacity)
+        self.slot_entries = array('i', bytes(4 * capacity))
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map; it does not change the underlying hash table capacity.
+        """
+        self.size = 0
+        self.tombstones = 0
+        self.modifications += 1
+        self.allocate(self.capacity)
+        self.entry_hashes = array('Q')
+        self.entry_keys = []
+        self.entry_values = []
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key or None if the key is not found.
+        """
+        index = self.find_index(key, self.hash_function(key) & HASH_MASK)
+        if index != -1:
+            return self.entry_values[self.slot_entries[index]]
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key / value pair in the hash map. If the given key already exists in
+        the hash map, its associated value must be replaced with the new value. If the given key is
+        not in the hash map, a key / value pair must be added.
+        """
+        # resize when live entries plus tombstones fill half the table; if live entries alone
+        # fill less than half of that, clearing out the tombstones frees enough room without growing
+        if self.occupied_load() >= 0.5:
+            if self.table_load() < 0.25:
+                self.compact()
+            else:
+                self.resize_table(self.capacity * 2)
+
+        self.insert(key, value, self.hash_function(key) & HASH_MASK)
+
+    def put_many(self, items) -> None:
+        """
+        Puts every key / value pair from an iterable of pairs. If the iterable knows its length, the table is
+        grown once up front instead of doubling repeatedly; keys are hashed a batch at a time, and the
+        load factor is checked once per batch instead of once per pair.
+        """
+        # presize from the length hint so the whole load fits below a 0.5 load factor
+        self.reserve(self.size + self.tombstones + length_hint(items))
+
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, BATCH_SIZE))
+            if not batch:
+                return
+
+            # make room for the whole batch, then insert it without further checks
+            self.reserve(self.size + self.tombstones + len(batch))
+
+            hashes = [self.hash_function(key) & HASH_MASK for key, _ in batch]
+            for (key, value), hash in zip(batch, hashes):
+                self.insert(key, value, hash)
+
+    @classmethod
+    def from_items(cls, items, function, capacity: int = None) -> 'HashMap':
+        """
+        Returns a new HashMap holding the given key / value pairs. Unless a capacity is given, the table is
+        sized from the length of items (when known) so every pair fits without a resize.
+        """
+        if capacity is None:
+            capacity = 2 * length_hint(items) + 1
+
+        m = cls(capacity, function)
+        m.put_many(items)
+        return m
+
+    def reserve(self, count: int) -> None:
+        """
+        Doubles the capacity with a single resize_table call until count occupied slots
+        stay below a 0.5 load factor. Does nothing if they already do.
+        """
+        new_capacity = self.capacity
+        while count >= 0.5 * new_capacity:
+            new_capacity *= 2
+
+        if new_capacity != self.capacity:
+            self.resize_table(new_capacity)
+
+    def insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Stores the key / value pair in the slot holding the key, or in the first free slot on its
+        probe sequence, without checking the load factor.
+        """
+        while True:
+            index = self.find_insert_index(key, hash)
+            if index != -1:
+                break
+            # the probe sequence can miss free buckets when the capacity is not prime; grow and try again
+            self.resize_table(self.capacity * 2)
+
+        # replace the value in place if the key is already in the table
+        if self.control[index] == FULL:
+            self.entry_values[self.slot_entries[index]] = value
+            return
+
+        if self.control[index] == TOMBSTONE:
+            self.tombstones -= 1
+        self.control[index] = FULL
+        self.slot_entries[index] = len(self.entry_keys)
+        self.entry_hashes.append(hash)
+        self.entry_keys.append(key)
+        self.entry_values.append(value)
+        self.size += 1
+        self.modifications += 1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map. If the key is not
+        in the hash map, the method does nothing.
+        """
+        index = self.find_index(key, self.hash_function(key) & HASH_MASK)
+        if index == -1:
+            return
+
+        # leave a tombstone so probe sequences running through this slot stay intact,
+        # and drop the references so the key and value can be freed
+        entry = self.slot_entries[index]
+        self.control[index] = TOMBSTONE
+        self.entry_keys[entry] = DELETED
+        self.entry_values[entry] = None
+        self.size -= 1
+        self.tombstones += 1
+        self.modifications += 1
+
+        # reusing a tombstone appends a new dense entry, so the holes left in the dense arrays
+        # (never fewer than the tombstones) are what decides when to compact
+        holes = len(self.entry_keys) - self.size
+        if self.compact_threshold is not None and holes >= self.compact_threshold * self.capacity:
+            self.compact()
+
+    def get_many(self, keys, default: object = None) -> list:
+        """
+        Returns a list with the value of each of the given keys, in the same order, or default for keys
+        that are not in the hash map.
+        """
+        values = self.entry_values
+        return [values[entry] if entry != -1 else default for entry in self.find_entries(keys)]
+
+    def contains_many(self, keys) -> list:
+        """
+        Returns a list with True for each of the given keys that is in the hash map and False otherwise,
+        in the same order as the keys.
+        """
+        return [entry != -1 for entry in self.find_entries(keys)]
+
+    def find_entries(self, keys) -> list:
+        """
+        Returns the dense entry index of each of the given keys (-1 for missing keys), in the same order
+        as the keys. The keys are hashed as a batch and repeated keys are probed only once.
+        """
+        keys = list(keys)
+        hashes = [self.hash_function(key) & HASH_MASK for key in keys]
+
+        control, slot_entries = self.control, self.slot_entries
+        entry_hashes, entry_keys = self.entry_hashes, self.entry_keys
+        capacity = self.capacity
+        found = {}
+        entries = []
+        for key, hash in zip(keys, hashes):
+            if key in found:
+                entries.append(found[key])
+                continue
+
+            result = -1
+            index = hash % capacity
+            for counter in range(capacity):
+                new_index = (index + counter * counter) % capacity
+                state = control[new_index]
+                if state == EMPTY:
+                    break
+                if state == FULL:
+                    entry = slot_entries[new_index]
+                    if entry_hashes[entry] == hash and entry_keys[entry] == key:
+                        result = entry
+                        break
+
+            found[key] = result
+            entries.append(result)
+
+        return entries
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise it returns False.
+        """
+        return self.find_index(key, self.hash_function(key) & HASH_MASK) != -1
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+        """
+        return self.capacity - self.size - self.tombstones
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor.
+        """
+        return self.size / self.capacity
+
+    def occupied_load(self) -> float:
+        """
+        Returns the fraction of the hash table taken up by live entries and tombstones together.
+        """
+        return (self.size + self.tombstones) / self.capacity
+
+    def compact(self) -> None:
+        """
+        Rehashes the live entries at the same capacity, clearing out every tombstone.
+        """
+        self.rebuild(self.capacity)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the internal hash table. All existing key/value pairs will transfer to the new
+        hash table, and all hash table links will be rehashed. Does nothing if the new capacity is less than 1.
+        """
+        if new_capacity < 1 or new_capacity < self.size:
+            return
+
+        self.rebuild(new_capacity)
+
+    def rebuild(self, new_capacity: int) -> None:
+        """
+        Squeezes removed entries out of the dense arrays and places every live entry in fresh slots
+        of the given capacity by its cached hash, so no key is hashed again.
+        """
+        self.modifications += 1
+
+        # drop the holes left by remove; live entries keep their insertion order
+        if len(self.entry_keys) != self.size:
+            live = [i for i in range(len(self.entry_keys)) if self.entry_keys[i] is not DELETED]
+            self.entry_hashes = array('Q', [self.entry_hashes[i] for i in live])
+            self.entry_keys = [self.entry_keys[i] for i in live]
+            self.entry_values = [self.entry_values[i] for i in live]
+
+        while True:
+            self.capacity = new_capacity
+            self.tombstones = 0
+            self.allocate(new_capacity)
+
+            for entry in range(self.size):
+                index = self.find_free_index(self.entry_hashes[entry])
+                if index == -1:
+                    break
+                self.control[index] = FULL
+                self.slot_entries[index] = entry
+            else:
+                return
+
+            # the probe sequence can miss free buckets when the capacity is not prime; grow and try again
+            new_capacity *= 2
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys stored in the hash map.
+        """
+        keys_array = DynamicArray()
+
+        for key in self.entry_keys:
+            if key is not DELETED:
+                keys_array.append(key)
+
+        return keys_array
+
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the hash map, like keys().
+        """
+        return self.keys()
+
+    def keys(self):
+        """
+        Yields every key in the hash map in insertion order, read straight from the dense arrays.
+        """
+        keys = self.entry_keys
+        for entry in self.iter_entries():
+            yield keys[entry]
+
+    def values(self):
+        """
+        Yields every value in the hash map in insertion order, read straight from the dense arrays.
+        """
+        values = self.entry_values
+        for entry in self.iter_entries():
+            yield values[entry]
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map in insertion order, read straight from the dense arrays.
+        """
+        keys, values = self.entry_keys, self.entry_values
+        for entry in self.iter_entries():
+            yield keys[entry], values[entry]
+
+    def iter_entries(self):
+        """
+        Yields the dense index of every live entry. Raises RuntimeError if entries are added, removed or moved
+        while the iteration is in progress; replacing the value of an existing key is allowed.
+        """
+        modifications = self.modifications
+        keys = self.entry_keys
+
+        for entry in range(len(keys)):
+            if keys[entry] is not DELETED:
+                yield entry
+                if self.modifications != modifications:
+                    raise RuntimeError("HashMap changed during iteration")
+
+    def find_index(self, key: str, hash: int) -> int:
+        """
+        Args:
+            key: the key to look for
+            hash: the key's hash, masked with HASH_MASK
+
+        Returns: the index of the slot holding the key, or -1 if the key is not in the table
+        """
+        control, slot_entries = self.control, self.slot_entries
+        hashes, keys = self.entry_hashes, self.entry_keys
+        capacity = self.capacity
+        index = hash % capacity
+
+        # probe quadratically until an empty slot ends the sequence; the cached hash
+        # is compared first so most non-matching keys are skipped without a key comparison
+        for counter in range(capacity):
+            new_index = (index + counter * counter) % capacity
+            state = control[new_index]
+            if state == EMPTY:
+                return -1
+            if state == FULL:
+                entry = slot_entries[new_index]
+                if hashes[entry] == hash and keys[entry] == key:
+                    return new_index
+
+        return -1
+
+    def find_insert_index(self, key: str, hash: int) -> int:
+        """
+        Returns the index of the slot holding the key if it is in the table, otherwise the first
+        tombstone or empty slot on its probe sequence, or -1 if the sequence has no free slot.
+        """
+        control, slot_entries = self.control, self.slot_entries
+        hashes, keys = self.entry_hashes, self.entry_keys
+        capacity = self.capacity
+        index = hash % capacity
+        free_index = -1
+
+        for counter in range(capacity):
+            new_index = (index + counter * counter) % capacity
+            state = control[new_index]
+            if state == EMPTY:
+                return new_index if free_index == -1 else free_index
+            if state == TOMBSTONE:
+                if free_index == -1:
+                    free_index = new_index
+            else:
+                entry = slot_entries[new_index]
+                if hashes[entry] == hash and keys[entry] == key:
+                    return new_index
+
+        return free_index
+
+    def find_free_index(self, hash: int) -> int:
+        """
+        Returns the first empty slot on the probe sequence of a key that is known not to be
+        in the table (used while rebuilding), or -1 if there is none.
+        """
+        control, capacity = self.control, self.capacity
+        index = hash % capacity
+
+        for counter in range(capacity):
+            new_index = (index + counter * counter) % capacity
+            if control[new_index] == EMPTY:
+                return new_index
+
+        return -1
+
+
+if __name__ == "__main__":
+
+    print("\nPDF - put example 1")
+    print("-------------------")
+    m = HashMap(50, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), m.table_load(), m.size, m.capacity)
+
+    print("\nPDF - put example 2")
+    print("-------------------")
+    m = HashMap(40, hash_function_2)
+    for i in range(50):
+        m.put('str' + str(i // 3), i * 100)
+        if i % 10 == 9:
+            print(m.empty_buckets(), m.table_load(), m.size, m.capacity)
+
+    print("\nPDF - remove example 1")
+    print("----------------------")
+    m = HashMap(50, hash_function_1)
+    print(m.get('key1'))
+    m.put('key1', 10)
+    print(m.get('key1'))
+    m.remove('key1')
+    print(m.get('key1'))
+    m.remove('key4')
+
+    print("\nPDF - resize example 1")
+    print("----------------------")
+    m = HashMap(20, hash_function_1)
+    m.put('key1', 10)
+    print(m.size, m.capacity, m.get('key1'), m.contains_key('key1'))
+    m.resize_table(30)
+    print(m.size, m.capacity, m.get('key1'), m.contains_key('key1'))
+
+    print("\nPDF - resize example 2")
+    print("----------------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(1, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.size, m.capacity)
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            result &= m.contains_key(str(key))
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.size, m.capacity, round(m.table_load(), 2))
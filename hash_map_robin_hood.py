@@ -0,0 +1,473 @@
+# Description: This file contains a hash table that utilizes open addressing with Robin Hood linear probing for
+# resolving collisions, with the same interface as the HashMap in hash_map_oa.py.
+
+# Every slot records its entry's probe distance: how many slots past hash % capacity the entry sits. An insert
+# walks forward from the key's home slot, and whenever it meets an entry closer to its own home than the new entry
+# is, the two swap and the insert carries on with the displaced entry, so no entry is ever much further from home
+# than the others. That keeps probe lengths short and even at high load, and it makes misses cheap: a lookup can
+# stop as soon as it reaches a slot whose distance is smaller than its own, because the key would have been
+# placed there. Remove shifts the following entries of the cluster back one slot instead of leaving a tombstone,
+# so the table never fills up with deleted slots. The table is stored as parallel per-slot lists of keys, values,
+# cached hashes and distances, and it grows once its load factor passes max_load_factor (0.875 by default).
+# The HashMap class contains the same methods as the one in hash_map_oa.py, including:
+# (1) empty_buckets: returns the number of empty buckets in the hash table
+# (2) table_load: returns the current hash table load factor
+# (3) clear: clears the contents of the hash map without changing the underlying capacity
+# (4) put: updates the key/value pairs in the hash map
+# (5) contains_key: confirms if a given key is in the hash map
+# (6) get: returns the value associated with the given key
+# (7) remove: removes the given key and its associated value from the hash map
+# (8) resize_table: changes the capacity of the internal hash table
+# (9) get_keys: returns a DynamicArray that contains all the keys stored in the hash map
+# (10) probe_histogram / probe_length: how far entries sit from their home slots, and the slots a lookup examines
+
+from itertools import islice
+from operator import length_hint
+
+from a6_include import *
+from hash_map_oa import BATCH_SIZE, hash_function_1, hash_function_2
+
+
+# distance stored in a slot that holds no entry; it is smaller than any real distance,
+# so lookups stop at empty slots without a separate check
+EMPTY = -1
+
+# cached hashes are kept as unsigned 64-bit integers
+HASH_MASK = (1 << 64) - 1
+
+
+class HashMap:
+    # load factor above which put grows the table
+    max_load_factor = 0.875
+
+    # bumped by every change to which slots hold entries, so iterators can detect it
+    modifications = 0
+
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses Robin Hood linear probing for collision resolution,
+        stored as per-slot lists of keys, values, hashes and probe distances
+        """
+        self.capacity = max(capacity, 1)
+        self.hash_function = function
+        self.size = 0
+        self.allocate(self.capacity)
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form
+        """
+        out = ''
+        for i in range(self.capacity):
+            if self.distances[i] != EMPTY:
+                slot = f"K: {self.slot_keys[i]} V: {self.slot_values[i]} D: {self.distances[i]}"
+            else:
+                slot = 'None'
+            out += str(i) + ': ' + slot + '\n'
+        return out
+
+    def allocate(self, capacity: int) -> None:
+        """
+        Replaces the slots with empty ones for the given capacity.
+        """
+        self.slot_keys = [None] * capacity
+        self.slot_values = [None] * capacity
+        self.slot_hashes = [0] * capacity
+        self.distances = [EMPTY] * capacity
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map; it does not change the underlying hash table capacity.
+        """
+        self.size = 0
+        self.modifications += 1
+        self.allocate(self.capacity)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key or None if the key is not found.
+        """
+        index = self.find_index(key, self.hash_function(key) & HASH_MASK)
+        if index != -1:
+            return self.slot_values[index]
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key / value pair in the hash map. If the given key already exists in
+        the hash map, its associated value must be replaced with the new value. If the given key is
+        not in the hash map, a key / value pair must be added.
+        """
+        # grow before the new entry would take the table past the maximum load factor
+        if self.size + 1 > self.max_load_factor * self.capacity:
+            self.resize_table(self.capacity * 2)
+
+        self.insert(key, value, self.hash_function(key) & HASH_MASK)
+
+    def put_many(self, items) -> None:
+        """
+        Puts every key / value pair from an iterable of pairs. If the iterable knows its length, the table is
+        grown once up front instead of doubling repeatedly; keys are hashed a batch at a time, and the
+        load factor is checked once per batch instead of once per pair.
+        """
+        # presize from the length hint so the whole load fits below the maximum load factor
+        self.reserve(self.size + length_hint(items))
+
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, BATCH_SIZE))
+            if not batch:
+                return
+
+            # make room for the whole batch, then insert it without further checks
+            self.reserve(self.size + len(batch))
+
+            hashes = [self.hash_function(key) & HASH_MASK for key, _ in batch]
+            for (key, value), hash in zip(batch, hashes):
+                self.insert(key, value, hash)
+
+    @classmethod
+    def from_items(cls, items, function, capacity: int = None) -> 'HashMap':
+        """
+        Returns a new HashMap holding the given key / value pairs. Unless a capacity is given, the table is
+        sized from the length of items (when known) so every pair fits without a resize.
+        """
+        if capacity is None:
+            capacity = int(length_hint(items) / cls.max_load_factor) + 1
+
+        m = cls(capacity, function)
+        m.put_many(items)
+        return m
+
+    def reserve(self, count: int) -> None:
+        """
+        Doubles the capacity with a single resize_table call until count entries
+        stay within the maximum load factor. Does nothing if they already do.
+        """
+        new_capacity = self.capacity
+        while count > self.max_load_factor * new_capacity:
+            new_capacity *= 2
+
+        if new_capacity != self.capacity:
+            self.resize_table(new_capacity)
+
+    def insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Stores the key / value pair in the slot holding the key, or takes the first slot on its probe sequence
+        whose entry is closer to its home than the new one would be, without checking the load factor.
+        """
+        keys, hashes, distances = self.slot_keys, self.slot_hashes, self.distances
+        capacity = self.capacity
+        index = hash % capacity
+        distance = 0
+
+        # until the new entry's distance passes the resident's, the key may still be further along
+        while distances[index] >= distance:
+            if hashes[index] == hash and keys[index] == key:
+                self.slot_values[index] = value
+                return
+            distance += 1
+            index += 1
+            if index == capacity:
+                index = 0
+
+        self.place(key, value, hash, index, distance)
+        self.size += 1
+        self.modifications += 1
+
+    def place(self, key: str, value: object, hash: int, index: int, distance: int) -> None:
+        """
+        Puts an entry known not to be in the table into the given slot, at the given distance from its home,
+        and carries whatever entry was there forward to the next slot it is entitled to, and so on until
+        an empty slot takes the last displaced entry.
+        """
+        keys, values, hashes, distances = self.slot_keys, self.slot_values, self.slot_hashes, self.distances
+        capacity = self.capacity
+
+        while True:
+            if distances[index] == EMPTY:
+                keys[index], values[index], hashes[index], distances[index] = key, value, hash, distance
+                return
+
+            # take the slot from an entry that is closer to its home, and rehome that one instead
+            if distances[index] < distance:
+                (key, keys[index]), (value, values[index]) = (keys[index], key), (values[index], value)
+                (hash, hashes[index]), (distance, distances[index]) = (hashes[index], hash), (distances[index], distance)
+
+            distance += 1
+            index += 1
+            if index == capacity:
+                index = 0
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map. If the key is not
+        in the hash map, the method does nothing.
+        """
+        index = self.find_index(key, self.hash_function(key) & HASH_MASK)
+        if index == -1:
+            return
+
+        # shift the rest of the cluster back one slot, until an empty slot or an entry already in its home
+        # slot, so the probe distances stay exact and no tombstone is needed
+        keys, values, hashes, distances = self.slot_keys, self.slot_values, self.slot_hashes, self.distances
+        capacity = self.capacity
+        following = index + 1 if index + 1 < capacity else 0
+        while distances[following] > 0:
+            keys[index], values[index], hashes[index] = keys[following], values[following], hashes[following]
+            distances[index] = distances[following] - 1
+            index = following
+            following = index + 1 if index + 1 < capacity else 0
+
+        keys[index], values[index], hashes[index], distances[index] = None, None, 0, EMPTY
+        self.size -= 1
+        self.modifications += 1
+
+    def get_many(self, keys, default: object = None) -> list:
+        """
+        Returns a list with the value of each of the given keys, in the same order, or default for keys
+        that are not in the hash map.
+        """
+        values = self.slot_values
+        return [values[index] if index != -1 else default for index in self.find_indices(keys)]
+
+    def contains_many(self, keys) -> list:
+        """
+        Returns a list with True for each of the given keys that is in the hash map and False otherwise,
+        in the same order as the keys.
+        """
+        return [index != -1 for index in self.find_indices(keys)]
+
+    def find_indices(self, keys) -> list:
+        """
+        Returns the slot index of each of the given keys (-1 for missing keys), in the same order
+        as the keys. The keys are hashed as a batch and repeated keys are probed only once.
+        """
+        keys = list(keys)
+        hashes = [self.hash_function(key) & HASH_MASK for key in keys]
+
+        slot_keys, slot_hashes, distances = self.slot_keys, self.slot_hashes, self.distances
+        capacity = self.capacity
+        found = {}
+        indices = []
+        for key, hash in zip(keys, hashes):
+            if key in found:
+                indices.append(found[key])
+                continue
+
+            result = -1
+            index = hash % capacity
+            distance = 0
+            while distances[index] >= distance:
+                if slot_hashes[index] == hash and slot_keys[index] == key:
+                    result = index
+                    break
+                distance += 1
+                index += 1
+                if index == capacity:
+                    index = 0
+
+            found[key] = result
+            indices.append(result)
+
+        return indices
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise it returns False.
+        """
+        return self.find_index(key, self.hash_function(key) & HASH_MASK) != -1
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+        """
+        return self.capacity - self.size
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor.
+        """
+        return self.size / self.capacity
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the internal hash table. All existing key/value pairs will transfer to the new
+        hash table, and all hash table links will be rehashed. Does nothing if the new capacity is less than 1
+        or would not leave at least one empty slot, which every probe and backward shift stops at.
+        """
+        if new_capacity < 1 or new_capacity <= self.size:
+            return
+
+        keys, values, hashes, distances = self.slot_keys, self.slot_values, self.slot_hashes, self.distances
+        self.capacity = new_capacity
+        self.allocate(new_capacity)
+        self.modifications += 1
+
+        # every key is known to be distinct, so entries are placed by their cached hashes with no key comparisons
+        for index in range(len(distances)):
+            if distances[index] != EMPTY:
+                hash = hashes[index]
+                self.place(keys[index], values[index], hash, hash % new_capacity, 0)
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys stored in the hash map.
+        """
+        keys_array = DynamicArray()
+
+        for index in range(self.capacity):
+            if self.distances[index] != EMPTY:
+                keys_array.append(self.slot_keys[index])
+
+        return keys_array
+
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the hash map, like keys().
+        """
+        return self.keys()
+
+    def keys(self):
+        """
+        Yields every key in the hash map in slot order, read straight from the slots.
+        """
+        keys = self.slot_keys
+        for index in self.iter_slots():
+            yield keys[index]
+
+    def values(self):
+        """
+        Yields every value in the hash map in slot order, read straight from the slots.
+        """
+        values = self.slot_values
+        for index in self.iter_slots():
+            yield values[index]
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map in slot order, read straight from the slots.
+        """
+        keys, values = self.slot_keys, self.slot_values
+        for index in self.iter_slots():
+            yield keys[index], values[index]
+
+    def iter_slots(self):
+        """
+        Yields the index of every full slot. Raises RuntimeError if entries are added, removed or moved
+        while the iteration is in progress; replacing the value of an existing key is allowed.
+        """
+        modifications = self.modifications
+        distances = self.distances
+
+        for index in range(self.capacity):
+            if distances[index] != EMPTY:
+                yield index
+                if self.modifications != modifications:
+                    raise RuntimeError("HashMap changed during iteration")
+
+    def probe_histogram(self) -> list:
+        """
+        Returns a list whose element d is the number of entries sitting d slots past their home slot,
+        so a successful lookup of one of them examines d + 1 slots.
+        """
+        histogram = []
+        for distance in self.distances:
+            if distance != EMPTY:
+                if distance >= len(histogram):
+                    histogram.extend([0] * (distance + 1 - len(histogram)))
+                histogram[distance] += 1
+        return histogram
+
+    def probe_length(self, key: str) -> int:
+        """
+        Returns the number of slots a lookup of the given key examines, whether or not it is in the table.
+        """
+        hash = self.hash_function(key) & HASH_MASK
+        index = hash % self.capacity
+        distance = 0
+        while self.distances[index] >= distance:
+            if self.slot_hashes[index] == hash and self.slot_keys[index] == key:
+                break
+            distance += 1
+            index = (index + 1) % self.capacity
+        return distance + 1
+
+    def find_index(self, key: str, hash: int) -> int:
+        """
+        Args:
+            key: the key to look for
+            hash: the key's hash, masked with HASH_MASK
+
+        Returns: the index of the slot holding the key, or -1 if the key is not in the table
+        """
+        keys, hashes, distances = self.slot_keys, self.slot_hashes, self.distances
+        capacity = self.capacity
+        index = hash % capacity
+        distance = 0
+
+        # probe linearly while the residents are at least as far from home as the key would be; past that point
+        # (an empty slot included) the key would have displaced the resident, so it is not in the table.
+        # The cached hash is compared first so most non-matching keys are skipped without a key comparison
+        while distances[index] >= distance:
+            if hashes[index] == hash and keys[index] == key:
+                return index
+            distance += 1
+            index += 1
+            if index == capacity:
+                index = 0
+
+        return -1
+
+
+if __name__ == "__main__":
+
+    print("\nPDF - put example 1")
+    print("-------------------")
+    m = HashMap(50, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.size, m.capacity)
+
+    print("\nPDF - remove example 1")
+    print("----------------------")
+    m = HashMap(50, hash_function_1)
+    print(m.get('key1'))
+    m.put('key1', 10)
+    print(m.get('key1'))
+    m.remove('key1')
+    print(m.get('key1'))
+    m.remove('key4')
+
+    print("\nPDF - resize example 2")
+    print("----------------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(1, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.size, m.capacity)
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            result &= m.contains_key(str(key))
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.size, m.capacity, round(m.table_load(), 2))
+
+    print("\nprobe histogram at load 0.875")
+    print("-----------------------------")
+    m = HashMap(8000, hash_function_2)
+    m.put_many(('key' + str(i), i) for i in range(7000))
+    print(round(m.table_load(), 3), m.probe_histogram()[:8])
@@ -12,8 +12,15 @@
 # (8) resize_table: changes the capacity of the internal hash table
 # (9) get_keys: returns a DynamicArray that contains all the keys stored in the hash map
 
+import time
+from itertools import islice
+from operator import length_hint
+
 from a6_include import *
+from bloom import BloomFilter
 
+# number of pairs put_many hashes and inserts at a time
+BATCH_SIZE = 1024
 
 def hash_function_1(key: str) -> int:
     """
@@ -40,6 +47,34 @@ def hash_function_2(key: str) -> int:
 
 
 class HashMap:
+    # automatic resizing policy, disabled by default; see set_resize_policy
+    max_load_factor = None
+    min_load_factor = None
+    growth_factor = 2
+    min_capacity = 1
+
+    # bumped by every change to which buckets hold nodes, so iterators can detect it
+    modifications = 0
+
+    # incremental resizing, disabled by default; see set_incremental_resize
+    rehash_step = None
+    old_buckets = None
+    old_capacity = 0
+    rehash_index = 0
+
+    # per-key expiry (see put's ttl): the number of nodes with an expiry time, the clock those times are
+    # read from, and the reaper's position and number of buckets it samples on every put / remove
+    expiring = 0
+    clock = time.monotonic
+    reap_index = 0
+    reap_step = 4
+
+    # opt-in hot-path statistics (see enable_stats)
+    stats = None
+
+    # Bloom filter of the keys that lets most misses return without searching a chain; see set_prefilter
+    prefilter = None
+
     def __init__(self, capacity: int, function) -> None:
         """
         Init new HashMap based on DA with SLL for collision resolution
@@ -64,71 +99,359 @@ class HashMap:
             out += str(i) + ': ' + str(list) + '\n'
         return out
 
-    def clear(self) -> None:
+    def clear(self, buckets: DynamicArray = None) -> None:
         """
         Clears the contents of the hash map; it does not change the underlying hash table capacity.
+        buckets may be an empty table of the same capacity built beforehand, as the asyncio
+        facade (hash_map_async.py) does a chunk at a time.
         """
-        # reset the buckets with an empty DynamicArray
-        self.buckets = DynamicArray()
+        # drop any table left over from an incremental resize
+        self.old_buckets = None
+        self.modifications += 1
 
-        # go through the new array and append a LinkedList at each index
-        for _ in range(self.capacity):
-            self.buckets.append(LinkedList())
+        if buckets is not None:
+            self.buckets = buckets
+        else:
+            # reset the buckets with an empty DynamicArray
+            self.buckets = DynamicArray()
+
+            # go through the new array and append a LinkedList at each index
+            for _ in range(self.capacity):
+                self.buckets.append(LinkedList())
 
         # reset the size
         self.size = 0
+        self.expiring = 0
+
+        if self.prefilter is not None:
+            self.prefilter = BloomFilter(self.prefilter.capacity, self.prefilter.target_rate)
 
     def get(self, key: str) -> object:
         """
         Returns the value associated with the given key or None if the key is not found.
         """
-        # get the LinkedList using the given key
-        linked_list = self.get_linked_list(key)
+        # a key the prefilter has never seen is not in the map
+        if self.prefilter is not None and key not in self.prefilter:
+            return None
 
-        # return result
-        return linked_list.contains(key)
+        # get the LinkedList using the given key's hash
+        hash = self.hash_function(key)
+        linked_list = self.get_bucket(hash)
+
+        # find the node holding the key, if any
+        node = self.find_node(linked_list, key, hash)
+
+        return node.value if node is not None else None
 
-    def put(self, key: str, value: object) -> None:
+    def put(self, key: str, value: object, ttl: float = None) -> None:
         """
         Updates the key/value pair in the hash map. Replaces the given key's old value with the new given value
         if the key already exists in the hash map. Otherwise, it will add the new key/value pair.
+        With a ttl, the key expires ttl seconds from now: it then counts as absent, and its node is unlinked
+        the next time a lookup walks past it or the reaper reaches its bucket. Without one, any earlier
+        expiry of the key is dropped.
         """
-        # get the LinkedList using the given key
-        linked_list = self.get_linked_list(key)
+        # get the LinkedList using the given key's hash
+        hash = self.hash_function(key)
+        linked_list = self.get_bucket(hash)
 
-        # replace value at given key if key is already in the map
-        if linked_list.contains(key):
-            linked_list.remove(key)
-            linked_list.insert(key, value)
+        # walk the chain once; overwrite the existing node's value in place if the key is found
+        node = self.find_node(linked_list, key, hash)
+        inserted = node is None
+        if not inserted:
+            node.value = value
+            if getattr(node, 'expires', None) is not None:
+                node.expires = None
+                self.expiring -= 1
         # otherwise just add it to the map
         else:
-            linked_list.insert(key, value)
+            self.insert_node(linked_list, key, value, hash)
+            node = linked_list.head
             self.size += 1
 
+        if ttl is not None:
+            node.expires = self.clock() + ttl
+            self.expiring += 1
+
+        # the expiry is set first, so a resize carries it over
+        if inserted:
+            self.apply_resize_policy()
+        if self.expiring:
+            self.reap(self.reap_step)
+
+    def put_many(self, items) -> None:
+        """
+        Puts every key/value pair from an iterable of pairs. With a resize policy set, the table is grown once
+        up front when the iterable knows its length; keys are hashed a batch at a time, and the resize policy
+        is applied once per batch instead of once per pair.
+        """
+        # bulk loads work on a single table
+        self.finish_resize()
+
+        # presize from the length hint so no intermediate resizes are needed
+        if self.max_load_factor is not None:
+            new_capacity = self.policy_capacity(self.size + length_hint(items))
+            if new_capacity > self.capacity:
+                self.resize_table(new_capacity)
+
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, BATCH_SIZE))
+            if not batch:
+                return
+
+            hashes = [self.hash_function(key) for key, _ in batch]
+            for (key, value), hash in zip(batch, hashes):
+                linked_list = self.buckets[hash % self.capacity]
+                node = self.find_node(linked_list, key, hash)
+                if node is not None:
+                    node.value = value
+                    if getattr(node, 'expires', None) is not None:
+                        node.expires = None
+                        self.expiring -= 1
+                else:
+                    self.insert_node(linked_list, key, value, hash)
+                    self.size += 1
+
+            # any resize the batch calls for is done at once, so the next batch sees a single table
+            self.apply_resize_policy()
+            self.finish_resize()
+
+    @classmethod
+    def from_items(cls, items, function, capacity: int = None) -> 'HashMap':
+        """
+        Returns a new HashMap holding the given key/value pairs. Unless a capacity is given, the table is
+        sized from the length of items (when known) for a load factor of 1.
+        """
+        if capacity is None:
+            capacity = max(length_hint(items), 1)
+
+        m = cls(capacity, function)
+        m.put_many(items)
+        return m
+
+    def save(self, path: str) -> None:
+        """
+        Writes the hash map to a snapshot file at path: its capacity, hash function and every node that has
+        not expired with its stored hash and expiry time, bucket by bucket (see snapshot.py).
+        """
+        # imported here: snapshot imports the other HashMap modules
+        import snapshot
+        snapshot.save_sc(self, path)
+
+    @classmethod
+    def load(cls, path: str, function=None, lazy: bool = False) -> 'HashMap':
+        """
+        Returns the hash map saved at path. function defaults to the saved hash function; when it is that
+        function, every node goes straight into its saved bucket with its saved hash, otherwise the keys are
+        hashed again. With lazy=True, returns a read-only snapshot.HashMap that reads the file through mmap
+        as keys are looked up, so loading does not take longer for bigger maps.
+        """
+        import snapshot
+        if lazy:
+            return snapshot.HashMap(path, function)
+
+        header, index, hashes, keys, values, expiries = snapshot.read(path)
+        function, trusted = snapshot.check_function(header, function, snapshot.SC)
+        m = cls(header['capacity'], function)
+        if not trusted:
+            m.put_many(zip(keys, values))
+            # putting the keys that had a ttl again with the time they have left restores their expiry,
+            # and keys whose time ran out since the snapshot was saved are dropped
+            for key, value, expires in zip(keys, values, expiries or ()):
+                left = snapshot.time_left(expires)
+                if left is not None and left > 0:
+                    m.put(key, value, left)
+                elif left is not None:
+                    m.remove(key)
+            return m
+
+        buckets = m.buckets.data
+        now = m.clock()
+        for bucket in range(m.capacity):
+            linked_list = buckets[bucket]
+            for entry in range(index[bucket], index[bucket + 1]):
+                left = snapshot.time_left(expiries[entry]) if expiries is not None else None
+                # keys whose time ran out since the snapshot was saved are left out
+                if left is not None and left <= 0:
+                    continue
+                m.insert_node(linked_list, keys[entry], values[entry], hashes[entry],
+                              None if left is None else now + left)
+                m.size += 1
+                if left is not None:
+                    m.expiring += 1
+        return m
+
+    def enable_stats(self, export_interval: float = None) -> object:
+        """
+        Starts counting this map's operations, probe lengths and resizes, and returns the hash_map_stats.Stats
+        that hold them (read them with its snapshot method). With export_interval, its exporters are called
+        with a snapshot every export_interval seconds. Maps without statistics pay nothing for them.
+        """
+        # imported here: hash_map_stats imports the HashMap modules
+        import hash_map_stats
+        return hash_map_stats.enable(self, export_interval)
+
+    def disable_stats(self) -> object:
+        """
+        Stops counting and returns the statistics collected so far, or None if none were being collected.
+        """
+        import hash_map_stats
+        return hash_map_stats.disable(self)
+
+    def put_if_absent(self, key: str, value: object) -> bool:
+        """
+        Adds the key/value pair only if the key is not already in the hash map.
+        Returns True if the pair was added, False if the key was already present.
+        """
+        # get the LinkedList using the given key's hash
+        hash = self.hash_function(key)
+        linked_list = self.get_bucket(hash)
+
+        if self.find_node(linked_list, key, hash) is not None:
+            return False
+
+        self.insert_node(linked_list, key, value, hash)
+        self.size += 1
+        self.apply_resize_policy()
+        return True
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map,
+        the key is added with the given default value and the default is returned.
+        """
+        # get the LinkedList using the given key's hash
+        hash = self.hash_function(key)
+        linked_list = self.get_bucket(hash)
+
+        node = self.find_node(linked_list, key, hash)
+        if node is not None:
+            return node.value
+
+        self.insert_node(linked_list, key, default, hash)
+        self.size += 1
+        self.apply_resize_policy()
+        return default
+
+    def update(self, key: str, function, default: object = None) -> object:
+        """
+        Replaces the value associated with the given key with function(old value) and returns the new value.
+        If the key is not in the hash map, function(default) is stored under the key instead.
+        """
+        # get the LinkedList using the given key's hash
+        hash = self.hash_function(key)
+        linked_list = self.get_bucket(hash)
+
+        node = self.find_node(linked_list, key, hash)
+        if node is not None:
+            node.value = function(node.value)
+            return node.value
+
+        value = function(default)
+        self.insert_node(linked_list, key, value, hash)
+        self.size += 1
+        self.apply_resize_policy()
+        return value
+
     def remove(self, key: str) -> None:
         """
         Removes the given key and its associated value from the hash map; does nothing if key is not found.
         """
-        # get the LinkedList using the given key
-        linked_list = self.get_linked_list(key)
+        # get the LinkedList using the given key's hash
+        hash = self.hash_function(key)
+        linked_list = self.get_bucket(hash)
+
+        # walk the chain once, keeping the node before the key's so it is unlinked where it is found
+        previous, node = self.find_link(linked_list, key, hash)
+        if node is not None:
+            self.unlink_node(linked_list, previous, node)
+            self.apply_resize_policy()
+
+        if self.expiring:
+            self.reap(self.reap_step)
+
+    def get_many(self, keys, default: object = None) -> list:
+        """
+        Returns a list with the value of each of the given keys, in the same order, or default for keys
+        that are not in the hash map.
+        """
+        return [node.value if node is not None else default for node in self.find_nodes(keys)]
 
-        if linked_list.contains(key):
-            linked_list.remove(key)
-            self.size -= 1
+    def contains_many(self, keys) -> list:
+        """
+        Returns a list with True for each of the given keys that is in the hash map and False otherwise,
+        in the same order as the keys.
+        """
+        return [node is not None for node in self.find_nodes(keys)]
+
+    def find_nodes(self, keys) -> list:
+        """
+        Returns the node holding each of the given keys (None for missing keys), in the same order as the keys.
+        The keys are hashed as a batch, repeated keys are looked up only once, and the chains are reached
+        through the table's underlying list instead of the bounds-checked DynamicArray.
+        """
+        keys = list(keys)
+        # keys the prefilter rules out are neither hashed nor looked up
+        prefilter = self.prefilter
+        if prefilter is None:
+            hashes = [self.hash_function(key) for key in keys]
+        else:
+            hashes = [self.hash_function(key) if key in prefilter else None for key in keys]
+
+        # a batch advances an incremental resize by one step, like a single lookup
+        if self.old_buckets is not None:
+            self.rehash_some(self.rehash_step)
+        resizing = self.old_buckets is not None
+
+        buckets, capacity = self.buckets.data, self.capacity
+        found = {}
+        nodes = []
+        for key, hash in zip(keys, hashes):
+            if hash is None:
+                nodes.append(None)
+                continue
+            if key in found:
+                nodes.append(found[key])
+                continue
+
+            # buckets that an incremental resize has not moved yet are still in the old table
+            linked_list = self.locate_bucket(hash) if resizing else buckets[hash % capacity]
+            if self.expiring:
+                # keys with a ttl need the expiry checks of find_node
+                node = self.find_node(linked_list, key, hash)
+            else:
+                node = linked_list.head
+                while node is not None:
+                    if node.hash == hash and node.key == key:
+                        break
+                    node = node.next
+
+            found[key] = node
+            nodes.append(node)
+
+        return nodes
 
     def contains_key(self, key: str) -> bool:
         """
         Returns True if the given key is in the hash map; otherwise returns False.
         """
-        # get the LinkedList using the given key
-        linked_list = self.get_linked_list(key)
+        if self.prefilter is not None and key not in self.prefilter:
+            return False
+
+        # get the LinkedList using the given key's hash
+        hash = self.hash_function(key)
+        linked_list = self.get_bucket(hash)
 
-        return True if linked_list.contains(key) is not None else False
+        return True if self.find_node(linked_list, key, hash) is not None else False
 
     def empty_buckets(self) -> int:
         """
         Returns the number of empty buckets in the hash table.
         """
+        # move every remaining link out of the old table so only the current table needs counting
+        self.finish_resize()
+
         # create a counter for the number of empty buckets
         empty_bucket_count = 0
 
@@ -154,20 +477,187 @@ class HashMap:
         if new_capacity < 1:
             return
 
+        # complete any incremental resize so every link lives in the current table
+        self.finish_resize()
+
         # store current hash table
         curr_table = self.buckets
 
+        # the nodes are about to be added to a new prefilter, which drops the bits of removed keys
+        if self.prefilter is not None:
+            self.prefilter = self.new_prefilter(self.prefilter.target_rate)
+
         # reset table with new capacity and other attributes
         self.buckets = DynamicArray()
         self.size = 0
+        self.modifications += 1
         self.capacity = new_capacity
         for _ in range(new_capacity):
             self.buckets.append(LinkedList())
 
-        # rehash each link into the new buckets
+        # rehash each link into the new buckets by its stored hash; keys are already unique, so each one
+        # can be inserted directly without searching its new chain or re-checking the resize policy
         for index in range(curr_table.length()):
             for node in curr_table[index]:
-                self.put(node.key, node.value)
+                self.insert_node(self.buckets[node.hash % self.capacity], node.key, node.value, node.hash,
+                                 getattr(node, 'expires', None))
+                self.size += 1
+
+    def set_resize_policy(self, max_load_factor: float = 1.0, growth_factor: float = 2,
+                          min_load_factor: float = None, min_capacity: int = None) -> None:
+        """
+        Turns on automatic resizing. The table grows by growth_factor whenever an insert pushes the load factor
+        above max_load_factor, and shrinks by growth_factor whenever a remove drops it below min_load_factor
+        (if given), but never below min_capacity (the current capacity by default).
+
+        min_load_factor * growth_factor must be less than max_load_factor, so that a shrink can never be
+        immediately followed by a grow (and vice versa) while the map sits near a threshold.
+        """
+        if max_load_factor <= 0:
+            raise ValueError("max_load_factor must be positive")
+        if growth_factor <= 1:
+            raise ValueError("growth_factor must be greater than 1")
+        if min_load_factor is not None and min_load_factor * growth_factor >= max_load_factor:
+            raise ValueError("min_load_factor * growth_factor must be less than max_load_factor")
+
+        self.max_load_factor = max_load_factor
+        self.growth_factor = growth_factor
+        self.min_load_factor = min_load_factor
+        self.min_capacity = min_capacity if min_capacity is not None else self.capacity
+
+        self.apply_resize_policy()
+
+    def apply_resize_policy(self) -> None:
+        """
+        Grows or shrinks the table with resize_table if the load factor is outside the limits
+        set by set_resize_policy. Does nothing if no policy is set.
+        """
+        if self.max_load_factor is None:
+            return
+
+        # grow until the load factor is back under the maximum
+        if self.table_load() > self.max_load_factor:
+            self.start_resize(self.policy_capacity(self.size))
+
+        # shrink one step at a time so the result stays well under the maximum
+        elif self.min_load_factor is not None and self.table_load() < self.min_load_factor:
+            new_capacity = max(int(self.capacity / self.growth_factor), self.min_capacity)
+            if new_capacity < self.capacity:
+                self.start_resize(new_capacity)
+
+    def policy_capacity(self, count: int) -> int:
+        """
+        Returns the capacity the resize policy grows the table to so that it can hold count entries
+        without going over max_load_factor.
+        """
+        new_capacity = self.capacity
+        while count / new_capacity > self.max_load_factor:
+            new_capacity = max(int(new_capacity * self.growth_factor), new_capacity + 1)
+        return new_capacity
+
+    def set_incremental_resize(self, step: int = 8) -> None:
+        """
+        Makes automatic resizes incremental: instead of rehashing the whole table at once, the old table is kept
+        alongside the new one and step of its buckets are moved over on every get/put/remove/contains_key.
+        Passing None goes back to rehashing everything at once.
+        """
+        if step is not None and step < 1:
+            raise ValueError("step must be at least 1")
+
+        if step is None:
+            self.finish_resize()
+        self.rehash_step = step
+
+    def start_resize(self, new_capacity: int, buckets: DynamicArray = None) -> None:
+        """
+        Resizes the table to new_capacity, either at once with resize_table or, in incremental mode,
+        by switching to an empty table of the new capacity and migrating the old buckets a few at a time.
+        In incremental mode, buckets may be that empty table built beforehand, as the asyncio facade
+        (hash_map_async.py) does a chunk at a time.
+        """
+        if self.rehash_step is None:
+            self.resize_table(new_capacity)
+            return
+
+        if new_capacity < 1:
+            return
+
+        # only one migration can be in flight at a time
+        self.finish_resize()
+
+        self.old_buckets = self.buckets
+        self.old_capacity = self.capacity
+        self.rehash_index = 0
+
+        # build the empty table in one go so starting the resize stays cheap
+        if buckets is None:
+            buckets = DynamicArray([LinkedList() for _ in range(new_capacity)])
+        self.buckets = buckets
+        self.capacity = new_capacity
+        self.modifications += 1
+
+    def rehash_some(self, count: int) -> None:
+        """
+        Moves up to count buckets of the old table into the current table during an incremental resize.
+        """
+        if self.old_buckets is None:
+            return
+
+        stop = min(self.rehash_index + count, self.old_capacity)
+        for index in range(self.rehash_index, stop):
+            for node in self.old_buckets[index]:
+                self.insert_node(self.buckets[node.hash % self.capacity], node.key, node.value, node.hash,
+                                 getattr(node, 'expires', None))
+            # buckets before rehash_index are never read again; dropping each one as it is moved frees the
+            # old chains a bucket at a time instead of all together when the resize ends
+            self.old_buckets[index] = None
+        self.rehash_index = stop
+
+        # the migration is done once every old bucket has been moved
+        if self.rehash_index == self.old_capacity:
+            self.old_buckets = None
+
+    def finish_resize(self) -> None:
+        """
+        Completes any incremental resize in progress.
+        """
+        if self.old_buckets is not None:
+            self.rehash_some(self.old_capacity - self.rehash_index)
+
+    def set_prefilter(self, false_positive_rate: float = 0.01) -> None:
+        """
+        Keeps a Bloom filter of the keys next to the table (see bloom.py), so get, contains_key and the batch
+        lookups return at once for most missing keys, without hashing them or walking a chain; only about
+        false_positive_rate of the misses get past it. The filter is sized for twice the current number
+        of keys and rebuilt when the table resizes or the filter fills up, which also drops the bits of removed
+        keys. Passing None removes the filter. Its size in bytes is prefilter.memory().
+        """
+        if false_positive_rate is None:
+            self.prefilter = None
+        else:
+            self.prefilter = self.new_prefilter(false_positive_rate)
+            self.rebuild_prefilter()
+
+    def new_prefilter(self, false_positive_rate: float) -> BloomFilter:
+        """
+        Returns an empty Bloom filter with room for twice the keys in the map.
+        """
+        return BloomFilter(max(2 * self.size, 64), false_positive_rate)
+
+    def rebuild_prefilter(self) -> None:
+        """
+        Replaces the prefilter with a new one, sized for the current number of keys, holding every key
+        in the map, including the ones an incremental resize has not moved yet.
+        """
+        prefilter = self.new_prefilter(self.prefilter.target_rate)
+        tables = [(self.buckets, 0, self.capacity)]
+        if self.old_buckets is not None:
+            tables.append((self.old_buckets, self.rehash_index, self.old_capacity))
+        for buckets, start, stop in tables:
+            for index in range(start, stop):
+                for node in buckets[index]:
+                    prefilter.add(node.key)
+        self.prefilter = prefilter
 
     def get_keys(self) -> DynamicArray:
         """
@@ -176,13 +666,80 @@ class HashMap:
         # create array to cache keys
         keys_array = DynamicArray()
 
+        now = self.clock() if self.expiring else None
         for index in range(self.capacity):
             # iterate through each node in linked list at bucket
             for node in self.buckets[index]:
-                keys_array.append(node.key)
+                if now is None or not self.is_expired(node, now):
+                    keys_array.append(node.key)
+
+        # include the buckets an incremental resize has not moved yet
+        if self.old_buckets is not None:
+            for index in range(self.rehash_index, self.old_capacity):
+                for node in self.old_buckets[index]:
+                    if now is None or not self.is_expired(node, now):
+                        keys_array.append(node.key)
 
         return keys_array
 
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map. Keys whose ttl has run out are counted
+        until a lookup walks past them or the reaper reaches their bucket; finish_resize() and
+        reap(self.capacity) first for an exact count.
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the hash map, like keys().
+        """
+        return self.keys()
+
+    def keys(self):
+        """
+        Yields every key in the hash map, read straight from the buckets without building an array.
+        """
+        for node in self.iter_nodes():
+            yield node.key
+
+    def values(self):
+        """
+        Yields every value in the hash map, read straight from the buckets without building an array.
+        """
+        for node in self.iter_nodes():
+            yield node.value
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map, read straight from the buckets without building an array.
+        """
+        for node in self.iter_nodes():
+            yield node.key, node.value
+
+    def iter_nodes(self):
+        """
+        Yields every node in bucket order. Raises RuntimeError if nodes are added, removed or moved
+        while the iteration is in progress; replacing the value of an existing key is allowed.
+        """
+        # move everything into one table first, so lookups made while iterating have nothing left to migrate
+        self.finish_resize()
+        modifications = self.modifications
+
+        buckets = self.buckets
+        now = self.clock() if self.expiring else None
+        for index in range(self.capacity):
+            node = buckets[index].head
+            while node is not None:
+                # expired nodes are skipped, not unlinked, since that would count as a change
+                if now is not None and self.is_expired(node, now):
+                    node = node.next
+                    continue
+                yield node
+                if self.modifications != modifications:
+                    raise RuntimeError("HashMap changed during iteration")
+                node = node.next
+
     def get_linked_list(self, key: str) -> object:
         """
         Args:
@@ -191,7 +748,29 @@ class HashMap:
         Returns: the LinkedList associated with a key or None if no key exists
         """
         # hash the key with the HashMap's function
-        hash = self.hash_function(key)
+        return self.get_bucket(self.hash_function(key))
+
+    def get_bucket(self, hash: int) -> LinkedList:
+        """
+        Args:
+            hash: the hash of a key, as returned by the HashMap's function
+
+        Returns: the LinkedList that holds (or would hold) the key with that hash
+        """
+        # every lookup advances an incremental resize by one step
+        if self.old_buckets is not None:
+            self.rehash_some(self.rehash_step)
+
+        return self.locate_bucket(hash)
+
+    def locate_bucket(self, hash: int) -> LinkedList:
+        """
+        Returns the LinkedList that holds (or would hold) the key with the given hash,
+        without advancing an incremental resize.
+        """
+        # while resizing incrementally, buckets that have not been moved yet still live in the old table
+        if self.old_buckets is not None and hash % self.old_capacity >= self.rehash_index:
+            return self.old_buckets[hash % self.old_capacity]
         # get the index for the given key
         index = hash % self.capacity
         # get the LinkedList at the calculated index
@@ -199,6 +778,108 @@ class HashMap:
 
         return linked_list
 
+    def find_node(self, linked_list: LinkedList, key: str, hash: int) -> SLNode:
+        """
+        Returns the node holding the given key in the LinkedList, or None if the key is not there.
+        """
+        return self.find_link(linked_list, key, hash)[1]
+
+    def find_link(self, linked_list: LinkedList, key: str, hash: int) -> tuple:
+        """
+        Returns (previous, node): the node holding the given key in the LinkedList and the node before it
+        (None for the head), or (previous, None) if the key is not there. The stored hash of each node is
+        compared first, so most other keys are skipped without a key comparison.
+        """
+        node = linked_list.head
+        now = self.clock() if self.expiring else None
+        previous = None
+        while node is not None:
+            # expired nodes met along the way are unlinked
+            if now is not None and self.is_expired(node, now):
+                self.unlink_node(linked_list, previous, node)
+                node = node.next
+                continue
+            if node.hash == hash and node.key == key:
+                break
+            previous = node
+            node = node.next
+        return previous, node
+
+    def probe_length(self, key: str) -> int:
+        """
+        Returns the number of nodes a lookup of key compares against: the nodes up to and including
+        its own, or the whole chain if it is not there. Nothing is unlinked or migrated.
+        """
+        hash = self.hash_function(key)
+        length = 0
+        node = self.locate_bucket(hash).head
+        while node is not None:
+            length += 1
+            if node.hash == hash and node.key == key:
+                break
+            node = node.next
+        return length
+
+    def insert_node(self, linked_list: LinkedList, key: str, value: object, hash: int,
+                    expires: float = None) -> None:
+        """
+        Inserts a new node at the front of the LinkedList and stores the key's hash on it,
+        so resizing and probing never need to hash the key again. expires carries over a node's expiry time.
+        """
+        linked_list.insert(key, value)
+        linked_list.head.hash = hash
+        if expires is not None:
+            linked_list.head.expires = expires
+        self.modifications += 1
+
+        if self.prefilter is not None:
+            self.prefilter.add(key)
+            if self.prefilter.is_full():
+                self.rebuild_prefilter()
+
+    def is_expired(self, node: SLNode, now: float) -> bool:
+        """
+        Returns True if the node has an expiry time and it has passed.
+        """
+        expires = getattr(node, 'expires', None)
+        return expires is not None and expires <= now
+
+    def unlink_node(self, linked_list: LinkedList, previous: SLNode, node: SLNode) -> None:
+        """
+        Unlinks a node from its LinkedList, given the node before it (None for the head).
+        """
+        if previous is None:
+            linked_list.head = node.next
+        else:
+            previous.next = node.next
+        linked_list.size -= 1
+        self.size -= 1
+        self.modifications += 1
+        if getattr(node, 'expires', None) is not None:
+            self.expiring -= 1
+
+    def reap(self, count: int) -> int:
+        """
+        Checks the next count buckets of the table, carrying on from where the last call stopped, and unlinks
+        the expired nodes in them. Called with reap_step on every put and remove while any key has a ttl,
+        so expired keys nobody looks up are reclaimed a few buckets at a time, never by a full scan.
+        Returns the number of nodes reclaimed.
+        """
+        now = self.clock()
+        reclaimed = 0
+        for _ in range(min(count, self.capacity)):
+            self.reap_index = (self.reap_index + 1) % self.capacity
+            linked_list = self.buckets[self.reap_index]
+            previous, node = None, linked_list.head
+            while node is not None:
+                if self.is_expired(node, now):
+                    self.unlink_node(linked_list, previous, node)
+                    reclaimed += 1
+                else:
+                    previous = node
+                node = node.next
+        return reclaimed
+
 
 # BASIC TESTING
 if __name__ == "__main__":
@@ -381,3 +1062,17 @@ if __name__ == "__main__":
     m.remove('100')
     m.resize_table(2)
     print(m.get_keys())
+
+    print("\nremove among expired keys")
+    print("-------------------------")
+    m = HashMap(1, hash_function_2)
+    now = [0.0]
+    m.clock = lambda: now[0]
+    m.put('a', 1, ttl=5)
+    m.put('b', 2)
+    m.put('c', 3, ttl=5)
+    m.put('d', 4)
+    now[0] = 10.0
+    print(len(m), m.expiring)
+    m.remove('b')
+    print(len(m), m.expiring, m.get_keys(), m.buckets[0].length())
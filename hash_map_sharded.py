@@ -0,0 +1,229 @@
+# Description: This file contains a hash map that partitions its keys across worker processes, each of which owns
+# an open addressing HashMap shard, so large batched workloads are not capped at one core by the GIL.
+
+# There is one class: HashMap, the front end. A key always lives in shard crc32(key) % processes; CRC-32 is
+# stable across processes and runs in C, unlike Python's randomized built-in string hash. Each shard is a
+# hash_map_oa.HashMap inside its own process, reached through a Pipe. Single-key methods make one round trip
+# to one shard; the batched methods split the keys by shard, send every shard its part before waiting for any
+# reply, and merge the replies back into the order of the keys, so the shards work in parallel.
+# The HashMap class contains:
+# (1) clear: clears the contents of every shard
+# (2) put: updates the key/value pairs in the hash map
+# (3) get: returns the value associated with the given key
+# (4) remove: removes the given key and its associated value from the hash map
+# (5) contains_key: confirms if a given key is in the hash map
+# (6) put_many / get_many / contains_many: batched variants that fan out to the shards in parallel
+# (7) get_keys: returns a DynamicArray that contains all the keys stored in the hash map
+# (8) close: stops the worker processes
+
+import multiprocessing
+import zlib
+
+from a6_include import *
+import hash_map_oa
+
+
+def serve_shard(connection, capacity: int, function) -> None:
+    """
+    Runs in a worker process: owns one hash_map_oa.HashMap and answers (method name, args) requests
+    from the front end until it receives None. Exceptions are sent back to be raised in the caller.
+    """
+    shard = hash_map_oa.HashMap(capacity, function)
+    while True:
+        request = connection.recv()
+        if request is None:
+            connection.close()
+            return
+
+        name, args = request
+        try:
+            connection.send((True, getattr(shard, name)(*args)))
+        except Exception as error:
+            connection.send((False, error))
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, processes: int = 4) -> None:
+        """
+        Init new sharded HashMap with the given number of worker processes. The capacity is split evenly
+        between the shards, and function must be picklable (a module-level function) to reach the workers.
+        """
+        if processes < 1:
+            raise ValueError("processes must be at least 1")
+
+        self.processes = processes
+        self.connections = []
+        self.workers = []
+        shard_capacity = max(capacity // processes, 1)
+        for _ in range(processes):
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=serve_shard, args=(worker_connection, shard_capacity, function),
+                                             daemon=True)
+            worker.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.workers.append(worker)
+
+    def __enter__(self) -> 'HashMap':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return sum(self.broadcast('__len__'))
+
+    @property
+    def size(self) -> int:
+        """
+        The number of key/value pairs in the hash map.
+        """
+        return len(self)
+
+    def shard_index(self, key: str) -> int:
+        """
+        Returns the index of the shard that owns the given key.
+        """
+        return zlib.crc32(key.encode()) % self.processes
+
+    def clear(self) -> None:
+        """
+        Clears the contents of every shard; it does not change their capacities.
+        """
+        self.broadcast('clear')
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map. Replaces the given key's old value with the new given value
+        if the key already exists in the hash map. Otherwise, it will add the new key/value pair.
+        """
+        self.call(self.shard_index(key), 'put', key, value)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key or None if the key is not found.
+        """
+        return self.call(self.shard_index(key), 'get', key)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map; does nothing if key is not found.
+        """
+        self.call(self.shard_index(key), 'remove', key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map; otherwise returns False.
+        """
+        return self.call(self.shard_index(key), 'contains_key', key)
+
+    def put_many(self, items) -> None:
+        """
+        Puts every key / value pair from an iterable of pairs, each shard loading its part in parallel.
+        """
+        parts = [[] for _ in range(self.processes)]
+        for item in items:
+            parts[self.shard_index(item[0])].append(item)
+        self.scatter('put_many', parts)
+
+    def get_many(self, keys, default: object = None) -> list:
+        """
+        Returns a list with the value of each of the given keys, in the same order, or default for keys
+        that are not in the hash map.
+        """
+        return self.scatter_keys('get_many', keys, default)
+
+    def contains_many(self, keys) -> list:
+        """
+        Returns a list with True for each of the given keys that is in the hash map and False otherwise,
+        in the same order as the keys.
+        """
+        return self.scatter_keys('contains_many', keys)
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys stored in the hash map.
+        """
+        keys_array = DynamicArray()
+        for shard_keys in self.broadcast('get_keys'):
+            for index in range(shard_keys.length()):
+                keys_array.append(shard_keys[index])
+        return keys_array
+
+    def close(self) -> None:
+        """
+        Stops the worker processes. The hash map cannot be used afterwards.
+        """
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for worker in self.workers:
+            worker.join()
+        self.connections = []
+        self.workers = []
+
+    def call(self, index: int, name: str, *args) -> object:
+        """
+        Calls the named method on one shard and returns its result.
+        """
+        connection = self.connections[index]
+        connection.send((name, args))
+        return self.unwrap([connection.recv()])[0]
+
+    def broadcast(self, name: str, *args) -> list:
+        """
+        Calls the named method with the same arguments on every shard, in parallel, and returns their results.
+        """
+        for connection in self.connections:
+            connection.send((name, args))
+        return self.unwrap([connection.recv() for connection in self.connections])
+
+    def scatter(self, name: str, parts: list, *args) -> list:
+        """
+        Calls the named method on every shard that has a non-empty part, with that part as the first argument,
+        and returns the results in shard order (None for shards that were skipped). Every request is sent
+        before any reply is awaited, so the shards work in parallel.
+        """
+        for connection, part in zip(self.connections, parts):
+            if part:
+                connection.send((name, (part,) + args))
+        replies = [connection.recv() if part else (True, None) for connection, part in zip(self.connections, parts)]
+        return self.unwrap(replies)
+
+    def scatter_keys(self, name: str, keys, *args) -> list:
+        """
+        Splits the keys by shard, calls the named batched method on each shard's keys in parallel,
+        and merges the per-key results back into the order of the keys.
+        """
+        keys = list(keys)
+        shard_indices = [self.shard_index(key) for key in keys]
+        parts = [[] for _ in range(self.processes)]
+        for key, index in zip(keys, shard_indices):
+            parts[index].append(key)
+
+        # each shard answers in the order it was asked, so walk its results with an iterator
+        results = [iter(result) if result is not None else None for result in self.scatter(name, parts, *args)]
+        return [next(results[index]) for index in shard_indices]
+
+    def unwrap(self, replies: list) -> list:
+        """
+        Returns the results of the given shard replies, raising the first exception a shard raised.
+        Callers collect every reply first, so no answer is left behind in a pipe.
+        """
+        for succeeded, result in replies:
+            if not succeeded:
+                raise result
+        return [result for _, result in replies]
+
+
+if __name__ == "__main__":
+
+    print("\nput / get across 4 processes")
+    print("----------------------------")
+    with HashMap(100, hash_map_oa.hash_function_2, processes=4) as m:
+        m.put_many((str(i), i * 10) for i in range(1000))
+        m.remove('0')
+        print(m.size, m.get('5'), m.contains_key('0'), m.get_many(['1', '2', 'x'], -1))
@@ -0,0 +1,356 @@
+# Description: This file contains a read-only open addressing hash table laid out in one flat buffer, backed by
+# multiprocessing.shared_memory or by an mmap'ed file, so one process builds it and any number of processes attach
+# to it and look keys up without copying or unpickling the table.
+
+# There is one class: HashMap. Its buffer holds, in order:
+#   a header: magic, capacity, size and the length of the arena
+#   one control byte per slot (EMPTY or FULL)
+#   one 8-byte hash per slot
+#   one 8-byte offset per slot into the arena
+#   the arena: one record per entry, a 9-byte record header (key length, value length, value type), the key's
+#   UTF-8 bytes and the encoded value
+# Lookups probe quadratically from hash % capacity, like hash_map_oa.HashMap.get, compare the stored hash first,
+# and then compare the key's bytes in place. The capacity is a prime above twice the number of keys, so the
+# probe sequence always reaches a free slot while building. Values that are None, bytes, str, int or float are
+# decoded directly from the buffer; any other value is pickled. Every process must use the same hash function,
+# so it has to be stable across processes: hash_function_1/2, fnv1a, or siphash with a shared seed, but not
+# Python's per-process randomized built-in hash.
+# The HashMap class contains:
+# (1) create: builds a table from key/value pairs into new shared memory or a new file
+# (2) attach: opens a table another process created
+# (3) get: returns the value associated with the given key
+# (4) contains_key: confirms if a given key is in the hash map
+# (5) get_keys: returns a DynamicArray that contains all the keys stored in the hash map
+# (6) table_load / empty_buckets: the load factor and the number of empty slots
+# (7) close / unlink: detach from the buffer, and free the shared memory or delete the file
+
+import mmap
+import os
+import pickle
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+from a6_include import *
+from hash_map_oa import hash_function_1, hash_function_2
+
+
+MAGIC = b'HMSHARE1'
+HEADER = struct.Struct('<8sQQQ')
+RECORD = struct.Struct('<IIB')
+MASK_64 = (1 << 64) - 1
+
+EMPTY = 0
+FULL = 1
+
+NONE, BYTES, STR, INT, FLOAT, PICKLE = range(6)
+
+
+def next_prime(number: int) -> int:
+    """
+    Returns the smallest prime greater than or equal to number.
+    """
+    number = max(number, 2)
+    while any(number % divisor == 0 for divisor in range(2, int(number ** 0.5) + 1)):
+        number += 1
+    return number
+
+
+def align(offset: int) -> int:
+    """
+    Returns offset rounded up to a multiple of 8, so the hash and offset arrays are 8-byte aligned.
+    """
+    return offset + (-offset % 8)
+
+
+def encode_value(value: object) -> tuple:
+    """
+    Returns (type, bytes) for a value stored in the arena.
+    """
+    if value is None:
+        return NONE, b''
+    if isinstance(value, bytes):
+        return BYTES, value
+    if isinstance(value, str):
+        return STR, value.encode()
+    if type(value) is int:
+        return INT, value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+    if type(value) is float:
+        return FLOAT, struct.pack('<d', value)
+    return PICKLE, pickle.dumps(value)
+
+
+def decode_value(kind: int, data: memoryview) -> object:
+    """
+    Returns the value stored as (type, bytes) by encode_value.
+    """
+    if kind == NONE:
+        return None
+    if kind == BYTES:
+        return bytes(data)
+    if kind == STR:
+        return str(data, 'utf-8')
+    if kind == INT:
+        return int.from_bytes(data, 'little', signed=True)
+    if kind == FLOAT:
+        return struct.unpack('<d', data)[0]
+    return pickle.loads(data)
+
+
+class HashMap:
+    def __init__(self, backing, buffer, function) -> None:
+        """
+        Wraps a buffer laid out by create. Use create or attach rather than calling this directly.
+        """
+        self.backing = backing
+        self.hash_function = function
+        self.view = memoryview(buffer)
+
+        magic, self.capacity, self.size, arena_length = HEADER.unpack_from(self.view)
+        if magic != MAGIC:
+            raise ValueError("buffer does not hold a shared HashMap")
+
+        # every section is a view into the same buffer; nothing is copied
+        self.control = self.view[HEADER.size:HEADER.size + self.capacity]
+        hashes_start = align(HEADER.size + self.capacity)
+        offsets_start = hashes_start + 8 * self.capacity
+        self.arena_start = offsets_start + 8 * self.capacity
+        self.hashes = self.view[hashes_start:offsets_start].cast('Q')
+        self.offsets = self.view[offsets_start:self.arena_start].cast('Q')
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form
+        """
+        out = ''
+        for index in range(self.capacity):
+            if self.control[index] == FULL:
+                key, value = self.read_entry(index)
+                out += str(index) + ': ' + str(key) + ' -> ' + str(value) + '\n'
+            else:
+                out += str(index) + ': None\n'
+        return out
+
+    def __enter__(self) -> 'HashMap':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return self.size
+
+    @classmethod
+    def create(cls, items, function, name: str = None, path: str = None) -> 'HashMap':
+        """
+        Builds a table holding the given key/value pairs and returns it. The buffer is a new file at path when
+        a path is given, and new shared memory otherwise (under name, or a generated name readable from
+        .name). Later pairs replace earlier ones with the same key.
+        """
+        # encode every pair once, keeping the last value for each key
+        records = {}
+        for key, value in items:
+            records[key] = encode_value(value)
+
+        capacity = next_prime(2 * len(records) + 1)
+        hashes_start = align(HEADER.size + capacity)
+        arena_start = hashes_start + 16 * capacity
+        arena_length = sum(RECORD.size + len(key.encode()) + len(data) for key, (_, data) in records.items())
+        length = arena_start + arena_length
+
+        if path is not None:
+            with open(path, 'w+b') as file:
+                file.truncate(length)
+                buffer = mmap.mmap(file.fileno(), length)
+            backing = path
+        else:
+            backing = shared_memory.SharedMemory(name=name, create=True, size=length)
+            buffer = backing.buf
+
+        HEADER.pack_into(buffer, 0, MAGIC, capacity, len(records), arena_length)
+        m = cls(backing, buffer, function)
+
+        # append each record to the arena and point a free slot at it
+        offset = arena_start
+        for key, (kind, data) in records.items():
+            key_bytes = key.encode()
+            RECORD.pack_into(buffer, offset, len(key_bytes), len(data), kind)
+            start = offset + RECORD.size
+            buffer[start:start + len(key_bytes)] = key_bytes
+            buffer[start + len(key_bytes):start + len(key_bytes) + len(data)] = data
+
+            hash = function(key) & MASK_64
+            index = m.find_free_index(hash)
+            m.control[index] = FULL
+            m.hashes[index] = hash
+            m.offsets[index] = offset - arena_start
+            offset = start + len(key_bytes) + len(data)
+
+        return m
+
+    @classmethod
+    def attach(cls, function, name: str = None, path: str = None) -> 'HashMap':
+        """
+        Opens the table created under the given shared memory name or file path. The file is mapped read-only,
+        and function must be the hash function the table was created with.
+        """
+        if path is not None:
+            with open(path, 'rb') as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            return cls(path, buffer, function)
+
+        try:
+            backing = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # before Python 3.13 attaching registers the memory with the resource tracker. A process that
+            # does not share the creator's tracker starts its own, which would free the memory when this
+            # reader exits, so take the registration back there
+            own_tracker = resource_tracker._resource_tracker._fd is None
+            backing = shared_memory.SharedMemory(name=name)
+            if own_tracker:
+                resource_tracker.unregister(backing._name, 'shared_memory')
+        return cls(backing, backing.buf, function)
+
+    @property
+    def name(self) -> str:
+        """
+        The shared memory name (or the file path) other processes attach with.
+        """
+        return self.backing if isinstance(self.backing, str) else self.backing.name
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key or None if the key is not found.
+        """
+        index = self.find_index(key)
+        if index == -1:
+            return None
+        return self.read_entry(index)[1]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map; otherwise returns False.
+        """
+        return self.find_index(key) != -1
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty slots in the hash table.
+        """
+        return self.capacity - self.size
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor.
+        """
+        return self.size / self.capacity
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys stored in the hash map.
+        """
+        keys_array = DynamicArray()
+        for index in range(self.capacity):
+            if self.control[index] == FULL:
+                keys_array.append(self.read_entry(index)[0])
+        return keys_array
+
+    def close(self) -> None:
+        """
+        Detaches from the buffer. The table itself stays available to other processes until unlink is called.
+        """
+        buffer = self.view.obj
+        self.control.release()
+        self.hashes.release()
+        self.offsets.release()
+        self.view.release()
+        if isinstance(self.backing, str):
+            buffer.close()
+        else:
+            self.backing.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the shared memory, or deletes the file, once every process has closed it. Call it from one process.
+        """
+        if isinstance(self.backing, str):
+            os.remove(self.backing)
+        else:
+            self.backing.unlink()
+
+    def find_index(self, key: str) -> int:
+        """
+        Args:
+            key: the key to look for
+
+        Returns: the index of the slot holding the key, or -1 if the key is not in the table
+        """
+        hash = self.hash_function(key) & MASK_64
+        capacity = self.capacity
+        control = self.control
+        hashes = self.hashes
+        index = hash % capacity
+        key_bytes = None
+
+        # probe quadratically until an empty slot ends the sequence, comparing stored hashes before keys
+        for counter in range(capacity):
+            new_index = (index + counter ** 2) % capacity
+            if control[new_index] == EMPTY:
+                return -1
+            if hashes[new_index] == hash:
+                if key_bytes is None:
+                    key_bytes = key.encode()
+                offset = self.arena_start + self.offsets[new_index]
+                key_length = RECORD.unpack_from(self.view, offset)[0]
+                start = offset + RECORD.size
+                if self.view[start:start + key_length] == key_bytes:
+                    return new_index
+
+        return -1
+
+    def find_free_index(self, hash: int) -> int:
+        """
+        Args:
+            hash: the masked hash of a key that is not in the table yet
+
+        Returns: the index of the first empty slot in the key's probe sequence
+        """
+        index = hash % self.capacity
+        for counter in range(self.capacity):
+            new_index = (index + counter ** 2) % self.capacity
+            if self.control[new_index] == EMPTY:
+                return new_index
+        raise RuntimeError("no free slot in the probe sequence")
+
+    def read_entry(self, index: int) -> tuple:
+        """
+        Returns the (key, value) stored in the given full slot.
+        """
+        offset = self.arena_start + self.offsets[index]
+        key_length, value_length, kind = RECORD.unpack_from(self.view, offset)
+        start = offset + RECORD.size
+        key = str(self.view[start:start + key_length], 'utf-8')
+        return key, decode_value(kind, self.view[start + key_length:start + key_length + value_length])
+
+
+if __name__ == "__main__":
+
+    import multiprocessing
+
+    def reader(name: str, keys: list, results) -> None:
+        with HashMap.attach(hash_function_2, name=name) as m:
+            results.put([m.get(key) for key in keys])
+
+    print("\ncreate in one process, get from another")
+    print("----------------------------------------")
+    m = HashMap.create(((str(i), i * 10) for i in range(1000)), hash_function_2)
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=reader, args=(m.name, ['1', '500', '999', 'x'], results))
+    process.start()
+    print(m.size, m.capacity, results.get())
+    process.join()
+    m.close()
+    m.unlink()
@@ -0,0 +1,418 @@
+# Description: This file contains opt-in statistics for the HashMaps: counters and histograms of what the hot paths
+# do, read through a snapshot API and pushed to any number of exporter callbacks.
+
+# Turning statistics on (HashMap.enable_stats, or enable here) switches that one map object to a subclass made for
+# it, whose get, put, remove, contains_key, resize_table, start_resize and compact count what they do and call the
+# class's methods; turning them off (disable_stats) switches it back. A map without statistics therefore runs exactly
+# the class's code, with no flag checks on its hot paths. (On CPython 3.11 and later, switching an object's class
+# gives it a real __dict__ in place of its compact attribute storage, so a map that had statistics turned on and off
+# again keeps slightly slower attribute lookups; maps that never enable them are unaffected.) The subclass also
+# swaps the engines' lookup walks (find_link for chaining, find_index and find_slot for open addressing) for copies
+# that count the nodes or buckets they examine into the map's probed attribute, which the instrumented methods read
+# after calling through, so nothing is walked twice.
+# This file contains:
+# (1) Histogram: counts of integer values, with count / mean / max / percentiles
+# (2) Stats: the counters and histograms of one map, snapshot() / reset(), and exporters with add_exporter / export
+# (3) enable / disable: switch a map to and from its instrumented subclass
+# (4) counting_find_link / counting_find_index / counting_find_slot: the engines' lookup walks, counting probes
+# (5) table_stats: gauges read from the table itself: load, chain lengths, tombstones and collision rate
+# (6) collision_rate: the fraction of keys a hash function sends to a bucket another key already took
+
+import time
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import *
+
+
+# the methods enable instruments, if the map's class has them
+INSTRUMENTED = ('get', 'put', 'remove', 'contains_key', 'resize_table', 'start_resize', 'compact')
+
+
+class Histogram:
+    def __init__(self) -> None:
+        """
+        Initializes an empty histogram of non-negative integer values.
+        """
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        """
+        Adds one occurrence of value.
+        """
+        self.counts[value] = self.counts.get(value, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def mean(self) -> float:
+        """
+        Returns the mean of the recorded values, or 0.0 if there are none.
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> int:
+        """
+        Returns the smallest recorded value that at least the given fraction of the values are less than
+        or equal to, or 0 if there are none.
+        """
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen >= fraction * self.count:
+                return value
+        return 0
+
+    def snapshot(self) -> dict:
+        """
+        Returns the histogram as plain data: count, mean, p50, p99, max and the count of each value.
+        """
+        return {'count': self.count, 'mean': self.mean(), 'p50': self.percentile(0.5),
+                'p99': self.percentile(0.99), 'max': self.max,
+                'counts': {value: self.counts[value] for value in sorted(self.counts)}}
+
+
+class Stats:
+    def __init__(self, m, export_interval: float = None) -> None:
+        """
+        Initializes the statistics of the map m. With an export_interval in seconds, the instrumented
+        methods call export once that long has passed since the last export.
+        """
+        self.map = m
+        self.exporters = []
+        self.export_interval = export_interval
+        self.last_export = time.monotonic()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Zeroes every counter and histogram.
+        """
+        self.gets = 0
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.inserts = 0
+        self.removes = 0
+        self.resizes = 0
+        self.compactions = 0
+        # nodes (chaining) or slots (open addressing) examined per operation, as counted into the map's probed
+        self.probes = {'get': Histogram(), 'put': Histogram(), 'remove': Histogram()}
+        # microseconds per resize_table / start_resize / compact call
+        self.resize_micros = Histogram()
+        self.compact_micros = Histogram()
+
+    def hit_ratio(self) -> float:
+        """
+        Returns the fraction of lookups (get and contains_key) that found their key, or 0.0 before the first.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def snapshot(self) -> dict:
+        """
+        Returns every counter, histogram and table gauge as plain data (dicts, numbers and strings),
+        ready to be serialized or handed to a metrics client.
+        """
+        return {
+            'time': time.time(),
+            'gets': self.gets,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hit_ratio(),
+            'puts': self.puts,
+            'inserts': self.inserts,
+            'removes': self.removes,
+            'resizes': self.resizes,
+            'compactions': self.compactions,
+            'probes': {name: histogram.snapshot() for name, histogram in self.probes.items()},
+            'resize_micros': self.resize_micros.snapshot(),
+            'compact_micros': self.compact_micros.snapshot(),
+            'table': table_stats(self.map),
+        }
+
+    def add_exporter(self, exporter) -> None:
+        """
+        Registers exporter(snapshot) to be called by every export, e.g. to forward the numbers to
+        a metrics pipeline.
+        """
+        self.exporters.append(exporter)
+
+    def export(self) -> dict:
+        """
+        Takes a snapshot, passes it to every exporter and returns it.
+        """
+        snapshot = self.snapshot()
+        self.last_export = time.monotonic()
+        for exporter in self.exporters:
+            exporter(snapshot)
+        return snapshot
+
+    def tick(self) -> None:
+        """
+        Exports if an export_interval is set and has passed.
+        """
+        if self.export_interval is not None and time.monotonic() - self.last_export >= self.export_interval:
+            self.export()
+
+    def record_probe(self, operation: str) -> None:
+        """
+        Records how many nodes or slots the given operation just examined, as the counting lookups left in
+        the map's probed attribute; maps whose lookups are not counted are not recorded.
+        """
+        if hasattr(type(self.map), 'probed'):
+            self.probes[operation].record(self.map.probed)
+
+
+def enable(m, export_interval: float = None) -> Stats:
+    """
+    Starts collecting statistics on the map m and returns its Stats (the existing ones, if already enabled).
+    """
+    if m.stats is not None:
+        return m.stats
+
+    stats = Stats(m, export_interval)
+    cls = type(m)
+
+    # each operation starts its count at 0, which stays if it returns before any lookup (e.g. on a prefilter miss)
+    def get(self, key: str) -> object:
+        self.probed = 0
+        value = cls.get(self, key)
+        stats.record_probe('get')
+        stats.gets += 1
+        # a stored None is indistinguishable from a miss here
+        if value is None:
+            stats.misses += 1
+        else:
+            stats.hits += 1
+        stats.tick()
+        return value
+
+    def put(self, key: str, value: object, *args, **kwargs) -> None:
+        self.probed = 0
+        size = self.size
+        cls.put(self, key, value, *args, **kwargs)
+        stats.record_probe('put')
+        stats.puts += 1
+        if self.size > size:
+            stats.inserts += 1
+        stats.tick()
+
+    def remove(self, key: str) -> None:
+        self.probed = 0
+        cls.remove(self, key)
+        stats.record_probe('remove')
+        stats.removes += 1
+        stats.tick()
+
+    def contains_key(self, key: str) -> bool:
+        found = cls.contains_key(self, key)
+        if found:
+            stats.hits += 1
+        else:
+            stats.misses += 1
+        stats.tick()
+        return found
+
+    def timed(self, function, histogram: Histogram, *args) -> bool:
+        # returns whether the call rebuilt anything, which every rebuild marks by bumping modifications
+        modifications = self.modifications
+        start = time.perf_counter()
+        function(self, *args)
+        if self.modifications == modifications:
+            return False
+        histogram.record(round((time.perf_counter() - start) * 1e6))
+        return True
+
+    def resize_table(self, new_capacity: int) -> None:
+        if timed(self, cls.resize_table, stats.resize_micros, new_capacity):
+            stats.resizes += 1
+
+    def start_resize(self, new_capacity: int, buckets: DynamicArray = None) -> None:
+        # without incremental resizing this is resize_table, which counts itself
+        if self.rehash_step is None:
+            cls.start_resize(self, new_capacity, buckets)
+        elif timed(self, cls.start_resize, stats.resize_micros, new_capacity, buckets):
+            stats.resizes += 1
+
+    def compact(self) -> None:
+        if timed(self, cls.compact, stats.compact_micros):
+            stats.compactions += 1
+
+    methods = {'get': get, 'put': put, 'remove': remove, 'contains_key': contains_key,
+               'resize_table': resize_table, 'start_resize': start_resize, 'compact': compact}
+    namespace = {name: methods[name] for name in INSTRUMENTED if hasattr(cls, name)}
+    namespace['stats'] = stats
+
+    # the lookups that count their probes, whose count starts at 0 on every operation
+    if issubclass(cls, hash_map_sc.HashMap):
+        namespace.update(find_link=counting_find_link, probed=0)
+    elif issubclass(cls, hash_map_oa.HashMap):
+        namespace.update(find_index=counting_find_index, find_slot=counting_find_slot, probed=0)
+    namespace['uninstrumented'] = cls
+    # a subclass made for this one map, so other maps of the same class keep the plain methods
+    m.__class__ = type(cls.__name__, (cls,), namespace)
+    return stats
+
+
+def disable(m) -> Stats:
+    """
+    Stops collecting statistics on the map m, putting the class's own methods back in charge,
+    and returns the Stats collected so far (None if they were not enabled).
+    """
+    stats = m.stats
+    if stats is not None:
+        m.__class__ = m.uninstrumented
+        m.__dict__.pop('probed', None)
+    return stats
+
+
+def counting_find_link(self, linked_list: LinkedList, key: str, hash: int) -> tuple:
+    """
+    hash_map_sc.HashMap.find_link, also leaving the number of nodes it examined in self.probed.
+    """
+    node = linked_list.head
+    now = self.clock() if self.expiring else None
+    previous = None
+    probed = 0
+    while node is not None:
+        probed += 1
+        if now is not None and self.is_expired(node, now):
+            self.unlink_node(linked_list, previous, node)
+            node = node.next
+            continue
+        if node.hash == hash and node.key == key:
+            break
+        previous = node
+        node = node.next
+    self.probed = probed
+    return previous, node
+
+
+def counting_find_index(self, key: str, hash: int, buckets: DynamicArray, capacity: int) -> int:
+    """
+    hash_map_oa.HashMap.find_index, also leaving the number of buckets it examined in self.probed. The old
+    table of an incremental resize is only probed after a miss in the current one, so its probes add to those.
+    """
+    index = hash % capacity
+    now = self.clock() if self.expiring else None
+    found = -1
+    counter = 0
+    for counter in range(capacity):
+        new_index = (index + counter ** 2) % capacity
+        entry = buckets[new_index]
+        if entry is None:
+            break
+        if now is not None and entry.is_tombstone is False and self.is_expired(entry, now):
+            self.expire_entry(buckets, new_index)
+            continue
+        if entry.hash == hash and entry.key == key and entry.is_tombstone is False:
+            found = new_index
+            break
+
+    if buckets is self.buckets:
+        self.probed = counter + 1
+    else:
+        self.probed += counter + 1
+    return found
+
+
+def counting_find_slot(self, key: str, hash: int) -> tuple:
+    """
+    hash_map_oa.HashMap.find_slot, also leaving the number of buckets it examined in self.probed. A put's own
+    insert is its last, so the entries a resize inside the put moves first are not counted.
+    """
+    index = hash % self.capacity
+    free_index = -1
+    now = self.clock() if self.expiring else None
+    counter = 0
+    for counter in range(self.capacity):
+        new_index = (index + counter ** 2) % self.capacity
+        current = self.buckets[new_index]
+        if current is None:
+            if free_index == -1:
+                free_index = new_index
+            break
+        if now is not None and current.is_tombstone is False and self.is_expired(current, now):
+            self.expire_entry(self.buckets, new_index)
+        if current.is_tombstone:
+            if free_index == -1:
+                free_index = new_index
+        elif current.hash == hash and current.key == key:
+            self.probed = counter + 1
+            return new_index, True
+
+    self.probed = counter + 1
+    return free_index, False
+
+
+def table_stats(m) -> dict:
+    """
+    Returns gauges read from the map's table: size, capacity and load factor, the hash function's name and
+    the collision rate (the fraction of keys not alone in their home bucket, or not in their home slot),
+    plus the maximum and mean chain length for a chaining map and the tombstone count and density for
+    an open addressing map. Reading them walks the whole table.
+    """
+    function = m.hash_function
+    gauges = {'size': m.size, 'capacity': m.capacity, 'load': m.size / m.capacity if m.capacity else 0.0,
+              'hash_function': getattr(function, '__qualname__', repr(function))}
+
+    if isinstance(m, hash_map_sc.HashMap):
+        lengths = [m.buckets[index].length() for index in range(m.capacity)]
+        if m.old_buckets is not None:
+            lengths += [m.old_buckets[index].length() for index in range(m.rehash_index, m.old_capacity)]
+        used = sum(1 for length in lengths if length)
+        gauges['max_chain_length'] = max(lengths, default=0)
+        gauges['mean_chain_length'] = m.size / used if used else 0.0
+        gauges['collision_rate'] = (m.size - used) / m.size if m.size else 0.0
+
+    elif isinstance(m, hash_map_oa.HashMap):
+        displaced = 0
+        for index in range(m.capacity):
+            entry = m.buckets[index]
+            if entry is not None and entry.is_tombstone is False and entry.hash % m.capacity != index:
+                displaced += 1
+        gauges['tombstones'] = m.tombstones
+        gauges['tombstone_density'] = m.tombstones / m.capacity
+        gauges['collision_rate'] = displaced / m.size if m.size else 0.0
+
+    return gauges
+
+
+def collision_rate(function, keys, capacity: int) -> float:
+    """
+    Returns the fraction of the keys that function sends to one of capacity buckets already taken
+    by an earlier key, for comparing hash functions on a given key set.
+    """
+    taken = set()
+    collisions = 0
+    count = 0
+    for key in keys:
+        bucket = function(key) % capacity
+        if bucket in taken:
+            collisions += 1
+        taken.add(bucket)
+        count += 1
+    return collisions / count if count else 0.0
+
+
+if __name__ == "__main__":
+
+    print("\nstats on a chaining map")
+    print("-----------------------")
+    m = hash_map_sc.HashMap(8, hash_map_sc.hash_function_2)
+    m.set_resize_policy(max_load_factor=1.0)
+    stats = m.enable_stats()
+    for i in range(100):
+        m.put('key' + str(i), i)
+    for i in range(150):
+        m.get('key' + str(i))
+    snapshot = stats.snapshot()
+    print(snapshot['puts'], snapshot['inserts'], snapshot['hits'], snapshot['misses'], snapshot['resizes'],
+          snapshot['probes']['get']['max'], snapshot['table']['max_chain_length'])
+    m.disable_stats()
+    print(type(m) is hash_map_sc.HashMap, m.stats)
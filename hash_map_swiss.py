@@ -0,0 +1,511 @@
+# Description: This file contains a hash table that utilizes open addressing with SwissTable-style grouped probing
+# for resolving collisions, with the same interface as the HashMap in hash_map_oa.py.
+
+# The slots are split into groups of GROUP_WIDTH (16). Next to the slots there is one control byte per slot:
+# EMPTY, DELETED (a tombstone), or, for a full slot, a 7-bit tag taken from the top bits of the key's hash
+# (after mixing). The bits below the tag pick the group a probe starts at, and probing moves from group to group (the i-th step
+# skips i groups ahead, which visits every group since their number is a power of two). Within a group, one
+# bytearray.find per candidate scans all 16 control bytes in C for the key's tag, so a key comparison only
+# happens for the roughly 1 in 128 full slots whose tag matches, and one more find for EMPTY decides whether
+# the probe can stop at this group. Remove leaves a tombstone only if the slot's group has no empty slot,
+# since a group with one never sends a probe on to the next group. The table is stored as the control
+# bytearray plus parallel per-slot lists of keys, values and cached hashes, and it grows (or clears out its
+# tombstones) once live entries plus tombstones pass max_load_factor (0.875 by default).
+# The HashMap class contains the same methods as the one in hash_map_oa.py, including:
+# (1) empty_buckets: returns the number of empty buckets in the hash table
+# (2) table_load: returns the current hash table load factor
+# (3) clear: clears the contents of the hash map without changing the underlying capacity
+# (4) put: updates the key/value pairs in the hash map
+# (5) contains_key: confirms if a given key is in the hash map
+# (6) get: returns the value associated with the given key
+# (7) remove: removes the given key and its associated value from the hash map
+# (8) resize_table: changes the capacity of the internal hash table
+# (9) get_keys: returns a DynamicArray that contains all the keys stored in the hash map
+# (10) key_comparisons: the number of keys a lookup compares, for measuring how well the tags filter
+
+from itertools import islice
+from operator import length_hint
+
+from a6_include import *
+from hash_map_oa import BATCH_SIZE, hash_function_1, hash_function_2
+
+
+# slots per group, all scanned by one search of the control bytes
+GROUP_WIDTH = 16
+
+# control bytes; a full slot holds its key's tag, 0 to 127
+EMPTY = 0x80
+DELETED = 0xFE
+
+# the tag is the top 7 bits of the mixed 64-bit hash, and the bits right below it pick the group
+TAG_SHIFT = 57
+
+# cached hashes are kept as unsigned 64-bit integers, multiplied by an odd constant so that the top bits
+# depend on every bit of the hash function's result (hash_function_1 / 2 only ever set the low bits)
+HASH_MASK = (1 << 64) - 1
+MIX_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+def group_count(capacity: int) -> int:
+    """
+    Returns the number of groups for the given capacity: the smallest power of two whose groups hold it.
+    """
+    groups = 1
+    while groups * GROUP_WIDTH < capacity:
+        groups *= 2
+    return groups
+
+
+class HashMap:
+    # fraction of the slots live entries and tombstones may fill before put grows or cleans the table
+    max_load_factor = 0.875
+
+    # bumped by every change to which slots hold entries, so iterators can detect it
+    modifications = 0
+
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses SwissTable-style grouped probing for collision resolution, stored as
+        one control byte per slot plus per-slot lists of keys, values and hashes. The capacity is rounded up
+        to a power-of-two number of groups of GROUP_WIDTH slots.
+        """
+        self.hash_function = function
+        self.size = 0
+        self.tombstones = 0
+        self.allocate(group_count(capacity))
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form
+        """
+        out = ''
+        for i in range(self.capacity):
+            if self.control[i] < EMPTY:
+                slot = f"K: {self.slot_keys[i]} V: {self.slot_values[i]} TS: False"
+            elif self.control[i] == DELETED:
+                slot = 'TS: True'
+            else:
+                slot = 'None'
+            out += str(i) + ': ' + slot + '\n'
+        return out
+
+    def allocate(self, groups: int) -> None:
+        """
+        Replaces the slots with empty ones for the given number of groups.
+        """
+        self.groups = groups
+        self.group_shift = TAG_SHIFT - (groups.bit_length() - 1)
+        self.capacity = groups * GROUP_WIDTH
+        self.control = bytearray([EMPTY]) * self.capacity
+        self.slot_keys = [None] * self.capacity
+        self.slot_values = [None] * self.capacity
+        self.slot_hashes = [0] * self.capacity
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map; it does not change the underlying hash table capacity.
+        """
+        self.size = 0
+        self.tombstones = 0
+        self.modifications += 1
+        self.allocate(self.groups)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key or None if the key is not found.
+        """
+        index = self.find_index(key, self.mix_hash(key))
+        if index != -1:
+            return self.slot_values[index]
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key / value pair in the hash map. If the given key already exists in
+        the hash map, its associated value must be replaced with the new value. If the given key is
+        not in the hash map, a key / value pair must be added.
+        """
+        self.make_room(self.size + self.tombstones + 1)
+        self.insert(key, value, self.mix_hash(key))
+
+    def put_many(self, items) -> None:
+        """
+        Puts every key / value pair from an iterable of pairs. If the iterable knows its length, the table is
+        grown once up front instead of doubling repeatedly; keys are hashed a batch at a time, and the
+        load factor is checked once per batch instead of once per pair.
+        """
+        # presize from the length hint so the whole load fits below the maximum load factor
+        self.reserve(self.size + length_hint(items))
+
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, BATCH_SIZE))
+            if not batch:
+                return
+
+            # make room for the whole batch, then insert it without further checks
+            self.make_room(self.size + self.tombstones + len(batch))
+
+            hashes = [self.mix_hash(key) for key, _ in batch]
+            for (key, value), hash in zip(batch, hashes):
+                self.insert(key, value, hash)
+
+    @classmethod
+    def from_items(cls, items, function, capacity: int = None) -> 'HashMap':
+        """
+        Returns a new HashMap holding the given key / value pairs. Unless a capacity is given, the table is
+        sized from the length of items (when known) so every pair fits without a resize.
+        """
+        if capacity is None:
+            capacity = int(length_hint(items) / cls.max_load_factor) + 1
+
+        m = cls(capacity, function)
+        m.put_many(items)
+        return m
+
+    def reserve(self, count: int) -> None:
+        """
+        Doubles the number of groups with a single resize_table call until count entries
+        stay within the maximum load factor. Does nothing if they already do.
+        """
+        groups = self.groups
+        while count > self.max_load_factor * groups * GROUP_WIDTH:
+            groups *= 2
+
+        if groups != self.groups:
+            self.resize_table(groups * GROUP_WIDTH)
+
+    def make_room(self, occupied: int) -> None:
+        """
+        Keeps occupied slots (live entries plus tombstones) within the maximum load factor: if clearing out
+        the tombstones is enough to leave the table at most half that full, the table is rebuilt at the same
+        size, otherwise it grows.
+        """
+        if occupied <= self.max_load_factor * self.capacity:
+            return
+
+        live = occupied - self.tombstones
+        groups = self.groups
+        if live > self.max_load_factor * self.capacity / 2:
+            groups *= 2
+            while live > self.max_load_factor * groups * GROUP_WIDTH:
+                groups *= 2
+        self.rebuild(groups)
+
+    def insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Stores the key / value pair in the slot holding the key, or in the first empty or deleted slot on its
+        probe sequence, without checking the load factor.
+        """
+        index = self.find_index(key, hash)
+        if index != -1:
+            self.slot_values[index] = value
+            return
+
+        index = self.find_free_index(hash)
+        if self.control[index] == DELETED:
+            self.tombstones -= 1
+        self.control[index] = hash >> TAG_SHIFT
+        self.slot_keys[index] = key
+        self.slot_values[index] = value
+        self.slot_hashes[index] = hash
+        self.size += 1
+        self.modifications += 1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map. If the key is not
+        in the hash map, the method does nothing.
+        """
+        index = self.find_index(key, self.mix_hash(key))
+        if index == -1:
+            return
+
+        # a group with an empty slot ends every probe that reaches it, so no probe sequence runs through
+        # this slot and it can be emptied outright; otherwise it must stay a tombstone
+        start = index - index % GROUP_WIDTH
+        if self.control.find(EMPTY, start, start + GROUP_WIDTH) != -1:
+            self.control[index] = EMPTY
+        else:
+            self.control[index] = DELETED
+            self.tombstones += 1
+
+        self.slot_keys[index] = None
+        self.slot_values[index] = None
+        self.size -= 1
+        self.modifications += 1
+
+    def get_many(self, keys, default: object = None) -> list:
+        """
+        Returns a list with the value of each of the given keys, in the same order, or default for keys
+        that are not in the hash map.
+        """
+        values = self.slot_values
+        return [values[index] if index != -1 else default for index in self.find_indices(keys)]
+
+    def contains_many(self, keys) -> list:
+        """
+        Returns a list with True for each of the given keys that is in the hash map and False otherwise,
+        in the same order as the keys.
+        """
+        return [index != -1 for index in self.find_indices(keys)]
+
+    def find_indices(self, keys) -> list:
+        """
+        Returns the slot index of each of the given keys (-1 for missing keys), in the same order
+        as the keys. The keys are hashed as a batch and repeated keys are probed only once.
+        """
+        keys = list(keys)
+        hashes = [self.mix_hash(key) for key in keys]
+
+        found = {}
+        indices = []
+        for key, hash in zip(keys, hashes):
+            if key not in found:
+                found[key] = self.find_index(key, hash)
+            indices.append(found[key])
+        return indices
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise it returns False.
+        """
+        return self.find_index(key, self.mix_hash(key)) != -1
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+        """
+        return self.capacity - self.size - self.tombstones
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor.
+        """
+        return self.size / self.capacity
+
+    def occupied_load(self) -> float:
+        """
+        Returns the fraction of the hash table taken up by live entries and tombstones together.
+        """
+        return (self.size + self.tombstones) / self.capacity
+
+    def compact(self) -> None:
+        """
+        Rehashes the live entries at the same capacity, clearing out every tombstone.
+        """
+        self.rebuild(self.groups)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the internal hash table, rounded up to a power-of-two number of groups. All
+        existing key/value pairs will transfer to the new hash table, and all hash table links will be rehashed.
+        Does nothing if the new capacity is less than 1 or would not leave at least one empty slot.
+        """
+        if new_capacity < 1 or group_count(new_capacity) * GROUP_WIDTH <= self.size:
+            return
+
+        self.rebuild(group_count(new_capacity))
+
+    def rebuild(self, groups: int) -> None:
+        """
+        Places every live entry in fresh slots for the given number of groups by its cached hash,
+        so no key is hashed again, leaving no tombstones.
+        """
+        control, keys, values, hashes = self.control, self.slot_keys, self.slot_values, self.slot_hashes
+        self.allocate(groups)
+        self.tombstones = 0
+        self.modifications += 1
+
+        # every key is known to be distinct, so only a free slot is looked for
+        for index in range(len(control)):
+            if control[index] < EMPTY:
+                hash = hashes[index]
+                new_index = self.find_free_index(hash)
+                self.control[new_index] = control[index]
+                self.slot_keys[new_index] = keys[index]
+                self.slot_values[new_index] = values[index]
+                self.slot_hashes[new_index] = hash
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys stored in the hash map.
+        """
+        keys_array = DynamicArray()
+        for index in range(self.capacity):
+            if self.control[index] < EMPTY:
+                keys_array.append(self.slot_keys[index])
+        return keys_array
+
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the hash map, like keys().
+        """
+        return self.keys()
+
+    def keys(self):
+        """
+        Yields every key in the hash map in slot order, read straight from the slots.
+        """
+        keys = self.slot_keys
+        for index in self.iter_slots():
+            yield keys[index]
+
+    def values(self):
+        """
+        Yields every value in the hash map in slot order, read straight from the slots.
+        """
+        values = self.slot_values
+        for index in self.iter_slots():
+            yield values[index]
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map in slot order, read straight from the slots.
+        """
+        keys, values = self.slot_keys, self.slot_values
+        for index in self.iter_slots():
+            yield keys[index], values[index]
+
+    def iter_slots(self):
+        """
+        Yields the index of every full slot. Raises RuntimeError if entries are added, removed or moved
+        while the iteration is in progress; replacing the value of an existing key is allowed.
+        """
+        modifications = self.modifications
+        control = self.control
+
+        for index in range(self.capacity):
+            if control[index] < EMPTY:
+                yield index
+                if self.modifications != modifications:
+                    raise RuntimeError("HashMap changed during iteration")
+
+    def mix_hash(self, key: str) -> int:
+        """
+        Returns the key's hash as the table uses it: the hash function's result times MIX_MULTIPLIER,
+        modulo 2 ** 64. Multiplying by an odd number keeps distinct hashes distinct.
+        """
+        return (self.hash_function(key) * MIX_MULTIPLIER) & HASH_MASK
+
+    def key_comparisons(self, key: str) -> int:
+        """
+        Returns the number of keys a lookup of the given key compares against it, whether or not it is
+        in the table: one per slot in the probed groups whose tag matches the key's.
+        """
+        hash = self.mix_hash(key)
+        control, keys = self.control, self.slot_keys
+        tag = hash >> TAG_SHIFT
+        group = (hash >> self.group_shift) & (self.groups - 1)
+        comparisons = 0
+
+        for step in range(self.groups):
+            start = group * GROUP_WIDTH
+            end = start + GROUP_WIDTH
+            index = control.find(tag, start, end)
+            while index != -1:
+                comparisons += 1
+                if keys[index] == key:
+                    return comparisons
+                index = control.find(tag, index + 1, end)
+            if control.find(EMPTY, start, end) != -1:
+                break
+            group = (group + step + 1) & (self.groups - 1)
+
+        return comparisons
+
+    def find_index(self, key: str, hash: int) -> int:
+        """
+        Args:
+            key: the key to look for
+            hash: the key's hash, as returned by mix_hash
+
+        Returns: the index of the slot holding the key, or -1 if the key is not in the table
+        """
+        control, keys = self.control, self.slot_keys
+        tag = hash >> TAG_SHIFT
+        mask = self.groups - 1
+        group = (hash >> self.group_shift) & mask
+
+        # search each group's control bytes for the tag in C, comparing keys only where it matches;
+        # a group with an empty slot is the last one the key could be in
+        for step in range(self.groups):
+            start = group * GROUP_WIDTH
+            end = start + GROUP_WIDTH
+            index = control.find(tag, start, end)
+            while index != -1:
+                if keys[index] == key:
+                    return index
+                index = control.find(tag, index + 1, end)
+            if control.find(EMPTY, start, end) != -1:
+                return -1
+            group = (group + step + 1) & mask
+
+        return -1
+
+    def find_free_index(self, hash: int) -> int:
+        """
+        Returns the first empty or deleted slot on the probe sequence of a key that is known not to be
+        in the table. The load factor guarantees there is one.
+        """
+        control = self.control
+        mask = self.groups - 1
+        group = (hash >> self.group_shift) & mask
+
+        for step in range(self.groups):
+            start = group * GROUP_WIDTH
+            end = start + GROUP_WIDTH
+            empty = control.find(EMPTY, start, end)
+            deleted = control.find(DELETED, start, end) if self.tombstones else -1
+            if empty != -1 or deleted != -1:
+                return deleted if empty == -1 or (deleted != -1 and deleted < empty) else empty
+            group = (group + step + 1) & mask
+
+        raise RuntimeError("no free slot in the hash table")
+
+
+if __name__ == "__main__":
+
+    print("\nPDF - put example 1")
+    print("-------------------")
+    m = HashMap(50, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.size, m.capacity)
+
+    print("\nPDF - remove example 1")
+    print("----------------------")
+    m = HashMap(50, hash_function_1)
+    print(m.get('key1'))
+    m.put('key1', 10)
+    print(m.get('key1'))
+    m.remove('key1')
+    print(m.get('key1'))
+    m.remove('key4')
+
+    print("\nPDF - resize example 2")
+    print("----------------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(1, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.size, m.capacity)
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            result &= m.contains_key(str(key))
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.size, m.capacity, round(m.table_load(), 2))
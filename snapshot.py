@@ -0,0 +1,459 @@
+# Description: This file contains the on-disk snapshot format behind HashMap.save and HashMap.load in
+# hash_map_sc.py and hash_map_oa.py, and a read-only HashMap that looks keys up in a memory-mapped snapshot.
+
+# A snapshot file holds, in order, each section padded to 8 bytes:
+#   a header: magic, engine (chaining or open addressing), whether the stored hashes can be trusted by
+#   another process, capacity, entry count and the length of the hash function id
+#   the hash function id, module.qualname, so load can find the function again
+#   the index: for chaining, capacity + 1 entry numbers where each bucket's entries start (entries are
+#   written bucket by bucket); for open addressing, one entry number per slot (EMPTY_SLOT or TOMBSTONE_SLOT)
+#   the hash of every entry, as it was stored on the entry or node
+#   count + 1 offsets into the keys section and count + 1 offsets into the values section
+#   one value type per entry, and the time each entry expires (seconds since the epoch, NaN for entries
+#   without a ttl)
+#   the UTF-8 keys and the encoded values, back to back
+# Expiry times are saved by the wall clock, since the maps' monotonic clock means nothing to another process;
+# entries that have already expired are left out. Files written before expiry times were saved (HMSNAP01)
+# still load, with no expiry on any entry.
+# Every section is a flat array written and read in one call, so saving and loading never go through
+# a per-entry read or write. The module contains:
+# (1) function_id / resolve_function: name a hash function and find it again
+# (2) save_sc / save_oa: write a chaining or open addressing HashMap (collect_sc / collect_oa gather it in parts)
+# (3) read: read a whole snapshot into arrays and lists
+# (4) HashMap: a read-only view of a snapshot file through mmap, whose startup does not depend on its size
+
+import builtins
+import importlib
+import math
+import mmap
+import struct
+import time
+from array import array
+
+from a6_include import *
+from hash_map_shared import align, decode_value, encode_value
+
+
+MAGIC = b'HMSNAP02'
+# the format without the expiry section
+MAGIC_V1 = b'HMSNAP01'
+HEADER = struct.Struct('<8sBBQQI')
+
+SC = 0
+OA = 1
+
+EMPTY_SLOT = -1
+TOMBSTONE_SLOT = -2
+
+
+def function_id(function) -> str:
+    """
+    Returns the module.qualname a hash function is saved under.
+    """
+    return function.__module__ + '.' + function.__qualname__
+
+
+def is_stable(function) -> bool:
+    """
+    Returns True if the function hashes a key to the same value in every process, so stored hashes stay valid:
+    it must not be Python's randomized built-in hash or marked with stable = False, and it must be reachable
+    by module.qualname (a function built inside another function, like make_siphash's, cannot be told apart
+    from one built with a different seed).
+    """
+    return (function is not builtins.hash and getattr(function, 'stable', True)
+            and '<locals>' not in function.__qualname__)
+
+
+def resolve_function(name: str):
+    """
+    Returns the module-level function saved as module.qualname, or None if it cannot be imported.
+    """
+    module_name, _, qualname = name.rpartition('.')
+    try:
+        return getattr(importlib.import_module(module_name), qualname)
+    except (ImportError, AttributeError, ValueError):
+        return None
+
+
+def write(path: str, engine: int, capacity: int, function, index: array, entries: list) -> None:
+    """
+    Writes a snapshot. entries is a list of (hash, key, value, expires) in the order the index refers to them,
+    with expires in seconds since the epoch (NaN for none).
+    """
+    name = function_id(function).encode()
+    stable = is_stable(function)
+
+    try:
+        hashes = array('Q', [hash for hash, _, _, _ in entries])
+    except OverflowError:
+        # a negative hash, or one that does not fit 64 bits, is not stored; load will hash the keys again
+        stable = False
+        hashes = array('Q', bytes(8 * len(entries)))
+
+    keys = [key.encode() for _, key, _, _ in entries]
+    values = [encode_value(value) for _, _, value, _ in entries]
+    expiries = array('d', [expires for _, _, _, expires in entries])
+    key_offsets = offsets_of(keys)
+    value_offsets = offsets_of([data for _, data in values])
+    kinds = array('B', [kind for kind, _ in values])
+
+    sections = [HEADER.pack(MAGIC, engine, stable, capacity, len(entries), len(name)), name,
+                index, hashes, key_offsets, value_offsets, kinds, expiries]
+
+    with open(path, 'wb') as file:
+        for section in sections:
+            data = section.tobytes() if isinstance(section, array) else section
+            file.write(data)
+            file.write(bytes(-len(data) % 8))
+        file.write(b''.join(keys))
+        file.write(b''.join(data for _, data in values))
+
+
+def offsets_of(blobs: list) -> array:
+    """
+    Returns len(blobs) + 1 offsets: where each blob starts when they are written back to back, then the total.
+    """
+    offsets = array('Q', [0])
+    total = 0
+    for blob in blobs:
+        total += len(blob)
+        offsets.append(total)
+    return offsets
+
+
+def save_sc(m, path: str) -> None:
+    """
+    Writes a chaining HashMap, bucket by bucket, with each bucket's start in the index.
+    """
+    m.finish_resize()
+    index = array('q', [0])
+    entries = []
+    collect_sc(m, 0, m.capacity, index, entries)
+    write(path, SC, m.capacity, m.hash_function, index, entries)
+
+
+def collect_sc(m, start: int, stop: int, index: array, entries: list) -> None:
+    """
+    Appends the nodes of buckets start to stop of a chaining HashMap to entries, leaving out expired ones,
+    and the end of each bucket to the index. Called for consecutive ranges, it builds what save_sc writes
+    a part at a time.
+    """
+    now = m.clock()
+    epoch = time.time() - now
+    buckets = m.buckets.data
+    for bucket in range(start, stop):
+        for node in buckets[bucket]:
+            expires = getattr(node, 'expires', None)
+            if expires is None:
+                entries.append((node.hash, node.key, node.value, math.nan))
+            elif expires > now:
+                entries.append((node.hash, node.key, node.value, epoch + expires))
+        index.append(len(entries))
+
+
+def save_oa(m, path: str) -> None:
+    """
+    Writes an open addressing HashMap with the slot of every entry in the index, keeping tombstones, so every
+    probe sequence is the same after loading.
+    """
+    m.finish_resize()
+    index = array('q', [EMPTY_SLOT]) * m.capacity
+    entries = []
+    collect_oa(m, 0, m.capacity, index, entries)
+    write(path, OA, m.capacity, m.hash_function, index, entries)
+
+
+def collect_oa(m, start: int, stop: int, index: array, entries: list) -> None:
+    """
+    Appends the entries in slots start to stop of an open addressing HashMap to entries and records
+    their slots (and the tombstones) in the index, like collect_sc. Expired entries are saved as tombstones,
+    which keeps the probe sequences through them intact.
+    """
+    now = m.clock()
+    epoch = time.time() - now
+    buckets = m.buckets.data
+    for slot in range(start, stop):
+        entry = buckets[slot]
+        if entry is None:
+            continue
+        expires = getattr(entry, 'expires', None)
+        if entry.is_tombstone or (expires is not None and expires <= now):
+            index[slot] = TOMBSTONE_SLOT
+        else:
+            index[slot] = len(entries)
+            entries.append((entry.hash, entry.key, entry.value, math.nan if expires is None else epoch + expires))
+
+
+def layout(view: memoryview) -> dict:
+    """
+    Returns the header fields of a snapshot and the offset of each of its sections.
+    """
+    magic, engine, stable, capacity, count, name_length = HEADER.unpack_from(view)
+    if magic not in (MAGIC, MAGIC_V1):
+        raise ValueError("file is not a HashMap snapshot")
+
+    offset = align(HEADER.size)
+    name = str(view[offset:offset + name_length], 'utf-8')
+    offset = align(offset + name_length)
+
+    sections = {}
+    sizes = [('index', 8 * (capacity + 1 if engine == SC else capacity)), ('hashes', 8 * count),
+             ('key_offsets', 8 * (count + 1)), ('value_offsets', 8 * (count + 1)), ('kinds', count)]
+    if magic == MAGIC:
+        sizes.append(('expiries', 8 * count))
+    for section, size in sizes:
+        sections[section] = (offset, offset + size)
+        offset = align(offset + size)
+    keys_length = int.from_bytes(view[sections['key_offsets'][1] - 8:sections['key_offsets'][1]], 'little')
+    sections['keys'] = (offset, offset + keys_length)
+    sections['values'] = (offset + keys_length, len(view))
+
+    return {'engine': engine, 'stable': bool(stable), 'capacity': capacity, 'count': count, 'name': name,
+            'sections': sections}
+
+
+def check_function(header: dict, function, engine: int):
+    """
+    Returns (function, trusted): the hash function to load with, and whether the stored hashes and layout
+    are valid for it. Raises ValueError if the snapshot belongs to the other engine or no function is known.
+    """
+    if header['engine'] != engine:
+        raise ValueError("snapshot was saved by the other HashMap engine")
+
+    if function is None:
+        function = resolve_function(header['name'])
+        if function is None:
+            raise ValueError("cannot import hash function " + header['name'] + "; pass it to load")
+
+    return function, header['stable'] and is_stable(function) and function_id(function) == header['name']
+
+
+def read(path: str) -> tuple:
+    """
+    Reads a whole snapshot with one read. Returns (header, index, hashes, keys, values, expiries), with the
+    index and hashes as arrays, the keys and values as lists in entry order, and expiries as an array of
+    expiry times in seconds since the epoch (NaN for none), or None for a file saved without them.
+    """
+    with open(path, 'rb') as file:
+        view = memoryview(file.read())
+
+    header = layout(view)
+    sections = header['sections']
+
+    def section(name: str, typecode: str) -> array:
+        start, end = sections[name]
+        values = array(typecode)
+        values.frombytes(view[start:end])
+        return values
+
+    index = section('index', 'q')
+    hashes = section('hashes', 'Q')
+    key_offsets = section('key_offsets', 'Q')
+    value_offsets = section('value_offsets', 'Q')
+    kinds = section('kinds', 'B')
+    expiries = section('expiries', 'd') if 'expiries' in sections else None
+
+    # slice the keys and values out of two bytes objects, which is much cheaper than slicing the memoryview
+    key_blob = bytes(view[slice(*sections['keys'])])
+    value_blob = bytes(view[slice(*sections['values'])])
+    key_bounds = zip(key_offsets, key_offsets[1:])
+
+    text = key_blob.decode()
+    if len(text) == len(key_blob):
+        # all ASCII, so byte offsets are character offsets
+        keys = [text[start:end] for start, end in key_bounds]
+    else:
+        keys = [key_blob[start:end].decode() for start, end in key_bounds]
+
+    values = [decode_value(kind, value_blob[start:end])
+              for kind, start, end in zip(kinds, value_offsets, value_offsets[1:])]
+    return header, index, hashes, keys, values, expiries
+
+
+def time_left(expires: float) -> float:
+    """
+    Returns the seconds until an expiry time saved by the wall clock (negative once it has passed),
+    or None for an entry without one (NaN).
+    """
+    if math.isnan(expires):
+        return None
+    return expires - time.time()
+
+
+class HashMap:
+    def __init__(self, path: str, function=None) -> None:
+        """
+        Opens a snapshot written by either engine's save for reading through mmap. Only the header is read;
+        the sections are looked at in place when keys are looked up, so opening takes the same time at any size.
+        function defaults to the saved hash function, and must give the same hashes as the one the snapshot
+        was saved with.
+        """
+        with open(path, 'rb') as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.buffer)
+
+        header = layout(self.view)
+        self.hash_function, trusted = check_function(header, function, header['engine'])
+        if not trusted:
+            self.close()
+            raise ValueError("snapshot hashes are not valid for " + function_id(self.hash_function) +
+                             "; load it without lazy=True")
+
+        self.engine = header['engine']
+        self.capacity = header['capacity']
+        self.size = header['count']
+
+        def section(name: str, typecode: str) -> memoryview:
+            start, end = header['sections'][name]
+            return self.view[start:end].cast(typecode)
+
+        self.index = section('index', 'q')
+        self.hashes = section('hashes', 'Q')
+        self.key_offsets = section('key_offsets', 'Q')
+        self.value_offsets = section('value_offsets', 'Q')
+        self.kinds = section('kinds', 'B')
+        self.expiries = section('expiries', 'd') if 'expiries' in header['sections'] else None
+        self.keys_start = header['sections']['keys'][0]
+        self.values_start = header['sections']['values'][0]
+
+    def __enter__(self) -> 'HashMap':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map.
+        """
+        return self.size
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key or None if the key is not found.
+        """
+        entry = self.find_entry(key)
+        if entry == -1:
+            return None
+        start = self.values_start + self.value_offsets[entry]
+        end = self.values_start + self.value_offsets[entry + 1]
+        return decode_value(self.kinds[entry], self.view[start:end])
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map; otherwise returns False.
+        """
+        return self.find_entry(key) != -1
+
+    def table_load(self) -> float:
+        """
+        Returns the load factor of the saved table.
+        """
+        return self.size / self.capacity
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Returns a DynamicArray that contains all of the keys stored in the hash map that have not expired.
+        """
+        keys_array = DynamicArray()
+        now = time.time()
+        for entry in range(self.size):
+            if self.expiries is None or not self.expiries[entry] <= now:
+                keys_array.append(self.read_key(entry))
+        return keys_array
+
+    def close(self) -> None:
+        """
+        Unmaps the snapshot file.
+        """
+        for name in ('index', 'hashes', 'key_offsets', 'value_offsets', 'kinds', 'expiries'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self.view.release()
+        self.buffer.close()
+
+    def read_key(self, entry: int) -> str:
+        """
+        Returns the key of the given entry number.
+        """
+        start = self.keys_start + self.key_offsets[entry]
+        return str(self.view[start:self.keys_start + self.key_offsets[entry + 1]], 'utf-8')
+
+    def matches(self, entry: int, key_bytes: bytes) -> bool:
+        """
+        Returns True if the given entry number holds the key, given as UTF-8 bytes.
+        """
+        start = self.keys_start + self.key_offsets[entry]
+        return self.view[start:self.keys_start + self.key_offsets[entry + 1]] == key_bytes
+
+    def find_entry(self, key: str) -> int:
+        """
+        Args:
+            key: the key to look for
+
+        Returns: the entry number holding the key, or -1 if the key is not in the snapshot or has expired
+        """
+        entry = self.find_saved_entry(key)
+        # NaN, for entries without a ttl, compares False
+        if entry != -1 and self.expiries is not None and self.expiries[entry] <= time.time():
+            return -1
+        return entry
+
+    def find_saved_entry(self, key: str) -> int:
+        """
+        Args:
+            key: the key to look for
+
+        Returns: the entry number holding the key, or -1 if the key is not in the snapshot
+        """
+        hash = self.hash_function(key)
+        key_bytes = key.encode()
+        index = self.index
+        hashes = self.hashes
+
+        if self.engine == SC:
+            # the bucket's entries are stored together
+            bucket = hash % self.capacity
+            for entry in range(index[bucket], index[bucket + 1]):
+                if hashes[entry] == hash and self.matches(entry, key_bytes):
+                    return entry
+            return -1
+
+        # probe quadratically, like the open addressing HashMap, until an empty slot ends the sequence
+        start = hash % self.capacity
+        for counter in range(self.capacity):
+            entry = index[(start + counter ** 2) % self.capacity]
+            if entry == EMPTY_SLOT:
+                return -1
+            if entry != TOMBSTONE_SLOT and hashes[entry] == hash and self.matches(entry, key_bytes):
+                return entry
+        return -1
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    import hash_functions
+    import hash_map_oa
+    import hash_map_sc
+
+    print("\nexpiry times across save / load")
+    print("-------------------------------")
+    for module in (hash_map_sc, hash_map_oa):
+        m = module.HashMap(16, hash_functions.fnv1a)
+        m.put('expired', 1, 0.05)
+        m.put('expiring', 2, 60)
+        m.put('permanent', 3)
+        time.sleep(0.1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'snapshot')
+            m.save(path)
+            loaded = module.HashMap.load(path)
+            nodes = loaded.iter_nodes() if module is hash_map_sc else loaded.iter_entries()
+            left = [node.expires - loaded.clock() for node in nodes if node.key == 'expiring'][0]
+            with module.HashMap.load(path, lazy=True) as lazy:
+                print(module.__name__, len(loaded), sorted(loaded.keys()), loaded.expiring, 59 < left <= 60,
+                      lazy.get('expired'), lazy.get('expiring'))
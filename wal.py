@@ -0,0 +1,438 @@
+# Description: This file contains the write-ahead log behind the durable mode of hash_map_oa.HashMap
+# (set_durable / recover), which lets puts and removes survive a crash of the process.
+
+# A durable map keeps a directory of numbered files:
+#   snapshot.N: a snapshot (see snapshot.py) of the map holding every change logged before log N
+#   wal.N: the changes logged since then, one record per put, remove or clear
+# Each record is a header (CRC-32, payload length, operation) followed by the payload: the key's length,
+# the key's UTF-8 bytes, the value's type and the encoded value. A put with a ttl is logged as PUT_EXPIRING,
+# whose payload starts with the time the key expires, in seconds since the epoch: the map's monotonic clock
+# means nothing after a restart, and an absolute time lets replay give the key only the time it has left
+# (a key whose time has already passed is replayed as a remove). Recovery loads the newest snapshot and
+# replays every later log in order, stopping at the first record that is incomplete or fails its CRC, which is
+# where a crash cut the last write short.
+# Every change is written to the log with os.write before the map applies it, so it reaches the operating system
+# even if the process dies right after. When it also reaches the disk depends on the fsync policy:
+#   'always': before put / remove returns. Concurrent appenders share one fsync (group commit), and
+#   put_many writes and syncs each batch of BATCH_SIZE pairs at once
+#   'interval': a background thread syncs every interval seconds, so a machine crash loses at most that long
+#   'never': left to the operating system
+# Once the log outgrows checkpoint_bytes, the map starts a checkpoint: appends move on to log N + 1, and a
+# forked child process writes snapshot.N + 1 from its copy-on-write view of the map while the parent keeps
+# going. When the child has finished, the snapshot is renamed into place and older files are deleted.
+# The module contains:
+# (1) encode_put / encode_remove / encode_clear: build log records (encode_put writes PUT_EXPIRING for a ttl)
+# (2) read_log: replay the records of one log file
+# (3) find_files: the snapshot and logs recovery needs
+# (4) create / recover: start logging a HashMap, and rebuild one from its directory
+# (5) WriteAheadLog: appends records, applies the fsync policy and runs checkpoints
+
+import os
+import struct
+import threading
+import time
+import zlib
+
+import snapshot
+from hash_map_shared import decode_value, encode_value
+
+
+RECORD = struct.Struct('<IIB')
+KEY_LENGTH = struct.Struct('<I')
+EXPIRES = struct.Struct('<d')
+
+PUT = 1
+REMOVE = 2
+CLEAR = 3
+PUT_EXPIRING = 4
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+
+def encode_record(operation: int, payload: bytes) -> bytes:
+    """
+    Returns a log record: its header, with a CRC-32 of the operation and payload, then the payload.
+    """
+    checksum = zlib.crc32(payload, zlib.crc32(bytes((operation,))))
+    return RECORD.pack(checksum, len(payload), operation) + payload
+
+
+def encode_put(key: str, value: object, expires: float = None) -> bytes:
+    """
+    Returns the log record of a put: PUT, or PUT_EXPIRING if the key expires at the given time
+    (seconds since the epoch).
+    """
+    key_bytes = key.encode()
+    kind, data = encode_value(value)
+    payload = KEY_LENGTH.pack(len(key_bytes)) + key_bytes + bytes((kind,)) + data
+    if expires is None:
+        return encode_record(PUT, payload)
+    return encode_record(PUT_EXPIRING, EXPIRES.pack(expires) + payload)
+
+
+def decode_put(payload) -> tuple:
+    """
+    Returns the (key, value) of a PUT record's payload.
+    """
+    key_length = KEY_LENGTH.unpack_from(payload)[0]
+    key_end = KEY_LENGTH.size + key_length
+    return payload[KEY_LENGTH.size:key_end].decode(), decode_value(payload[key_end], payload[key_end + 1:])
+
+
+def encode_remove(key: str) -> bytes:
+    """
+    Returns the log record of a remove.
+    """
+    return encode_record(REMOVE, key.encode())
+
+
+def encode_clear() -> bytes:
+    """
+    Returns the log record of a clear.
+    """
+    return encode_record(CLEAR, b'')
+
+
+def read_log(path: str, m) -> int:
+    """
+    Applies every intact record of the log at path to the HashMap m, in order.
+    Returns the length of the intact part; anything after it was cut short by a crash.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    offset = 0
+    while offset + RECORD.size <= len(data):
+        checksum, length, operation = RECORD.unpack_from(data, offset)
+        start = offset + RECORD.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload, zlib.crc32(bytes((operation,)))) != checksum:
+            break
+
+        if operation == PUT:
+            m.put(*decode_put(payload))
+        elif operation == PUT_EXPIRING:
+            key, value = decode_put(payload[EXPIRES.size:])
+            left = EXPIRES.unpack_from(payload)[0] - time.time()
+            # the put replaced any earlier value, so a key whose time is up is not in the map at all
+            if left > 0:
+                m.put(key, value, left)
+            else:
+                m.remove(key)
+        elif operation == REMOVE:
+            m.remove(payload.decode())
+        elif operation == CLEAR:
+            m.clear()
+        offset = start + length
+
+    return offset
+
+
+def file_path(directory: str, name: str, generation: int) -> str:
+    """
+    Returns the path of snapshot.N or wal.N in the directory.
+    """
+    return os.path.join(directory, name + '.' + str(generation))
+
+
+def find_files(directory: str) -> tuple:
+    """
+    Returns (snapshot generation or None, sorted generations of the logs to replay after it).
+    Leftovers of an unfinished checkpoint are deleted.
+    """
+    snapshots, logs = [], []
+    for name in os.listdir(directory):
+        kind, _, generation = name.partition('.')
+        if generation.endswith('.tmp'):
+            os.remove(os.path.join(directory, name))
+        elif kind == 'snapshot' and generation.isdigit():
+            snapshots.append(int(generation))
+        elif kind == 'wal' and generation.isdigit():
+            logs.append(int(generation))
+
+    latest = max(snapshots, default=None)
+    return latest, sorted(generation for generation in logs if latest is None or generation >= latest)
+
+
+def sync_directory(directory: str) -> None:
+    """
+    Flushes the directory itself, so renames and new files in it survive a machine crash.
+    """
+    if hasattr(os, 'O_DIRECTORY'):
+        descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+def create(m, directory: str, fsync: str, interval: float, checkpoint_bytes: int) -> 'WriteAheadLog':
+    """
+    Starts logging the HashMap m into the directory, from a snapshot of what it holds now.
+    Raises ValueError if the directory already holds a durable map.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if find_files(directory) != (None, []):
+        raise ValueError(directory + " already holds a durable HashMap; use HashMap.recover")
+
+    log = WriteAheadLog(m, directory, 0, fsync, interval, checkpoint_bytes)
+    log.write_snapshot(file_path(directory, 'snapshot', 0) + '.tmp')
+    log.finish_checkpoint(0)
+    return log
+
+
+def recover(cls, directory: str, function, fsync: str, interval: float, checkpoint_bytes: int):
+    """
+    Returns the HashMap of class cls logged in the directory: its newest snapshot with every later log
+    replayed on top, logging again from where the last log ends.
+    """
+    latest, logs = find_files(directory)
+    if latest is None:
+        raise ValueError(directory + " holds no durable HashMap")
+
+    m = cls.load(file_path(directory, 'snapshot', latest), function)
+    for generation in logs:
+        path = file_path(directory, 'wal', generation)
+        length = read_log(path, m)
+        if length < os.path.getsize(path):
+            # drop the record a crash cut short, so new records follow the last intact one
+            os.truncate(path, length)
+
+    m.log = WriteAheadLog(m, directory, logs[-1] if logs else latest, fsync, interval, checkpoint_bytes)
+    return m
+
+
+class WriteAheadLog:
+    def __init__(self, m, directory: str, generation: int, fsync: str = 'always', interval: float = 0.05,
+                 checkpoint_bytes: int = 64 * 2 ** 20) -> None:
+        """
+        Opens (or creates) wal.generation in the directory for appending the changes made to the HashMap m.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError("fsync must be one of " + ', '.join(FSYNC_POLICIES))
+
+        self.map = m
+        self.directory = directory
+        self.fsync = fsync
+        self.interval = interval
+        self.checkpoint_bytes = checkpoint_bytes
+
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.generation = None
+        self.open_log(generation)
+
+        # the running checkpoint: the forked child's pid and the generation its snapshot is for
+        self.checkpoint_pid = None
+        self.checkpoint_generation = None
+
+        self.stopped = threading.Event()
+        self.flusher = None
+        if fsync == 'interval':
+            self.flusher = threading.Thread(target=self.flush_periodically, daemon=True)
+            self.flusher.start()
+
+    def open_log(self, generation: int) -> None:
+        """
+        Makes wal.generation the log new records are appended to.
+        """
+        self.descriptor = os.open(file_path(self.directory, 'wal', generation),
+                                  os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.generation = generation
+        self.size = os.fstat(self.descriptor).st_size
+        # bytes written, and bytes known to be on disk, in this log
+        self.written = self.synced = self.size
+        sync_directory(self.directory)
+
+    def put(self, key: str, value: object, expires: float = None) -> None:
+        """
+        Logs a put, of a key that expires at the given time (seconds since the epoch) if one is given.
+        """
+        self.append([encode_put(key, value, expires)])
+
+    def put_many(self, items: list) -> None:
+        """
+        Logs a batch of puts, none of them with an expiry, with one write and at most one fsync.
+        """
+        self.append([encode_put(key, value) for key, value in items])
+
+    def remove(self, key: str) -> None:
+        """
+        Logs a remove.
+        """
+        self.append([encode_remove(key)])
+
+    def clear(self) -> None:
+        """
+        Logs a clear.
+        """
+        self.append([encode_clear()])
+
+    def append(self, records: list) -> None:
+        """
+        Writes the records to the log with one write, then applies the fsync policy.
+        """
+        # checkpoint before writing: every record logged so far has been applied to the map by now,
+        # while these records will only be applied once append returns
+        if self.checkpoint_pid is not None:
+            self.poll_checkpoint()
+        elif self.size >= self.checkpoint_bytes:
+            self.start_checkpoint()
+
+        data = b''.join(records)
+        with self.lock:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self.descriptor, view):]
+            self.size += len(data)
+            self.written = end = self.size
+            descriptor, generation = self.descriptor, self.generation
+
+        if self.fsync == 'always':
+            self.sync(descriptor, generation, end)
+
+    def sync(self, descriptor: int, generation: int, end: int) -> None:
+        """
+        Makes sure the log is on disk up to end. A thread that finds another's fsync already covered
+        its records returns without one of its own, which is what lets concurrent appends commit together.
+        """
+        with self.sync_lock:
+            if generation != self.generation or self.synced >= end:
+                # synced by a later fsync, or by the rotation to a new log
+                return
+            target = self.written
+            os.fsync(descriptor)
+            self.synced = max(self.synced, target)
+
+    def flush_periodically(self) -> None:
+        """
+        The 'interval' policy's background thread: syncs the log whenever it has unsynced records.
+        """
+        while not self.stopped.wait(self.interval):
+            with self.lock:
+                descriptor, generation, end = self.descriptor, self.generation, self.written
+            if self.synced < end:
+                self.sync(descriptor, generation, end)
+
+    def start_checkpoint(self) -> None:
+        """
+        Moves appends on to a new log and starts writing a snapshot of the map for everything before it,
+        in a forked child where the operating system allows it and in this process otherwise.
+        """
+        generation = self.rotate()
+        temporary = file_path(self.directory, 'snapshot', generation) + '.tmp'
+
+        if not hasattr(os, 'fork'):
+            self.write_snapshot(temporary)
+            self.finish_checkpoint(generation)
+            return
+
+        pid = os.fork()
+        if pid == 0:
+            # the child sees the map exactly as it is now, whatever the parent does next
+            status = 1
+            try:
+                self.write_snapshot(temporary)
+                status = 0
+            finally:
+                os._exit(status)
+
+        self.checkpoint_pid = pid
+        self.checkpoint_generation = generation
+
+    def write_snapshot(self, path: str) -> None:
+        """
+        Saves the map to path and flushes it to disk.
+        """
+        snapshot.save_oa(self.map, path)
+        with open(path, 'rb+') as file:
+            os.fsync(file.fileno())
+
+    def rotate(self) -> int:
+        """
+        Syncs and closes the current log and opens the next one. Returns the new generation.
+        """
+        with self.lock, self.sync_lock:
+            os.fsync(self.descriptor)
+            os.close(self.descriptor)
+            self.open_log(self.generation + 1)
+            return self.generation
+
+    def poll_checkpoint(self, wait: bool = False) -> None:
+        """
+        Finishes the running checkpoint if its child has exited (or, with wait=True, once it does).
+        """
+        pid, status = os.waitpid(self.checkpoint_pid, 0 if wait else os.WNOHANG)
+        if pid == 0:
+            return
+
+        generation = self.checkpoint_generation
+        self.checkpoint_pid = self.checkpoint_generation = None
+        if os.waitstatus_to_exitcode(status) == 0:
+            self.finish_checkpoint(generation)
+
+    def finish_checkpoint(self, generation: int) -> None:
+        """
+        Puts snapshot.generation in place and deletes the snapshots and logs it replaces.
+        """
+        os.replace(file_path(self.directory, 'snapshot', generation) + '.tmp',
+                   file_path(self.directory, 'snapshot', generation))
+        sync_directory(self.directory)
+
+        for name in os.listdir(self.directory):
+            kind, _, number = name.partition('.')
+            if kind in ('snapshot', 'wal') and number.isdigit() and int(number) < generation:
+                os.remove(os.path.join(self.directory, name))
+
+    def checkpoint(self) -> None:
+        """
+        Runs a checkpoint now and waits for it, waiting first for one that is already running.
+        """
+        if self.checkpoint_pid is not None:
+            self.poll_checkpoint(wait=True)
+        self.start_checkpoint()
+        if self.checkpoint_pid is not None:
+            self.poll_checkpoint(wait=True)
+
+    def close(self) -> None:
+        """
+        Waits for any running checkpoint, syncs the log and closes it.
+        """
+        self.stopped.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        if self.checkpoint_pid is not None:
+            self.poll_checkpoint(wait=True)
+        with self.lock:
+            os.fsync(self.descriptor)
+            os.close(self.descriptor)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    import hash_functions
+    import hash_map_oa
+
+    print("\nrecovering keys put with a ttl")
+    print("------------------------------")
+    for checkpoint in (False, True):
+        with tempfile.TemporaryDirectory() as directory:
+            m = hash_map_oa.HashMap(16, hash_functions.fnv1a)
+            m.set_durable(directory)
+            m.put('expired', 1, 0.05)
+            m.put('expiring', 2, 60)
+            m.put('permanent', 3)
+            # replayed from the log, or read back from the snapshot the checkpoint writes
+            if checkpoint:
+                m.checkpoint()
+            m.close_log()
+            time.sleep(0.1)
+
+            recovered = hash_map_oa.HashMap.recover(directory)
+            left = [entry.expires - recovered.clock() for entry in recovered.iter_entries()
+                    if entry.key == 'expiring'][0]
+            print(checkpoint, len(recovered), sorted(recovered.keys()), recovered.get('expired'),
+                  recovered.expiring, 59 < left <= 60)
+            recovered.close_log()
+